@@ -0,0 +1,139 @@
+# ---------------------------------------------------------------------------
+# NAME: ARD_HEA_Cost.py
+# Version: 2.0 (ArcGIS 10.2)
+# Author: Research Planning, Inc.
+#
+# Description: Module containing the pre-flight cost estimator used by the ARD HEA
+#              Tool python scripts.  Predicts table row counts, peak memory and
+#              run time for each processing stage from the grid size and the
+#              number of contaminants, scenarios and analysis years.  Run times
+#              are calibrated from the timings the tools record in the project
+#              cache as they run.
+#
+# Notes:  Currently the tool is designed to only be run via the ARD HEA Toolbox.
+#         Stages without recorded timings use the default rates below, which
+#         were measured on a typical desktop with a file geodatabase.
+#         Each stage is recorded and estimated in the same unit: analysis cells
+#         (inside the mask) for GRID, POINTS and SITE_ATTRIBUTES, cells times
+#         surfaces for INTERPOLATION and COC_DATA, cells times contaminants for
+#         each scenario for FOOTPRINTS, and result rows for RESULTS.
+#         INTERPOLATION covers the engine interpolators (IDW, NN, kriging and
+#         the batch tool); the method of each run is recorded with its timing.
+#
+# Date Created: October 16, 2026
+#
+# ---------------------------------------------------------------------------
+
+import os
+import json
+import time
+import ARD_HEA_Grid
+
+TIMINGS = "TIMINGS.txt"
+STAGES = ["GRID", "POINTS", "SITE_ATTRIBUTES", "INTERPOLATION", "COC_DATA", "FOOTPRINTS", "RESULTS"]
+
+# Default throughput (rows per second) for each stage
+DEFAULT_RATES = {"GRID": 2000000.0,
+                 "POINTS": 150000.0,
+                 "SITE_ATTRIBUTES": 100000.0,
+                 "INTERPOLATION": 100000.0,
+                 "COC_DATA": 40000.0,
+                 "FOOTPRINTS": 40000.0,
+                 "RESULTS": 60000.0}
+
+# Bytes per row held in memory and rows held at once for each stage
+ROW_BYTES = {"GRID": 13,
+             "POINTS": 20,
+             "SITE_ATTRIBUTES": 40,
+             "INTERPOLATION": 16,
+             "COC_DATA": 80,
+             "FOOTPRINTS": 64,
+             "RESULTS": 120}
+CHUNK_ROWS = {"GRID": ARD_HEA_Grid.TILE_CELLS,
+              "POINTS": ARD_HEA_Grid.TILE_CELLS,
+              "SITE_ATTRIBUTES": ARD_HEA_Grid.TILE_CELLS,
+              "INTERPOLATION": ARD_HEA_Grid.TILE_CELLS,
+              "COC_DATA": ARD_HEA_Grid.TILE_CELLS,
+              "FOOTPRINTS": ARD_HEA_Grid.TILE_CELLS,
+              "RESULTS": 100000}
+
+def record_timing (geoDB, stage, rows, seconds, method=None):
+    import ARD_HEA_Tools
+    entry = {"stage": stage, "rows": int(rows), "seconds": float(seconds), "date": time.strftime("%Y-%m-%d %H:%M:%S")}
+    if method is not None:
+        entry["method"] = method
+    with open(os.path.join(ARD_HEA_Tools.cache_dir(geoDB), TIMINGS), "a") as timings:
+        timings.write(json.dumps(entry) + "\n")
+
+def load_timings (geoDB):
+    import ARD_HEA_Tools
+    path = os.path.join(ARD_HEA_Tools.cache_dir(geoDB), TIMINGS)
+    entries = []
+    if os.path.exists(path):
+        with open(path) as timings:
+            for line in timings:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    return entries
+
+def load_rates (geoDB, recent=10):
+    # Rows per second for each stage from the most recent recorded runs, and the number of runs used
+    rates = {}
+    entries = load_timings(geoDB) if geoDB else []
+    for stage in STAGES:
+        runs = [e for e in entries if e.get("stage") == stage and e.get("rows", 0) > 0 and e.get("seconds", 0) > 0][-recent:]
+        if len(runs) > 0:
+            rates[stage] = (sum([e["rows"] for e in runs]) / sum([e["seconds"] for e in runs]), len(runs))
+        else:
+            rates[stage] = (DEFAULT_RATES[stage], 0)
+    return rates
+
+def stage_rows (cells, cocs, scenarios, years):
+    return {"GRID": cells,
+            "POINTS": cells,
+            "SITE_ATTRIBUTES": cells,
+            "INTERPOLATION": cells * cocs,
+            "COC_DATA": cells * cocs,
+            "FOOTPRINTS": cells * cocs * scenarios,
+            "RESULTS": cells * scenarios * years}
+
+def estimate (cells, cocs, scenarios, years, rates=None):
+    if rates is None:
+        rates = load_rates(None)
+    rows = stage_rows(int(cells), int(cocs), int(scenarios), int(years))
+    stages = []
+    for stage in STAGES:
+        rate, runs = rates[stage]
+        # Tiled stages also hold one tile of the GRID_ID index and a cell value array
+        memory = min(rows[stage], CHUNK_ROWS[stage]) * ROW_BYTES[stage] + min(int(cells), ARD_HEA_Grid.TILE_CELLS) * 12
+        stages.append({"stage": stage,
+                       "rows": rows[stage],
+                       "memory": memory,
+                       "seconds": rows[stage] / rate,
+                       "calibrated": runs})
+    return stages
+
+def estimate_cells (geoDB, extent, cellsize, maskLayer=None, spatialRef=None):
+    grid = ARD_HEA_Grid.grid_from_extent(extent, cellsize)
+    if maskLayer is None or maskLayer in ('#', ''):
+        return grid["nrows"] * grid["ncols"], grid
+    mask = ARD_HEA_Grid.cell_mask(geoDB, grid, maskLayer, spatialRef)
+    cells = 0
+    for r0, r1 in ARD_HEA_Grid.iter_tiles(grid):
+        cells += int(mask[r0:r1].sum())
+    return cells, grid
+
+def format_size (nbytes):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if nbytes < 1024.0 or unit == "GB":
+            return "%.1f %s" % (nbytes, unit)
+        nbytes /= 1024.0
+
+def format_time (seconds):
+    if seconds < 60:
+        return "%.1f s" % seconds
+    if seconds < 3600:
+        return "%.1f min" % (seconds / 60.0)
+    return "%.1f h" % (seconds / 3600.0)
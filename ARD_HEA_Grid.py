@@ -0,0 +1,1367 @@
+# ---------------------------------------------------------------------------
+# NAME: ARD_HEA_Grid.py
+# Version: 2.0 (ArcGIS 10.2)
+# Author: Research Planning, Inc.
+#
+# Description: Module containing the analysis grid engine used by the ARD HEA Tool
+#              python scripts.  Cell centers and GRID_IDs are computed directly from
+#              the grid extent, cell size and mask as numpy arrays, and the
+#              row/col <-> GRID_ID mapping is stored in the project cache so later
+#              tools do not need to read ANALYSIS_PNTS.  Polygon masks are converted
+#              to cell masks with a scanline rasterizer and cached per project.
+#
+# Notes:  Currently the tool is designed to only be run via the ARD HEA Toolbox.
+#         GRID_IDs are numbered 1..n in row-major order from the upper left cell,
+#         matching the POINTID order of RasterToPoint used by earlier versions.
+#         When an aligned grid is regenerated, surviving cells keep their GRID_IDs
+#         and added cells are numbered after the highest existing GRID_ID, so
+#         GRID_IDs may have gaps; per-cell arrays are sized by max_id.  The
+#         renumbered map is staged and replaces the cached map only once the
+#         tables have been updated (commit_cells).
+#         Grid arrays are stored as memory-mapped .npy files and processed in
+#         tiles of whole rows holding at most TILE_CELLS cells, so memory use
+#         does not grow with the size of the grid.
+#         Surfaces are checked against the grid by comparing the valid cells of
+#         the raster with the GRID_ID map; reports are cached in SURFACE_CHECKS
+#         by raster path, modification time, extent, cell size and spatial
+#         reference and by grid checksum, one per raster, so a raster is not
+#         checked again until it changes.  Surfaces written by the
+#         interpolation engine are stamped so they are loaded from their cell
+#         array without reading the raster back.  Cell arrays are resized when
+#         the grid is updated, and added cells of loaded contaminants are
+#         evaluated from the interpolation settings kept with them.
+#         Several surfaces are loaded as one stack with a row per contaminant,
+#         the rasters being read in worker processes when more than one is
+#         requested.
+#         COC_DATA is partitioned by contaminant through its COC_NAME index: the
+#         records of the contaminants being loaded are staged in a table, then
+#         replaced with one indexed DELETE and one Append, so the cost follows
+#         the rows of those contaminants rather than the size of COC_DATA.
+#         Projects whose PROJECT_ATTRIBUTES COC_BACKEND is COLUMNS keep contaminant
+#         values in the cache instead: a float32 .npy column per contaminant
+#         indexed by GRID_ID (NaN where there is no record), named by the
+#         contaminant's code in the COLUMNS.json name dictionary.  Columns are
+#         exported to the COC_DATA table layout for the Access HEA tool; COC_DATA
+#         is marked out of date in COLUMNS.json whenever a column changes, and
+#         the tools warn until it is exported again.
+#
+# Date Created: October 16, 2026
+#
+# ---------------------------------------------------------------------------
+
+import os
+import json
+import hashlib
+import numpy
+
+GRID_FOLDER = "GRID"
+GRID_DEF = "GRID_DEF.txt"
+GRID_ID = "GRID_ID.npy"
+GRID_ID_NEW = "GRID_ID_new.npy"
+TILE_CELLS = 1048576
+SURFACE_CHECKS = "SURFACE_CHECKS.json"
+REPORT_IDS = 20
+COC_BACKENDS = ("TABLE", "COLUMNS")
+COLUMN_FOLDER = "COC_COLUMNS"
+COLUMN_MANIFEST = "COLUMNS.json"
+FOOTPRINT_NULL = -2147483648
+COC_DATA_STALE = ("COC_DATA is out of date: contaminant values are stored in columns in the project cache. "
+                  "Run Export Contaminant Data before using COC_DATA or the Access HEA tool.")
+
+def grid_from_extent (extent, cellsize):
+    xmin, ymin, xmax, ymax = [float(v) for v in str(extent).split()[:4]]
+    cellsize = float(cellsize)
+    ncols = max(int(numpy.ceil((xmax - xmin) / cellsize - 1e-9)), 1)
+    nrows = max(int(numpy.ceil((ymax - ymin) / cellsize - 1e-9)), 1)
+    grid = {"xmin": xmin,
+            "ymax": ymin + nrows * cellsize,
+            "cellsize": cellsize,
+            "nrows": nrows,
+            "ncols": ncols}
+    return grid
+
+def grid_signature (grid):
+    return "%.6f %.6f %.6f %d %d" % (grid["xmin"], grid["ymax"], grid["cellsize"], grid["nrows"], grid["ncols"])
+
+def tile_rows (grid):
+    return max(1, TILE_CELLS // grid["ncols"])
+
+def iter_tiles (grid):
+    step = tile_rows(grid)
+    for r0 in range(0, grid["nrows"], step):
+        yield r0, min(r0 + step, grid["nrows"])
+
+def tile_count (grid):
+    return len(range(0, grid["nrows"], tile_rows(grid)))
+
+def grid_folder (geoDB):
+    import ARD_HEA_Tools
+    folder = os.path.join(ARD_HEA_Tools.cache_dir(geoDB), GRID_FOLDER)
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    return folder
+
+def create_array (path, dtype, shape):
+    return numpy.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+def open_array (path, mode="r"):
+    return numpy.load(path, mmap_mode=mode)
+
+def number_cells (geoDB, grid, mask=None):
+    path = os.path.join(grid_folder(geoDB), GRID_ID)
+    if "grid_id" in grid:
+        del grid["grid_id"]
+    grid_id = create_array(path, numpy.int32, (grid["nrows"], grid["ncols"]))
+    count = 0
+    for r0, r1 in iter_tiles(grid):
+        if mask is None:
+            band = numpy.ones((r1 - r0, grid["ncols"]), dtype=bool)
+        else:
+            band = numpy.asarray(mask[r0:r1], dtype=bool)
+        n = int(band.sum())
+        ids = numpy.zeros(band.shape, dtype=numpy.int32)
+        ids[band] = numpy.arange(count + 1, count + n + 1, dtype=numpy.int32)
+        grid_id[r0:r1] = ids
+        count = count + n
+    grid_id.flush()
+    del grid_id
+    grid["count"] = count
+    grid["max_id"] = count
+    save_grid(geoDB, grid)
+    grid["grid_id"] = open_array(path)
+    return grid
+
+def aligned_offset (old, grid):
+    # Row/col offset of the new grid within the old grid, or None when the cells do not line up
+    cellsize = grid["cellsize"]
+    if abs(old["cellsize"] - cellsize) > 1e-9 * cellsize:
+        return None
+    dr = (old["ymax"] - grid["ymax"]) / cellsize
+    dc = (grid["xmin"] - old["xmin"]) / cellsize
+    if abs(dr - round(dr)) > 1e-6 or abs(dc - round(dc)) > 1e-6:
+        return None
+    return int(round(dr)), int(round(dc))
+
+def offset_ids (old, offset, r0, r1, ncols):
+    # GRID_IDs of the old grid under rows r0:r1 of the new grid (0 where the old grid has no cell)
+    dr, dc = offset
+    ids = numpy.zeros((r1 - r0, ncols), dtype=numpy.int32)
+    or0 = max(r0 + dr, 0)
+    or1 = min(r1 + dr, old["nrows"])
+    oc0 = max(dc, 0)
+    oc1 = min(ncols + dc, old["ncols"])
+    if or0 < or1 and oc0 < oc1:
+        ids[or0 - dr - r0:or1 - dr - r0, oc0 - dc:oc1 - dc] = old["grid_id"][or0:or1, oc0:oc1]
+    return ids
+
+def renumber_cells (geoDB, grid, old, offset, mask=None):
+    # Cells in both grids keep their GRID_IDs and added cells are numbered after the highest
+    # old GRID_ID; returns the GRID_IDs of the added and removed cells.  The new GRID_ID map is
+    # staged beside the cached one and replaces it, with the grid definition, only when
+    # commit_cells is called once the tables have been updated
+    newPath = os.path.join(grid_folder(geoDB), GRID_ID_NEW)
+    if "grid_id" in grid:
+        del grid["grid_id"]
+    existed = numpy.zeros(max_id(old) + 1, dtype=bool)
+    for r0, r1 in iter_tiles(old):
+        existed[numpy.asarray(old["grid_id"][r0:r1]).ravel()] = True
+    existed[0] = False
+    survived = numpy.zeros(max_id(old) + 1, dtype=bool)
+    grid_id = create_array(newPath, numpy.int32, (grid["nrows"], grid["ncols"]))
+    nextId = max_id(old)
+    count = 0
+    added = []
+    for r0, r1 in iter_tiles(grid):
+        if mask is None:
+            band = numpy.ones((r1 - r0, grid["ncols"]), dtype=bool)
+        else:
+            band = numpy.asarray(mask[r0:r1], dtype=bool)
+        ids = offset_ids(old, offset, r0, r1, grid["ncols"])
+        ids[~band] = 0
+        survived[ids[ids > 0]] = True
+        new = band & (ids == 0)
+        n = int(new.sum())
+        ids[new] = numpy.arange(nextId + 1, nextId + n + 1, dtype=numpy.int32)
+        added.append(ids[new])
+        grid_id[r0:r1] = ids
+        nextId = nextId + n
+        count = count + int(band.sum())
+    grid_id.flush()
+    del grid_id
+    grid["count"] = count
+    grid["max_id"] = nextId
+    grid["grid_id"] = open_array(newPath)
+    removed = numpy.nonzero(existed & ~survived)[0].astype(numpy.int32)
+    return grid, numpy.concatenate(added), removed
+
+def commit_cells (geoDB, grid):
+    # Replace the cached GRID_ID map and grid definition with those staged by renumber_cells; the
+    # memory-mapped arrays are closed first so the files can be replaced
+    folder = grid_folder(geoDB)
+    path = os.path.join(folder, GRID_ID)
+    newPath = os.path.join(folder, GRID_ID_NEW)
+    del grid["grid_id"]
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(newPath, path)
+    save_grid(geoDB, grid)
+    grid["grid_id"] = open_array(path)
+    return grid
+
+def cell_count (grid):
+    return int(grid["count"])
+
+def max_id (grid):
+    return int(grid.get("max_id", grid["count"]))
+
+def tile_cells (grid, r0, r1):
+    band = numpy.asarray(grid["grid_id"][r0:r1])
+    rows, cols = numpy.nonzero(band)
+    ids = band[rows, cols]
+    return ids, rows + r0, cols
+
+def all_cells (grid):
+    parts = [tile_cells(grid, r0, r1) for r0, r1 in iter_tiles(grid)]
+    ids = numpy.concatenate([p[0] for p in parts])
+    rows = numpy.concatenate([p[1] for p in parts])
+    cols = numpy.concatenate([p[2] for p in parts])
+    order = numpy.argsort(ids, kind="mergesort")
+    return ids[order], rows[order], cols[order]
+
+def cell_centers (grid, rows, cols):
+    x = grid["xmin"] + (cols + 0.5) * grid["cellsize"]
+    y = grid["ymax"] - (rows + 0.5) * grid["cellsize"]
+    return x, y
+
+def cell_index (grid, x, y):
+    cols = numpy.floor((numpy.asarray(x) - grid["xmin"]) / grid["cellsize"]).astype(numpy.int64)
+    rows = numpy.floor((grid["ymax"] - numpy.asarray(y)) / grid["cellsize"]).astype(numpy.int64)
+    return rows, cols
+
+def lookup_ids (grid, rows, cols):
+    ids = numpy.zeros(len(rows), dtype=numpy.int32)
+    inside = (rows >= 0) & (rows < grid["nrows"]) & (cols >= 0) & (cols < grid["ncols"])
+    ids[inside] = grid["grid_id"][rows[inside], cols[inside]]
+    return ids
+
+def cell_array (geoDB, folder, name, grid, dtype=numpy.float64):
+    # Per-cell array indexed by GRID_ID (element 0 is unused), memory-mapped in the project cache
+    import ARD_HEA_Tools
+    folder = os.path.join(ARD_HEA_Tools.cache_dir(geoDB), folder)
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    values = create_array(os.path.join(folder, name + ".npy"), dtype, (max_id(grid) + 1,))
+    values[:] = 0
+    return values
+
+def open_cell_array (geoDB, folder, name, grid):
+    # Existing per-cell array for the current grid opened for update, None when there is none
+    import ARD_HEA_Tools
+    path = os.path.join(ARD_HEA_Tools.cache_dir(geoDB), folder, name + ".npy")
+    if not os.path.exists(path):
+        return None
+    values = open_array(path, "r+")
+    if values.shape != (max_id(grid) + 1,):
+        del values
+        return None
+    return values
+
+def circle_cells (grid, cx, cy, r, mask=None):
+    # GRID_IDs of cells (inside the mask) whose center lies within the circle
+    c0 = max(int(numpy.floor((cx - r - grid["xmin"]) / grid["cellsize"] - 0.5)), 0)
+    c1 = min(int(numpy.ceil((cx + r - grid["xmin"]) / grid["cellsize"] - 0.5)), grid["ncols"] - 1)
+    r0 = max(int(numpy.floor((grid["ymax"] - cy - r) / grid["cellsize"] - 0.5)), 0)
+    r1 = min(int(numpy.ceil((grid["ymax"] - cy + r) / grid["cellsize"] - 0.5)), grid["nrows"] - 1)
+    if c0 > c1 or r0 > r1:
+        return numpy.zeros(0, dtype=numpy.int32)
+    ids = numpy.asarray(grid["grid_id"][r0:r1 + 1, c0:c1 + 1])
+    if mask is not None:
+        ids = numpy.where(numpy.asarray(mask[r0:r1 + 1, c0:c1 + 1], dtype=bool), ids, 0)
+    rows, cols = numpy.nonzero(ids)
+    x, y = cell_centers(grid, rows + r0, cols + c0)
+    inside = (x - cx) ** 2 + (y - cy) ** 2 <= r * r
+    return ids[rows[inside], cols[inside]]
+
+def accumulate (cellValues, ids, values, statistic="SUM"):
+    keep = (ids > 0) & (ids < len(cellValues))
+    ids = ids[keep].astype(numpy.int64)
+    values = values[keep]
+    if len(ids) == 0:
+        return cellValues
+    order = numpy.argsort(ids, kind="mergesort")
+    ids = ids[order]
+    values = values[order]
+    starts = numpy.concatenate(([0], numpy.nonzero(numpy.diff(ids))[0] + 1))
+    uniq = ids[starts]
+    if statistic == "SUM":
+        cellValues[uniq] += numpy.add.reduceat(values, starts)
+    elif statistic == "MAX":
+        cellValues[uniq] = numpy.maximum(cellValues[uniq], numpy.maximum.reduceat(values, starts))
+    return cellValues
+
+def polygon_edges (maskLayer, spatialRef):
+    import arcpy
+    features = []
+    with arcpy.da.SearchCursor(maskLayer, ["SHAPE@"], spatial_reference=spatialRef) as rows:
+        for row in rows:
+            if row[0] is None:
+                continue
+            rings = []
+            for part in row[0]:
+                ring = []
+                for pnt in part:
+                    if pnt is None:
+                        # Interior ring separator
+                        rings.append(ring)
+                        ring = []
+                    else:
+                        ring.append((pnt.X, pnt.Y))
+                rings.append(ring)
+            edges = [ring_edges(ring) for ring in rings if len(ring) > 2]
+            if len(edges) > 0:
+                features.append(numpy.vstack(edges))
+    return features
+
+def ring_edges (ring):
+    start = numpy.asarray(ring, dtype=numpy.float64)
+    end = numpy.roll(start, -1, axis=0)
+    return numpy.hstack((start, end))
+
+def rasterize_edges (grid, edges, r0=0, r1=None):
+    # Even-odd scanline fill at cell centers: each edge crossing a row's center line
+    # toggles the cells whose centers lie to the right of the crossing.
+    if r1 is None:
+        r1 = grid["nrows"]
+    ncols = grid["ncols"]
+    nrows = r1 - r0
+    cellsize = grid["cellsize"]
+    v0 = (grid["ymax"] - edges[:, 1]) / cellsize - 0.5
+    v1 = (grid["ymax"] - edges[:, 3]) / cellsize - 0.5
+    first = numpy.maximum(numpy.ceil(numpy.minimum(v0, v1)), r0).astype(numpy.int64)
+    last = numpy.minimum(numpy.ceil(numpy.maximum(v0, v1)), r1).astype(numpy.int64)
+    counts = numpy.maximum(last - first, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return numpy.zeros((nrows, ncols), dtype=bool)
+    edge = numpy.repeat(numpy.arange(len(edges)), counts)
+    offset = numpy.arange(total) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    rows = first[edge] + offset
+    t = (rows - v0[edge]) / (v1[edge] - v0[edge])
+    x = edges[edge, 0] + t * (edges[edge, 2] - edges[edge, 0])
+    cols = numpy.floor((x - grid["xmin"]) / cellsize - 0.5).astype(numpy.int64) + 1
+    cols = numpy.clip(cols, 0, ncols)
+    toggles = numpy.bincount((rows - r0) * (ncols + 1) + cols, minlength=nrows * (ncols + 1))
+    inside = numpy.cumsum(toggles.reshape(nrows, ncols + 1), axis=1) % 2 == 1
+    return inside[:, :ncols]
+
+def rasterize_polygons (grid, features, r0=0, r1=None):
+    if r1 is None:
+        r1 = grid["nrows"]
+    mask = numpy.zeros((r1 - r0, grid["ncols"]), dtype=bool)
+    for edges in features:
+        mask |= rasterize_edges(grid, edges, r0, r1)
+    return mask
+
+def cell_mask (geoDB, grid, maskLayer, spatialRef):
+    return mask_cells(geoDB, grid, polygon_edges(maskLayer, spatialRef))
+
+def mask_cells (geoDB, grid, features):
+    # Cell mask of the polygon edges read by polygon_edges, cached per grid and polygons
+    import ARD_HEA_Tools
+    key = hashlib.md5(grid_signature(grid).encode("ascii"))
+    for edges in features:
+        key.update(numpy.ascontiguousarray(edges))
+    path = os.path.join(ARD_HEA_Tools.cache_dir(geoDB), "MASK_" + key.hexdigest() + ".npy")
+    if not os.path.exists(path):
+        mask = create_array(path, bool, (grid["nrows"], grid["ncols"]))
+        for r0, r1 in iter_tiles(grid):
+            mask[r0:r1] = rasterize_polygons(grid, features, r0, r1)
+        mask.flush()
+        del mask
+    return open_array(path)
+
+def write_band_raster (grid, band_values, outRaster, spatialRef, nodata):
+    import arcpy
+    cellsize = grid["cellsize"]
+    bands = list(iter_tiles(grid))
+    if len(bands) == 1:
+        lowerLeft = arcpy.Point(grid["xmin"], grid["ymax"] - grid["nrows"] * cellsize)
+        raster = arcpy.NumPyArrayToRaster(band_values(0, grid["nrows"]), lowerLeft, cellsize, cellsize, nodata)
+        raster.save(outRaster)
+        if spatialRef is not None and not outRaster.startswith("in_memory"):
+            arcpy.DefineProjection_management(outRaster, spatialRef)
+        return outRaster
+    # Large grids: write each tile and mosaic the tiles into the output raster
+    tileNames = []
+    for r0, r1 in bands:
+        values = band_values(r0, r1)
+        lowerLeft = arcpy.Point(grid["xmin"], grid["ymax"] - r1 * cellsize)
+        tileName = "in_memory\\grid_tile_" + str(len(tileNames))
+        arcpy.NumPyArrayToRaster(values, lowerLeft, cellsize, cellsize, nodata).save(tileName)
+        tileNames.append(tileName)
+    if values.dtype.kind == "f":
+        pixelType = "32_BIT_FLOAT"
+    else:
+        pixelType = "32_BIT_SIGNED"
+    arcpy.MosaicToNewRaster_management(";".join(tileNames), os.path.dirname(outRaster), os.path.basename(outRaster),
+                                       spatialRef, pixelType, cellsize, 1)
+    for tileName in tileNames:
+        arcpy.Delete_management(tileName)
+    return outRaster
+
+def write_mask_raster (grid, mask, outRaster, spatialRef):
+    def band_values (r0, r1):
+        return (numpy.asarray(mask[r0:r1]) != 0).astype(numpy.int32)
+    return write_band_raster(grid, band_values, outRaster, spatialRef, 0)
+
+def write_cell_raster (grid, cellValues, outRaster, spatialRef, nodata=-9999.0):
+    # cellValues is indexed by GRID_ID; cells outside the grid are written as NoData
+    def band_values (r0, r1):
+        ids = numpy.asarray(grid["grid_id"][r0:r1])
+        values = numpy.asarray(cellValues[ids], dtype=numpy.float32)
+        values[(ids == 0) | ~numpy.isfinite(values)] = nodata
+        return values
+    return write_band_raster(grid, band_values, outRaster, spatialRef, nodata)
+
+def read_cell_raster (grid, inRaster, cellValues):
+    # Fill cellValues (indexed by GRID_ID) with the raster value at each cell center, as Extract Values to
+    # Points does, reading the raster in bands of grid rows; NoData and cells off the raster are NaN
+    import arcpy
+    desc = arcpy.Describe(inRaster)
+    rx, ry = float(desc.Extent.XMin), float(desc.Extent.YMax)
+    rw, rh = float(desc.meanCellWidth), float(desc.meanCellHeight)
+    rcols, rrows = int(desc.width), int(desc.height)
+    integer = arcpy.Raster(inRaster).isInteger
+    nodata = numpy.iinfo(numpy.int32).min if integer else numpy.nan
+    cellValues[:] = numpy.nan
+    total = 0
+    for r0, r1 in iter_tiles(grid):
+        ids, rows, cols = tile_cells(grid, r0, r1)
+        x, y = cell_centers(grid, rows, cols)
+        rc = numpy.floor((x - rx) / rw).astype(numpy.int64)
+        rr = numpy.floor((ry - y) / rh).astype(numpy.int64)
+        inside = (rc >= 0) & (rc < rcols) & (rr >= 0) & (rr < rrows)
+        if not inside.any():
+            continue
+        ids, rc, rr = ids[inside], rc[inside], rr[inside]
+        top, bottom = int(rr.min()), int(rr.max()) + 1
+        left, right = int(rc.min()), int(rc.max()) + 1
+        lowerLeft = arcpy.Point(rx + left * rw, ry - bottom * rh)
+        band = arcpy.RasterToNumPyArray(inRaster, lowerLeft, right - left, bottom - top, nodata)
+        values = band[rr - top, rc - left].astype(numpy.float64)
+        if integer:
+            values[band[rr - top, rc - left] == nodata] = numpy.nan
+        cellValues[ids] = values
+        total = total + int(numpy.isfinite(values).sum())
+    return total
+
+def grid_checksum (grid):
+    # Key identifying the grid geometry and its GRID_ID numbering
+    checksum = hashlib.md5(grid_signature(grid).encode("ascii"))
+    for r0, r1 in iter_tiles(grid):
+        checksum.update(numpy.ascontiguousarray(grid["grid_id"][r0:r1], dtype=numpy.int32))
+    return checksum.hexdigest()
+
+def array_checksum (values):
+    checksum = hashlib.md5()
+    for i in range(0, len(values), TILE_CELLS):
+        checksum.update(numpy.ascontiguousarray(values[i:i + TILE_CELLS], dtype=numpy.float32))
+    return checksum.hexdigest()
+
+def raster_geometry (inRaster):
+    import arcpy
+    desc = arcpy.Describe(inRaster)
+    return {"path": desc.catalogPath, "xmin": float(desc.Extent.XMin), "ymin": float(desc.Extent.YMin),
+            "xmax": float(desc.Extent.XMax), "ymax": float(desc.Extent.YMax),
+            "cellwidth": float(desc.meanCellWidth), "cellheight": float(desc.meanCellHeight),
+            "ncols": int(desc.width), "nrows": int(desc.height), "integer": bool(arcpy.Raster(inRaster).isInteger),
+            "spatialref": desc.spatialReference.name}
+
+def raster_fingerprint (geometry):
+    return "%s %.6f %.6f %.6f %.6f %d %d" % (geometry["path"], geometry["xmin"], geometry["ymax"], geometry["cellwidth"],
+                                            geometry["cellheight"], geometry["ncols"], geometry["nrows"])
+
+def source_time (path):
+    # Modification time of the file or folder holding a dataset: the nearest existing path up from the catalog
+    # path, and for a folder (a geodatabase or grid) the latest time of the files in it, so a raster in a
+    # geodatabase counts as changed after any edit of the geodatabase
+    while path and not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    if not os.path.exists(path):
+        return 0.0
+    if not os.path.isdir(path):
+        return os.path.getmtime(path)
+    times = [os.path.getmtime(path)]
+    for name in os.listdir(path):
+        times.append(os.path.getmtime(os.path.join(path, name)))
+    return max(times)
+
+def surface_key (geometry, gridKey):
+    # Key of a surface check taken before the raster is read: catalog path, modification time, extent, cell
+    # size and spatial reference of the raster, and the grid checksum
+    return "%s %.3f %.6f %.6f %.6f %.6f %.6f %.6f %s %s" % (geometry["path"], source_time(geometry["path"]),
+                                                         geometry["xmin"], geometry["ymin"], geometry["xmax"],
+                                                         geometry["ymax"], geometry["cellwidth"],
+                                                         geometry["cellheight"], geometry["spatialref"], gridKey)
+
+def surface_stamp_path (geoDB, name):
+    import ARD_HEA_Tools
+    return os.path.join(ARD_HEA_Tools.cache_dir(geoDB), "SURFACES", name + ".json")
+
+def surface_settings_path (geoDB, name):
+    # Path, without extension, of the interpolation settings and samples kept for a surface
+    import ARD_HEA_Tools
+    return os.path.join(ARD_HEA_Tools.cache_dir(geoDB), "SURFACES", name + "_SETTINGS")
+
+def clear_surface (geoDB, name):
+    # Remove the cell array, stamp and interpolation settings of a surface
+    import ARD_HEA_Tools
+    base = os.path.join(ARD_HEA_Tools.cache_dir(geoDB), "SURFACES", name)
+    for path in (base + ".npy", surface_stamp_path(geoDB, name), surface_settings_path(geoDB, name) + ".json",
+                 surface_settings_path(geoDB, name) + ".npz"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def clear_surfaces (geoDB):
+    # Remove the cell arrays, stamps and interpolation settings of every surface
+    import ARD_HEA_Tools
+    folder = os.path.join(ARD_HEA_Tools.cache_dir(geoDB), "SURFACES")
+    if not os.path.exists(folder):
+        return
+    for name in os.listdir(folder):
+        os.remove(os.path.join(folder, name))
+
+def extend_cell_array (geoDB, folder, name, grid, cellIds, values, removedIds=None):
+    # Resize an existing per-cell array to the grid, setting the added cells to values and the removed cells to
+    # NaN; returns the array opened for update, None when there is none
+    import ARD_HEA_Tools
+    path = os.path.join(ARD_HEA_Tools.cache_dir(geoDB), folder, name + ".npy")
+    if not os.path.exists(path):
+        return None
+    size = max_id(grid) + 1
+    old = open_array(path)
+    if len(old) != size:
+        newPath = os.path.join(ARD_HEA_Tools.cache_dir(geoDB), folder, "NEW.npy")
+        resized = create_array(newPath, old.dtype, (size,))
+        resized[:] = numpy.nan
+        count = min(len(old), size)
+        for i in range(0, count, TILE_CELLS):
+            resized[i:min(i + TILE_CELLS, count)] = old[i:min(i + TILE_CELLS, count)]
+        del resized, old
+        os.remove(path)
+        os.rename(newPath, path)
+    else:
+        del old
+    cellValues = open_array(path, "r+")
+    if removedIds is not None and len(removedIds) > 0:
+        removedIds = numpy.asarray(removedIds, dtype=numpy.int64)
+        cellValues[removedIds[removedIds < size]] = numpy.nan
+    cellValues[numpy.asarray(cellIds, dtype=numpy.int64)] = values
+    return cellValues
+
+def write_surface_raster (geoDB, grid, cellValues, outRaster, spatialRef, nodata=-9999.0):
+    # write_cell_raster for a surface kept as a SURFACES cell array of the same name; the stamp lets
+    # check_surface load the surface from the cell array while neither has changed
+    write_cell_raster(grid, cellValues, outRaster, spatialRef, nodata)
+    stamp = {"grid": grid_checksum(grid), "raster": raster_fingerprint(raster_geometry(outRaster)),
+             "values": array_checksum(cellValues)}
+    f = open(surface_stamp_path(geoDB, os.path.basename(outRaster)), "w")
+    f.write(json.dumps(stamp))
+    f.close()
+    return outRaster
+
+def surface_report (grid, geometry):
+    # Cell size, extent and snap differences of a raster from the grid
+    cellsize = grid["cellsize"]
+    gxmax = grid["xmin"] + grid["ncols"] * cellsize
+    gymin = grid["ymax"] - grid["nrows"] * cellsize
+    dx = (geometry["xmin"] - grid["xmin"]) / cellsize
+    dy = (grid["ymax"] - geometry["ymax"]) / cellsize
+    report = {"cellsize": geometry["cellwidth"], "grid_cellsize": cellsize,
+              "extent": [geometry["xmin"], geometry["ymin"], geometry["xmax"], geometry["ymax"]],
+              "grid_extent": [grid["xmin"], gymin, gxmax, grid["ymax"]],
+              "extent_diff": [geometry["xmin"] - grid["xmin"], geometry["ymin"] - gymin,
+                              geometry["xmax"] - gxmax, geometry["ymax"] - grid["ymax"]],
+              "snap": [(dx - round(dx)) * cellsize, (dy - round(dy)) * cellsize],
+              "grid_cells": cell_count(grid), "surface_cells": 0, "missing": 0, "extra": 0,
+              "missing_ids": [], "source": "raster", "checksum": None, "path": geometry["path"]}
+    report["snapped"] = (abs(geometry["cellwidth"] - cellsize) <= 1e-6 * cellsize and
+                         abs(geometry["cellheight"] - cellsize) <= 1e-6 * cellsize and
+                         abs(dx - round(dx)) < 1e-3 and abs(dy - round(dy)) < 1e-3)
+    return report
+
+def finish_report (report, grid, cellValues):
+    # Grid cells without a value and the verdict
+    missing = []
+    count = 0
+    for r0, r1 in iter_tiles(grid):
+        ids = tile_cells(grid, r0, r1)[0]
+        lost = ids[~numpy.isfinite(numpy.asarray(cellValues[ids]))]
+        count = count + len(lost)
+        if len(missing) < REPORT_IDS:
+            missing.extend([int(v) for v in numpy.sort(lost)[:REPORT_IDS - len(missing)]])
+    report["missing"] = count
+    report["missing_ids"] = sorted(missing)
+    report["aligned"] = bool(report["snapped"] and count == 0 and report["extra"] == 0)
+    return report
+
+def load_surface_checks (geoDB):
+    path = os.path.join(grid_folder(geoDB), SURFACE_CHECKS)
+    checks = {}
+    if os.path.exists(path):
+        f = open(path, "r")
+        checks = json.loads(f.read())
+        f.close()
+    # Reports cached before they were keyed by raster path are dropped
+    for key in list(checks.keys()):
+        if "path" not in checks[key]:
+            del checks[key]
+    return checks
+
+def save_surface_checks (geoDB, checks):
+    # Reports of rasters that no longer exist are dropped
+    import arcpy
+    for key in list(checks.keys()):
+        if not arcpy.Exists(checks[key]["path"]):
+            del checks[key]
+    f = open(os.path.join(grid_folder(geoDB), SURFACE_CHECKS), "w")
+    f.write(json.dumps(checks))
+    f.close()
+
+def read_snapped_raster (grid, inRaster, geometry, cellValues):
+    # Fill cellValues (indexed by GRID_ID) from a raster snapped to the grid, read in bands of raster rows mapped
+    # onto the GRID_ID map.  Returns the valid raster cells and those off the grid
+    import arcpy
+    cellsize = grid["cellsize"]
+    row0 = int(round((grid["ymax"] - geometry["ymax"]) / cellsize))
+    col0 = int(round((geometry["xmin"] - grid["xmin"]) / cellsize))
+    nodata = numpy.iinfo(numpy.int32).min if geometry["integer"] else numpy.nan
+    cellValues[:] = numpy.nan
+    total, extra = 0, 0
+    step = max(1, TILE_CELLS // geometry["ncols"])
+    c0, c1 = max(col0, 0), min(col0 + geometry["ncols"], grid["ncols"])
+    for s0 in range(0, geometry["nrows"], step):
+        s1 = min(s0 + step, geometry["nrows"])
+        lowerLeft = arcpy.Point(geometry["xmin"], geometry["ymax"] - s1 * cellsize)
+        band = arcpy.RasterToNumPyArray(inRaster, lowerLeft, geometry["ncols"], s1 - s0, nodata)
+        values = band.astype(numpy.float64)
+        if geometry["integer"]:
+            values[band == nodata] = numpy.nan
+        valid = numpy.isfinite(values)
+        total = total + int(valid.sum())
+        ids = numpy.zeros(band.shape, dtype=numpy.int32)
+        g0, g1 = max(row0 + s0, 0), min(row0 + s1, grid["nrows"])
+        if g0 < g1 and c0 < c1:
+            ids[g0 - row0 - s0:g1 - row0 - s0, c0 - col0:c1 - col0] = grid["grid_id"][g0:g1, c0:c1]
+        extra = extra + int((valid & (ids == 0)).sum())
+        cellValues[ids[ids > 0]] = values[ids > 0]
+    return total, extra
+
+def check_surface (geoDB, grid, inRaster, cellValues, gridKey=None, checks=None):
+    # Fill cellValues (indexed by GRID_ID) from a surface raster and compare its valid cells with the grid
+    # cells.  Returns a report with the verdict, the cell counts, missing GRID_IDs, valid raster cells off the
+    # grid (extra) and the cell size, extent and snap differences.  Reports are cached by surface_key, so a
+    # raster already checked is read only if it matches the grid, and not checked again.  When a checks dict
+    # is passed, reports are looked up and added there and the caller saves them
+    if gridKey is None:
+        gridKey = grid_checksum(grid)
+    geometry = raster_geometry(inRaster)
+    report = surface_report(grid, geometry)
+    # Surfaces written by the engine: values from the stamped cell array
+    stampPath = surface_stamp_path(geoDB, os.path.basename(geometry["path"]))
+    if os.path.exists(stampPath):
+        f = open(stampPath, "r")
+        stamp = json.loads(f.read())
+        f.close()
+        values = None
+        if stamp["grid"] == gridKey and stamp["raster"] == raster_fingerprint(geometry):
+            values = open_cell_array(geoDB, "SURFACES", os.path.basename(geometry["path"]), grid)
+        if values is not None and array_checksum(values) == stamp["values"]:
+            for i in range(0, len(values), TILE_CELLS):
+                cellValues[i:i + TILE_CELLS] = values[i:i + TILE_CELLS]
+            del values
+            report["source"] = "engine"
+            report["checksum"] = stamp["values"]
+            report = finish_report(report, grid, cellValues)
+            report["surface_cells"] = report["grid_cells"] - report["missing"]
+            return report
+    # Reports of a surface already checked against this grid are taken from the cache
+    save = checks is None
+    if save:
+        checks = load_surface_checks(geoDB)
+    key = surface_key(geometry, gridKey)
+    if key in checks:
+        report = checks[key]
+        if report["aligned"]:
+            read_snapped_raster(grid, inRaster, geometry, cellValues)
+        return report
+    if not report["snapped"]:
+        # Different cell size or origin: sample at the cell centers, raster cells off the grid are not counted
+        report["surface_cells"] = read_cell_raster(grid, inRaster, cellValues)
+        report["extra"] = None
+    else:
+        report["surface_cells"], report["extra"] = read_snapped_raster(grid, inRaster, geometry, cellValues)
+    report = finish_report(report, grid, cellValues)
+    report["key"] = key
+    cache_report(checks, report)
+    if save:
+        save_surface_checks(geoDB, checks)
+    return report
+
+def cache_report (checks, report):
+    # A new report replaces those of earlier versions of the raster
+    for key in list(checks.keys()):
+        if checks[key]["path"] == report["path"]:
+            del checks[key]
+    checks[report["key"]] = report
+
+def cell_stack (geoDB, folder, name, grid, count, dtype=numpy.float32):
+    # count per-cell arrays in one memory-mapped array, a row per surface indexed by GRID_ID
+    import ARD_HEA_Tools
+    folder = os.path.join(ARD_HEA_Tools.cache_dir(geoDB), folder)
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    values = create_array(os.path.join(folder, name + ".npy"), dtype, (count, max_id(grid) + 1))
+    values[:] = numpy.nan
+    return values
+
+def surface_task (task):
+    # Process pool worker: check_surface of one raster into its row of the memory-mapped stack
+    geoDB, stackPath, j, inRaster, gridKey, checks = task
+    grid = load_grid(geoDB)
+    stack = open_array(stackPath, "r+")
+    report = check_surface(geoDB, grid, inRaster, stack[j], gridKey, checks)
+    stack.flush()
+    del stack
+    return report
+
+def check_surfaces (geoDB, grid, rasters, stack, processes=1, gridKey=None):
+    # check_surface for each raster into its row of stack, returning the reports in order.  With several
+    # processes the rasters are read in worker processes (arcpy is not thread safe), each writing its row of
+    # the memory-mapped stack, and the new reports are merged into the cache here
+    if gridKey is None:
+        gridKey = grid_checksum(grid)
+    checks = load_surface_checks(geoDB)
+    processes = max(1, min(processes, len(rasters)))
+    if processes == 1:
+        reports = [check_surface(geoDB, grid, rasters[j], stack[j], gridKey, checks) for j in range(len(rasters))]
+    else:
+        import ARD_HEA_Tools
+        stack.flush()
+        tasks = [(geoDB, stack.filename, j, rasters[j], gridKey, checks) for j in range(len(rasters))]
+        pool = ARD_HEA_Tools.process_pool(processes)
+        try:
+            reports = pool.map(surface_task, tasks)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+        for report in reports:
+            if "key" in report:
+                cache_report(checks, report)
+    save_surface_checks(geoDB, checks)
+    return reports
+
+def report_messages (report):
+    # Lines describing a surface that does not match the grid
+    lines = ["surface cells: " + str(report["surface_cells"]) + ", analysis grid: " + str(report["grid_cells"])]
+    if abs(report["cellsize"] - report["grid_cellsize"]) > 1e-6 * report["grid_cellsize"]:
+        lines.append("cell size: " + str(report["cellsize"]) + ", analysis grid: " + str(report["grid_cellsize"]))
+    if max([abs(v) for v in report["extent_diff"]]) > 1e-6 * report["grid_cellsize"]:
+        lines.append("extent differs from analysis grid by (xmin, ymin, xmax, ymax): " +
+                     ", ".join(["%.4f" % v for v in report["extent_diff"]]))
+    if max([abs(v) for v in report["snap"]]) > 1e-6 * report["grid_cellsize"]:
+        lines.append("cells are offset from the analysis grid cells by (x, y): " +
+                     ", ".join(["%.4f" % v for v in report["snap"]]))
+    if report["missing"] > 0:
+        lines.append(str(report["missing"]) + " analysis grid cells have no value, GRID_IDs " +
+                     ", ".join([str(v) for v in report["missing_ids"]]) +
+                     (" ..." if report["missing"] > len(report["missing_ids"]) else ""))
+    if report["extra"]:
+        lines.append(str(report["extra"]) + " surface cells lie outside the analysis grid")
+    return lines
+
+def write_points (grid, outPoints, spatialRef):
+    import arcpy
+    tmpPoints = "in_memory\\grid_points"
+    if arcpy.Exists(outPoints):
+        arcpy.Delete_management(outPoints)
+    for r0, r1 in iter_tiles(grid):
+        ids, rows, cols = tile_cells(grid, r0, r1)
+        if len(ids) == 0:
+            continue
+        x, y = cell_centers(grid, rows, cols)
+        pnts = numpy.zeros(len(ids), dtype=[("GRID_ID", numpy.int32), ("PNT_X", numpy.float64), ("PNT_Y", numpy.float64)])
+        pnts["GRID_ID"] = ids
+        pnts["PNT_X"] = x
+        pnts["PNT_Y"] = y
+        if not arcpy.Exists(outPoints):
+            arcpy.da.NumPyArrayToFeatureClass(pnts, outPoints, ("PNT_X", "PNT_Y"), spatialRef)
+        else:
+            arcpy.da.NumPyArrayToFeatureClass(pnts, tmpPoints, ("PNT_X", "PNT_Y"), spatialRef)
+            arcpy.Append_management(tmpPoints, outPoints, "NO_TEST")
+            arcpy.Delete_management(tmpPoints)
+    extra = [fld.name for fld in arcpy.ListFields(outPoints) if fld.name in ("PNT_X", "PNT_Y")]
+    if len(extra) > 0:
+        arcpy.DeleteField_management(outPoints, ";".join(extra))
+
+def seed_site_attributes (grid, siteTable, cellIds=None):
+    import ARD_HEA_Tools
+    depthFld = ARD_HEA_Tools.depth_field(siteTable)
+    fields = ["HABITAT_ID", "CONDITION_ID", "REMEDIATION_ID", "SUBSITE_ID", depthFld]
+    total = 0
+    seconds = 0.0
+    if cellIds is None:
+        chunks = (tile_cells(grid, r0, r1)[0] for r0, r1 in iter_tiles(grid))
+    else:
+        chunks = (cellIds[i:i + TILE_CELLS] for i in range(0, len(cellIds), TILE_CELLS))
+    for ids in chunks:
+        seed = numpy.zeros(len(ids), dtype=[("GRID_ID", numpy.int32)] + [(fld, "S2") for fld in fields])
+        seed["GRID_ID"] = ids
+        for fld in fields:
+            seed[fld] = "NA"
+        seconds = seconds + ARD_HEA_Tools.append_array(siteTable, seed)
+        total = total + len(seed)
+    return total, seconds
+
+def extend_coc_data (geoDB, grid, cellIds, COCTable, COCInvent, spatialRef, removedIds=None):
+    # Evaluate the surfaces of the loaded contaminants at added cells with the settings and samples they were
+    # interpolated with, or sample the surface raster when none were kept, and append the values to COC_DATA or
+    # set them in the contaminant columns; returns (contaminant, added cells without a value) for every loaded
+    # contaminant missing values, including those with neither settings nor a raster
+    import arcpy
+    import ARD_HEA_Tools
+    import ARD_HEA_Interp
+    cellIds = numpy.asarray(cellIds, dtype=numpy.int64)
+    columns = coc_backend(geoDB) == "COLUMNS"
+    if columns:
+        loaded = set([name for name in load_columns(geoDB)["names"] if open_coc_column(geoDB, name) is not None])
+    with arcpy.da.SearchCursor(COCInvent, ["COC_NAME", "INTERP_LAYER_NAME"]) as cursor:
+        inventory = [(row[0], row[1]) for row in cursor]
+    uncovered = []
+    sampled = []
+    for coc, layer in inventory:
+        if coc is None or len(cellIds) == 0:
+            continue
+        if not (coc in loaded if columns else coc_loaded(COCTable, coc)):
+            continue
+        values = None
+        if layer:
+            values = ARD_HEA_Interp.extend_surface(geoDB, grid, layer, cellIds, removedIds, spatialRef)
+            if values is None and arcpy.Exists(geoDB + "\\" + layer):
+                sampled.append((coc, geoDB + "\\" + layer))
+                continue
+        if values is None:
+            values = numpy.empty(len(cellIds))
+            values.fill(numpy.nan)
+        store_added_cells(geoDB, cellIds, COCTable, coc, values, columns, uncovered)
+    if len(sampled) == 0:
+        return uncovered
+    # Surfaces without settings: sample the rasters at the added cell centers
+    from arcpy.sa import ExtractMultiValuesToPoints
+    pntsTmp = "in_memory\\added_cells"
+    rows, cols = cell_index_of(grid, cellIds)
+    x, y = cell_centers(grid, rows, cols)
+    pnts = numpy.zeros(len(cellIds), dtype=[("GRID_ID", numpy.int32), ("PNT_X", numpy.float64), ("PNT_Y", numpy.float64)])
+    pnts["GRID_ID"] = cellIds
+    pnts["PNT_X"] = x
+    pnts["PNT_Y"] = y
+    if arcpy.Exists(pntsTmp):
+        arcpy.Delete_management(pntsTmp)
+    arcpy.da.NumPyArrayToFeatureClass(pnts, pntsTmp, ("PNT_X", "PNT_Y"), spatialRef)
+    ExtractMultiValuesToPoints(pntsTmp, [[surface, "V" + str(i)] for i, (coc, surface) in enumerate(sampled)], "NONE")
+    values = arcpy.da.FeatureClassToNumPyArray(pntsTmp, ["GRID_ID"] + ["V" + str(i) for i in range(len(sampled))], null_value=-9999)
+    arcpy.Delete_management(pntsTmp)
+    for i, (coc, surface) in enumerate(sampled):
+        store_added_cells(geoDB, values["GRID_ID"], COCTable, coc, values["V" + str(i)], columns, uncovered)
+    return uncovered
+
+def coc_loaded (COCTable, COCName):
+    # True when COC_DATA holds records of the contaminant, looked up through the COC_NAME index
+    import arcpy
+    with arcpy.da.SearchCursor(COCTable, ["COC_NAME"], coc_clause(COCTable, [COCName])) as cursor:
+        for row in cursor:
+            return True
+    return False
+
+def store_added_cells (geoDB, cellIds, COCTable, COCName, values, columns, uncovered):
+    # Append the values of added cells to COC_DATA or set them in the contaminant column, noting the cells
+    # without a value in uncovered
+    import ARD_HEA_Tools
+    values = numpy.asarray(values, dtype=numpy.float64)
+    keep = numpy.isfinite(values)
+    keep[keep] = values[keep] >= 0
+    if not keep.all():
+        uncovered.append((COCName, int(len(keep) - keep.sum())))
+    if columns:
+        set_column_cells(geoDB, COCName, cellIds, values)
+        return
+    rows = numpy.zeros(int(keep.sum()), dtype=[("GRID_ID", numpy.int32), ("COC_NAME", "S20"), ("COC_VALUE", numpy.float32)])
+    rows["GRID_ID"] = numpy.asarray(cellIds)[keep]
+    rows["COC_NAME"] = COCName
+    rows["COC_VALUE"] = values[keep]
+    if len(rows) > 0:
+        ARD_HEA_Tools.append_array(COCTable, rows)
+
+def sql_string (value):
+    return "'" + value.replace("'", "''") + "'"
+
+def coc_clause (COCTable, COCNames):
+    # Where clause selecting the records of contaminants, names quoted for SQL
+    import arcpy
+    field = arcpy.AddFieldDelimiters(COCTable, "COC_NAME")
+    return field + " IN (" + ", ".join([sql_string(name) for name in COCNames]) + ")"
+
+def staging_table (COCTable, name="COC_DATA_NEW"):
+    # Empty table with the COC_DATA fields
+    import arcpy
+    geoDB = os.path.dirname(COCTable)
+    if arcpy.Exists(geoDB + "\\" + name):
+        arcpy.Delete_management(geoDB + "\\" + name)
+    arcpy.CreateTable_management(geoDB, name, COCTable)
+    return geoDB + "\\" + name
+
+def replace_coc_records (COCTable, COCNames, newTable):
+    # Replace the COC_DATA records of contaminants with the records of newTable: one DELETE through the
+    # COC_NAME index and one Append, leaving the records of other contaminants untouched
+    import arcpy
+    view = "coc_data_replace"
+    if arcpy.Exists(view):
+        arcpy.Delete_management(view)
+    arcpy.MakeTableView_management(COCTable, view, coc_clause(COCTable, COCNames))
+    arcpy.DeleteRows_management(view)
+    arcpy.Delete_management(view)
+    arcpy.Append_management(newTable, COCTable, "NO_TEST")
+
+def coc_rows (ids, COCName, values, footprints=None):
+    fields = [("GRID_ID", numpy.int32), ("COC_NAME", "S20"), ("COC_VALUE", numpy.float32)]
+    if footprints is not None:
+        fields.append(("FOOTPRINT_ID", numpy.int32))
+    rows = numpy.zeros(len(ids), dtype=fields)
+    rows["GRID_ID"] = ids
+    rows["COC_NAME"] = COCName
+    rows["COC_VALUE"] = values
+    if footprints is not None:
+        rows["FOOTPRINT_ID"] = footprints
+    return rows
+
+def write_coc_data (grid, cellValues, COCTable, COCName):
+    # Replace the COC_DATA records of a contaminant with cell values (indexed by GRID_ID); cells
+    # without a value or with a negative value are skipped, as when surfaces are loaded
+    return write_coc_stack(numpy.asarray(cellValues).reshape(1, -1), COCTable, [COCName])
+
+def write_coc_stack (stack, COCTable, COCNames):
+    # Replace the records of several contaminants with the rows of a cell stack (a row per name, indexed by
+    # GRID_ID) in the project's COC data backend
+    import time
+    geoDB = os.path.dirname(COCTable)
+    if coc_backend(geoDB) == "COLUMNS":
+        start = time.time()
+        return write_coc_columns(geoDB, stack, COCNames), time.time() - start
+    return write_coc_table(stack, COCTable, COCNames)
+
+def write_coc_table (stack, COCTable, COCNames, footprints=None):
+    # Replace the COC_DATA records of several contaminants with the rows of a cell stack, or a list of
+    # per-cell arrays, with optional FOOTPRINT_ID arrays alongside.  The records are staged in a new table
+    # and replace the old ones only when all are written, so a failed load leaves COC_DATA unchanged.
+    # Values are extracted for all contaminants at once per tile; cells without a value or negative are skipped
+    import arcpy
+    import time
+    import ARD_HEA_Tools
+    start = time.time()
+    newTable = staging_table(COCTable)
+    total = 0
+    for i in range(1, len(stack[0]), TILE_CELLS):
+        values = numpy.vstack([numpy.asarray(column[i:i + TILE_CELLS]) for column in stack])
+        keep = numpy.isfinite(values)
+        keep[keep] = values[keep] >= 0
+        for j in range(len(COCNames)):
+            ids = numpy.nonzero(keep[j])[0]
+            if footprints is not None and footprints[j] is not None:
+                marked = numpy.asarray(footprints[j][i:i + TILE_CELLS])[ids]
+                has = marked != FOOTPRINT_NULL
+                if has.any():
+                    ARD_HEA_Tools.append_array(newTable, coc_rows(ids[has] + i, COCNames[j], values[j][ids[has]], marked[has]))
+                ids = ids[~has]
+            if len(ids) > 0:
+                ARD_HEA_Tools.append_array(newTable, coc_rows(ids + i, COCNames[j], values[j][ids]))
+            total = total + int(keep[j].sum())
+    replace_coc_records(COCTable, COCNames, newTable)
+    arcpy.Delete_management(newTable)
+    return total, time.time() - start
+
+def update_coc_data (cellValues, cellIds, COCTable, COCName):
+    # Rewrite the COC_DATA records of a contaminant for the given GRID_IDs only: records are updated in
+    # place, removed when the cell no longer has a value and appended for cells that gained one
+    import arcpy
+    import time
+    import ARD_HEA_Tools
+    start = time.time()
+    if coc_backend(os.path.dirname(COCTable)) == "COLUMNS":
+        return update_coc_column(os.path.dirname(COCTable), cellValues, cellIds, COCName), time.time() - start
+    pending = set([int(v) for v in cellIds])
+    with arcpy.da.UpdateCursor(COCTable, ["GRID_ID", "COC_VALUE"], where_clause=coc_clause(COCTable, [COCName])) as cursor:
+        for row in cursor:
+            if row[0] in pending:
+                pending.discard(row[0])
+                value = float(cellValues[row[0]])
+                if numpy.isfinite(value) and value >= 0:
+                    row[1] = value
+                    cursor.updateRow(row)
+                else:
+                    cursor.deleteRow()
+    total = len(cellIds) - len(pending)
+    ids = numpy.array(sorted(pending), dtype=numpy.int64)
+    if len(ids) > 0:
+        values = numpy.asarray(cellValues)[ids]
+        keep = numpy.isfinite(values)
+        keep[keep] = values[keep] >= 0
+        if keep.any():
+            ARD_HEA_Tools.append_array(COCTable, coc_rows(ids[keep], COCName, values[keep]))
+        total = total + int(keep.sum())
+    return total, time.time() - start
+
+def replace_coc_table (inTable, COCTable, COCName):
+    # Replace the records of a contaminant with the records of a table with the COC_DATA fields
+    import arcpy
+    geoDB = os.path.dirname(COCTable)
+    if coc_backend(geoDB) == "COLUMNS":
+        records = arcpy.da.TableToNumPyArray(inTable, ["GRID_ID", "COC_VALUE"])
+        size = load_columns(geoDB)["size"]
+        if len(records) > 0:
+            size = max(size, int(records["GRID_ID"].max()) + 1)
+        cellValues = numpy.empty(size, dtype=numpy.float32)
+        cellValues[:] = numpy.nan
+        cellValues[records["GRID_ID"]] = records["COC_VALUE"]
+        return write_coc_columns(geoDB, cellValues.reshape(1, -1), [COCName])
+    replace_coc_records(COCTable, [COCName], inTable)
+    return int(arcpy.GetCount_management(inTable).getOutput(0))
+
+def coc_backend (geoDB):
+    # COC_BACKEND of PROJECT_ATTRIBUTES: TABLE (COC_DATA) when the field is missing or empty, or COLUMNS
+    import arcpy
+    prjAttr = geoDB + "\\PROJECT_ATTRIBUTES"
+    backend = "TABLE"
+    if arcpy.Exists(prjAttr) and len(arcpy.ListFields(prjAttr, "COC_BACKEND")) > 0:
+        with arcpy.da.SearchCursor(prjAttr, ["COC_BACKEND"]) as cursor:
+            for row in cursor:
+                if row[0]:
+                    backend = str(row[0]).upper()
+    if backend not in COC_BACKENDS:
+        backend = "TABLE"
+    return backend
+
+def set_coc_backend (geoDB, backend):
+    import arcpy
+    prjAttr = geoDB + "\\PROJECT_ATTRIBUTES"
+    if len(arcpy.ListFields(prjAttr, "COC_BACKEND")) == 0:
+        arcpy.AddField_management(prjAttr, "COC_BACKEND", "TEXT", "", "", "10", "", "NULLABLE", "NON_REQUIRED", "")
+    with arcpy.da.UpdateCursor(prjAttr, ["COC_BACKEND"]) as cursor:
+        for row in cursor:
+            row[0] = backend
+            cursor.updateRow(row)
+
+def column_folder (geoDB):
+    import ARD_HEA_Tools
+    folder = os.path.join(ARD_HEA_Tools.cache_dir(geoDB), COLUMN_FOLDER)
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    return folder
+
+def load_columns (geoDB):
+    # Column store manifest: {"names": [COC_NAME by code], "footprints": [codes with a FOOTPRINT_ID column],
+    # "size": column length, "stale": columns changed since COC_DATA was exported}
+    path = os.path.join(column_folder(geoDB), COLUMN_MANIFEST)
+    if not os.path.exists(path):
+        return {"names": [], "footprints": [], "size": 0, "stale": False}
+    f = open(path, "r")
+    columns = json.loads(f.read())
+    f.close()
+    columns.setdefault("stale", True)
+    return columns
+
+def save_columns (geoDB, columns):
+    f = open(os.path.join(column_folder(geoDB), COLUMN_MANIFEST), "w")
+    f.write(json.dumps(columns))
+    f.close()
+
+def mark_coc_data (geoDB, stale=True):
+    # Record whether COC_DATA is out of date with the columns
+    columns = load_columns(geoDB)
+    if columns["stale"] != stale:
+        columns["stale"] = stale
+        save_columns(geoDB, columns)
+
+def coc_data_stale (geoDB):
+    # True when contaminant values are stored in columns that changed since COC_DATA was last exported
+    return coc_backend(geoDB) == "COLUMNS" and load_columns(geoDB)["stale"]
+
+def coc_data_warning (geoDB):
+    # Warn that COC_DATA does not hold the contaminant values stored in columns
+    import arcpy
+    if coc_data_stale(geoDB):
+        arcpy.AddWarning(COC_DATA_STALE)
+        return True
+    return False
+
+def column_path (geoDB, code, kind="V"):
+    # V<code>.npy holds the values of a contaminant, F<code>.npy its FOOTPRINT_IDs
+    return os.path.join(column_folder(geoDB), kind + str(code) + ".npy")
+
+def coc_code (columns, COCName):
+    if COCName not in columns["names"]:
+        columns["names"].append(COCName)
+    return columns["names"].index(COCName)
+
+def open_coc_column (geoDB, COCName, mode="r", kind="V"):
+    # Memory-mapped column of a contaminant indexed by GRID_ID, None when it has not been loaded
+    columns = load_columns(geoDB)
+    if COCName not in columns["names"]:
+        return None
+    path = column_path(geoDB, columns["names"].index(COCName), kind)
+    if not os.path.exists(path):
+        return None
+    return open_array(path, mode)
+
+def write_coc_columns (geoDB, stack, COCNames, footprints=None):
+    # Replace the columns of several contaminants with the rows of a cell stack; cells without a value or
+    # with a negative value are stored as NaN.  Each column is written to a new file and renamed into place.
+    # FOOTPRINT_ID columns are replaced by footprints, or dropped, as COC_DATA records lose them on reload
+    columns = load_columns(geoDB)
+    size = len(stack[0])
+    total = 0
+    for j, name in enumerate(COCNames):
+        code = coc_code(columns, name)
+        path = column_path(geoDB, code)
+        newPath = os.path.join(column_folder(geoDB), "NEW.npy")
+        values = create_array(newPath, numpy.float32, (size,))
+        for i in range(0, size, TILE_CELLS):
+            block = numpy.array(stack[j][i:i + TILE_CELLS], dtype=numpy.float32)
+            keep = numpy.isfinite(block)
+            keep[keep] = block[keep] >= 0
+            block[~keep] = numpy.nan
+            if i == 0:
+                block[0] = numpy.nan
+                keep[0] = False
+            values[i:i + TILE_CELLS] = block
+            total = total + int(keep.sum())
+        del values
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(newPath, path)
+        fpPath = column_path(geoDB, code, "F")
+        if os.path.exists(fpPath):
+            os.remove(fpPath)
+        if code in columns["footprints"]:
+            columns["footprints"].remove(code)
+        if footprints is not None and footprints[j] is not None:
+            marks = create_array(fpPath, numpy.int32, (size,))
+            marks[:] = footprints[j]
+            del marks
+            columns["footprints"].append(code)
+    columns["size"] = max(columns["size"], size)
+    columns["stale"] = True
+    save_columns(geoDB, columns)
+    return total
+
+def update_coc_column (geoDB, cellValues, cellIds, COCName):
+    # Rewrite the column of a contaminant for the given GRID_IDs only
+    column = open_coc_column(geoDB, COCName)
+    if column is None or len(column) != len(cellValues):
+        del column
+        return write_coc_columns(geoDB, numpy.asarray(cellValues).reshape(1, -1), [COCName])
+    del column
+    ids = numpy.asarray(cellIds, dtype=numpy.int64)
+    return set_column_cells(geoDB, COCName, ids, numpy.asarray(cellValues)[ids])
+
+def set_column_cells (geoDB, COCName, cellIds, values):
+    # Set the column of a contaminant at the given GRID_IDs; values without a value or negative are stored as NaN
+    column = open_coc_column(geoDB, COCName, "r+")
+    if column is None:
+        return 0
+    values = numpy.asarray(values).astype(numpy.float32)
+    keep = numpy.isfinite(values)
+    keep[keep] = values[keep] >= 0
+    values[~keep] = numpy.nan
+    column[numpy.asarray(cellIds, dtype=numpy.int64)] = values
+    del column
+    mark_coc_data(geoDB)
+    return int(keep.sum())
+
+def update_coc_footprints (geoDB, COCName, footprints):
+    # Set the FOOTPRINT_ID column of a contaminant from a {GRID_ID: FOOTPRINT_ID} dict at the cells with a
+    # value, as the COC_DATA records of the contaminant are updated; the column is added when missing
+    values = open_coc_column(geoDB, COCName)
+    if values is None or len(footprints) == 0:
+        return 0
+    columns = load_columns(geoDB)
+    code = columns["names"].index(COCName)
+    path = column_path(geoDB, code, "F")
+    if code in columns["footprints"] and os.path.exists(path):
+        marks = open_array(path, "r+")
+    else:
+        marks = create_array(path, numpy.int32, (len(values),))
+        marks[:] = FOOTPRINT_NULL
+        columns["footprints"].append(code)
+        save_columns(geoDB, columns)
+    items = list(footprints.items())
+    ids = numpy.array([int(k) for k, v in items], dtype=numpy.int64)
+    fpIds = numpy.array([FOOTPRINT_NULL if v is None else int(v) for k, v in items], dtype=numpy.int32)
+    keep = (ids > 0) & (ids < len(values))
+    ids, fpIds = ids[keep], fpIds[keep]
+    keep = numpy.isfinite(numpy.asarray(values[ids]))
+    marks[ids[keep]] = fpIds[keep]
+    del marks, values
+    mark_coc_data(geoDB)
+    return int(keep.sum())
+
+def clear_column_cells (geoDB, cellIds):
+    # Remove the values and FOOTPRINT_IDs of the given GRID_IDs from every contaminant column
+    columns = load_columns(geoDB)
+    total = 0
+    for code in range(len(columns["names"])):
+        for kind, empty in (("V", numpy.nan), ("F", FOOTPRINT_NULL)):
+            path = column_path(geoDB, code, kind)
+            if not os.path.exists(path):
+                continue
+            column = open_array(path, "r+")
+            ids = numpy.asarray(cellIds, dtype=numpy.int64)
+            ids = ids[ids < len(column)]
+            if kind == "V":
+                total = total + int(numpy.isfinite(numpy.asarray(column[ids])).sum())
+            column[ids] = empty
+            del column
+    mark_coc_data(geoDB)
+    return total
+
+def resize_coc_columns (geoDB, size):
+    # Extend the contaminant columns to size GRID_IDs, new cells without a value or FOOTPRINT_ID
+    columns = load_columns(geoDB)
+    if columns["size"] >= size:
+        return
+    for code in range(len(columns["names"])):
+        for kind, dtype, empty in (("V", numpy.float32, numpy.nan), ("F", numpy.int32, FOOTPRINT_NULL)):
+            path = column_path(geoDB, code, kind)
+            if not os.path.exists(path):
+                continue
+            old = open_array(path)
+            if len(old) >= size:
+                del old
+                continue
+            newPath = os.path.join(column_folder(geoDB), "NEW.npy")
+            column = create_array(newPath, dtype, (size,))
+            column[len(old):] = empty
+            for i in range(0, len(old), TILE_CELLS):
+                column[i:i + TILE_CELLS] = old[i:i + TILE_CELLS]
+            del column, old
+            os.remove(path)
+            os.rename(newPath, path)
+    columns["size"] = size
+    save_columns(geoDB, columns)
+
+def clear_coc_columns (geoDB):
+    folder = column_folder(geoDB)
+    for name in os.listdir(folder):
+        os.remove(os.path.join(folder, name))
+
+def export_coc_columns (geoDB, COCTable):
+    # Write the column store to the COC_DATA table layout (GRID_ID, COC_NAME, COC_VALUE, FOOTPRINT_ID)
+    columns = load_columns(geoDB)
+    names = [name for name in columns["names"] if open_coc_column(geoDB, name) is not None]
+    if len(names) == 0:
+        mark_coc_data(geoDB, False)
+        return 0, 0.0
+    stack = [open_coc_column(geoDB, name) for name in names]
+    footprints = [open_coc_column(geoDB, name, kind="F") for name in names]
+    result = write_coc_table(stack, COCTable, names, footprints)
+    del stack, footprints
+    mark_coc_data(geoDB, False)
+    return result
+
+def import_coc_columns (geoDB, grid, COCTable):
+    # Replace the column store with the COC_DATA records, sized for the current grid.  COC_DATA is read once
+    # and split by contaminant; the columns of contaminants without records are removed after the new ones
+    # are written
+    import arcpy
+    size = max_id(grid) + 1
+    records = arcpy.da.TableToNumPyArray(COCTable, ["GRID_ID", "COC_NAME", "COC_VALUE", "FOOTPRINT_ID"],
+                                         null_value={"FOOTPRINT_ID": FOOTPRINT_NULL})
+    records = records[(records["GRID_ID"] > 0) & (records["GRID_ID"] < size)]
+    names, codes = numpy.unique(records["COC_NAME"], return_inverse=True)
+    order = numpy.argsort(codes, kind="mergesort")
+    bounds = numpy.searchsorted(codes[order], numpy.arange(len(names) + 1))
+    names = names.tolist()
+    total = 0
+    for j, name in enumerate(names):
+        part = records[order[bounds[j]:bounds[j + 1]]]
+        values = numpy.empty(size, dtype=numpy.float32)
+        values[:] = numpy.nan
+        values[part["GRID_ID"]] = part["COC_VALUE"]
+        marks = None
+        if (part["FOOTPRINT_ID"] != FOOTPRINT_NULL).any():
+            marks = numpy.empty(size, dtype=numpy.int32)
+            marks[:] = FOOTPRINT_NULL
+            marks[part["GRID_ID"]] = part["FOOTPRINT_ID"]
+        total = total + write_coc_columns(geoDB, values.reshape(1, -1), [name], [marks])
+        del part, values, marks
+    del records, order
+    columns = load_columns(geoDB)
+    for code, name in enumerate(columns["names"]):
+        if name not in names:
+            for kind in ("V", "F"):
+                if os.path.exists(column_path(geoDB, code, kind)):
+                    os.remove(column_path(geoDB, code, kind))
+            if code in columns["footprints"]:
+                columns["footprints"].remove(code)
+    columns["size"] = size
+    columns["stale"] = False
+    save_columns(geoDB, columns)
+    return total
+
+def cell_index_of (grid, cellIds):
+    # Row/col of the given GRID_IDs
+    ids, rows, cols = all_cells(grid)
+    pos = numpy.searchsorted(ids, cellIds)
+    return rows[pos], cols[pos]
+
+def save_grid (geoDB, grid):
+    path = os.path.join(grid_folder(geoDB), GRID_DEF)
+    definition = dict((key, grid[key]) for key in ("xmin", "ymax", "cellsize", "nrows", "ncols", "count"))
+    definition["max_id"] = max_id(grid)
+    f = open(path, "w")
+    f.write(json.dumps(definition))
+    f.close()
+    return path
+
+def load_grid (geoDB):
+    folder = grid_folder(geoDB)
+    if not os.path.exists(os.path.join(folder, GRID_DEF)):
+        # Projects created before the grid index existed: rebuild it once from the point features
+        return grid_from_points(geoDB)
+    f = open(os.path.join(folder, GRID_DEF), "r")
+    grid = json.loads(f.read())
+    f.close()
+    grid["grid_id"] = open_array(os.path.join(folder, GRID_ID))
+    return grid
+
+def grid_from_points (geoDB):
+    import arcpy
+    desc = arcpy.Describe(geoDB + "\\ANALYSIS_GRID")
+    extent = desc.Extent
+    grid = {"xmin": float(extent.XMin),
+            "ymax": float(extent.YMax),
+            "cellsize": float(desc.meanCellWidth),
+            "nrows": int(desc.height),
+            "ncols": int(desc.width)}
+    pnts = arcpy.da.FeatureClassToNumPyArray(geoDB + "\\ANALYSIS_PNTS", ["GRID_ID", "SHAPE@X", "SHAPE@Y"])
+    rows, cols = cell_index(grid, pnts["SHAPE@X"], pnts["SHAPE@Y"])
+    path = os.path.join(grid_folder(geoDB), GRID_ID)
+    grid_id = create_array(path, numpy.int32, (grid["nrows"], grid["ncols"]))
+    grid_id[rows, cols] = pnts["GRID_ID"]
+    grid_id.flush()
+    del grid_id
+    grid["count"] = int(len(pnts))
+    grid["max_id"] = int(pnts["GRID_ID"].max()) if len(pnts) > 0 else 0
+    save_grid(geoDB, grid)
+    grid["grid_id"] = open_array(path)
+    return grid
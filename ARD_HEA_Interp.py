@@ -0,0 +1,1294 @@
+# ---------------------------------------------------------------------------
+# NAME: ARD_HEA_Interp.py
+# Version: 2.0 (ArcGIS 10.2)
+# Author: Research Planning, Inc.
+#
+# Description: Module containing the in-process interpolation engine used by the
+#              ARD HEA Tool python scripts.  Filtered samples are put in a bucket
+#              spatial index once and surfaces are evaluated directly at the
+#              analysis grid cell centers in vectorized blocks of cells, so
+#              results can be written straight to COC_DATA without making and
+#              re-sampling a raster.
+#
+# Notes:  Currently the tool is designed to only be run via the ARD HEA Toolbox.
+#         Inverse distance weighting follows the Idw_sa power and search radius
+#         semantics.  Neighbors at equal distances are ranked by sample order,
+#         so results do not depend on how cells are grouped into blocks.
+#         With barriers, a sample is only used by a cell when the line between
+#         them crosses no barrier segment.  Barrier segments are kept in their
+#         own bucket index and visibility is cached per sample and cell block;
+#         a sample is visible to a whole block when no segment falls in the
+#         bounding box of the sample and the block.
+#         Value transforms (LN, the legacy ln(max(v, 0.001) * 1000), LOG10 and
+#         Box-Cox) are applied to the sample arrays before interpolation and
+#         reversed on the interpolated arrays, so no transformed copies of the
+#         samples or surfaces are written to the geodatabase.
+#         Values may hold one column per contaminant measured at the same
+#         stations; the neighbor weights of each block are then applied to all
+#         contaminants as one matrix product.
+#         Large grids are split into bands of whole cell blocks that are
+#         interpolated by a process pool.  Each band gets the samples inside a
+#         halo covering the search reach of its blocks, which holds every
+#         sample any of its cells can use, so the blocks are computed exactly
+#         as in a serial run and the stitched surface is bit-identical.
+#         Leave-one-out cross-validation predicts each sample from the others
+#         with the same neighbor rules, in blocks of nearby samples that share
+#         one distance matrix across every power tried.
+#         Natural neighbor (Sibson) surfaces use a Delaunay triangulation of the
+#         samples built by Bowyer-Watson insertion.  The area a cell takes from
+#         each sample's Voronoi cell is summed over the (cell, triangle) pairs
+#         whose circumcircle holds the cell, so weights for a block of cells
+#         come from a few array operations.  Cells outside the sample hull get
+#         no value, as with NaturalNeighbor_sa.
+#         The triangulation of each surface is kept in the project cache.  New
+#         stations are inserted into it and only cells inside the circumcircles
+#         of the triangles removed or made, or of the triangles around a
+#         station whose value changed, are evaluated again.
+#         Ordinary kriging fits a spherical, exponential or Gaussian model to
+#         the binned empirical semivariogram (range by grid search, nugget and
+#         sill by weighted least squares) and solves the kriging system of the
+#         nearest samples for every cell.  Cells of a block with the same
+#         neighbors share one system, solved once for all of them.
+#         The settings and transformed samples of each surface are kept next to
+#         its cell array, so cells added to an incrementally updated grid are
+#         evaluated alone, with the same values a full run would give them.
+#
+# Date Created: October 17, 2026
+#
+# ---------------------------------------------------------------------------
+
+import math
+import numpy
+import ARD_HEA_Grid
+
+BLOCK = 64
+BLOCK_ENTRIES = 2000000
+FLOOR = 0.001
+PARALLEL_CELLS = 250000
+SUPER = 10000.0
+JITTER = 1e-10
+HIT = 1e-9
+HULL_TOLERANCE = 1e-12
+TIN_FOLDER = "TIN"
+VARIOGRAM_MODELS = ("SPHERICAL", "EXPONENTIAL", "GAUSSIAN")
+
+def transform_method (text):
+    # Transform argument to a transform code: "" (none), LN (legacy "true"), LOG10 or BOXCX
+    text = str(text).strip().upper()
+    if text in ("", "#", "FALSE", "NONE"):
+        return ""
+    if text in ("TRUE", "LN", "LOG"):
+        return "LN"
+    if text == "LOG10":
+        return "LOG10"
+    if text in ("BOXCOX", "BOXCX", "BOX-COX"):
+        return "BOXCX"
+    raise ValueError("Unknown transform: " + text)
+
+def transform_code (method):
+    # LOG_TRANSFORM field value (TEXT 5), legacy natural log is recorded as "true"
+    if method == "":
+        return "false"
+    if method == "LN":
+        return "true"
+    return method
+
+def forward_transform (values, method):
+    # Returns the transformed values and the parameter needed to back-transform them
+    if method == "":
+        return values, None
+    floored = numpy.maximum(values, FLOOR)
+    if method == "LN":
+        return numpy.log(floored * 1000), None
+    if method == "LOG10":
+        return numpy.log10(floored * 1000), None
+    if method == "BOXCX":
+        lam = boxcox_lambda(floored)
+        return boxcox(floored, lam), lam
+    raise ValueError("Unknown transform: " + method)
+
+def back_transform (values, method, param=None):
+    if method == "":
+        return values
+    with numpy.errstate(invalid="ignore", over="ignore"):
+        if method == "LN":
+            return numpy.exp(values) / 1000
+        if method == "LOG10":
+            return numpy.power(10.0, values) / 1000
+        if method == "BOXCX":
+            if abs(param) < 1e-12:
+                return numpy.exp(values)
+            # Estimates below the range of the transform are 0, cells without an estimate stay NaN
+            base = param * values + 1.0
+            return numpy.where(base > 0, numpy.power(numpy.maximum(base, 0), 1.0 / param), numpy.where(base <= 0, 0.0, numpy.nan))
+    raise ValueError("Unknown transform: " + method)
+
+def boxcox (values, lam):
+    if abs(lam) < 1e-12:
+        return numpy.log(values)
+    return (numpy.power(values, lam) - 1.0) / lam
+
+def boxcox_lambda (values):
+    # Maximum likelihood Box-Cox exponent, searched over -2..2 in steps of 0.01
+    logs = numpy.log(values)
+    best, bestLike = 1.0, -numpy.inf
+    for lam in numpy.linspace(-2.0, 2.0, 401):
+        variance = boxcox(values, lam).var()
+        if variance <= 0:
+            continue
+        like = (lam - 1.0) * logs.sum() - 0.5 * len(values) * math.log(variance)
+        if like > bestLike:
+            best, bestLike = round(float(lam), 2), like
+    return best
+
+def read_samples (layer, field, spatialRef=None):
+    import arcpy
+    samples = arcpy.da.FeatureClassToNumPyArray(layer, ["SHAPE@X", "SHAPE@Y", field], skip_nulls=True, spatial_reference=spatialRef)
+    return (numpy.asarray(samples["SHAPE@X"], dtype=numpy.float64),
+            numpy.asarray(samples["SHAPE@Y"], dtype=numpy.float64),
+            numpy.asarray(samples[field], dtype=numpy.float64))
+
+def samples_feature_class (x, y, values, outFC, spatialRef):
+    import arcpy
+    samples = numpy.zeros(len(x), dtype=[("PNT_X", numpy.float64), ("PNT_Y", numpy.float64), ("VALUE", numpy.float64)])
+    samples["PNT_X"] = x
+    samples["PNT_Y"] = y
+    samples["VALUE"] = values
+    if arcpy.Exists(outFC):
+        arcpy.Delete_management(outFC)
+    arcpy.da.NumPyArrayToFeatureClass(samples, outFC, ("PNT_X", "PNT_Y"), spatialRef)
+    return outFC
+
+def back_transform_raster (inRaster, outRaster, method, param, spatialRef, nodata=-9999.0):
+    # Back-transforms a surface made by a Spatial Analyst tool, reading and writing it in tiles
+    import arcpy
+    desc = arcpy.Describe(inRaster)
+    surface = {"xmin": desc.Extent.XMin, "ymax": desc.Extent.YMax, "cellsize": desc.meanCellWidth,
+               "nrows": int(desc.height), "ncols": int(desc.width)}
+    def band_values (r0, r1):
+        lowerLeft = arcpy.Point(surface["xmin"], surface["ymax"] - r1 * surface["cellsize"])
+        values = arcpy.RasterToNumPyArray(inRaster, lowerLeft, surface["ncols"], r1 - r0, numpy.nan).astype(numpy.float64)
+        values = back_transform(values, method, param)
+        values[~numpy.isfinite(values)] = nodata
+        return values.astype(numpy.float32)
+    return ARD_HEA_Grid.write_band_raster(surface, band_values, outRaster, spatialRef, nodata)
+
+def build_index (x, y, per_bucket=8):
+    n = len(x)
+    xmin, xmax = float(x.min()), float(x.max())
+    ymin, ymax = float(y.min()), float(y.max())
+    area = (xmax - xmin) * (ymax - ymin)
+    if area <= 0:
+        area = max(xmax - xmin, ymax - ymin, 1.0) ** 2
+    size = math.sqrt(area * per_bucket / float(n))
+    nbx = int((xmax - xmin) / size) + 1
+    nby = int((ymax - ymin) / size) + 1
+    key = ((y - ymin) / size).astype(numpy.int64) * nbx + ((x - xmin) / size).astype(numpy.int64)
+    order = numpy.argsort(key, kind="mergesort")
+    starts = numpy.searchsorted(key[order], numpy.arange(nbx * nby + 1))
+    return {"x": x, "y": y, "xmin": xmin, "ymin": ymin, "size": size,
+            "nbx": nbx, "nby": nby, "order": order, "starts": starts}
+
+def query_radius (index, cx, cy, r):
+    # Samples within r of (cx, cy) in ascending sample order
+    size = index["size"]
+    bx0 = min(max(int(math.floor((cx - r - index["xmin"]) / size)), 0), index["nbx"] - 1)
+    bx1 = min(max(int(math.floor((cx + r - index["xmin"]) / size)), 0), index["nbx"] - 1)
+    by0 = min(max(int(math.floor((cy - r - index["ymin"]) / size)), 0), index["nby"] - 1)
+    by1 = min(max(int(math.floor((cy + r - index["ymin"]) / size)), 0), index["nby"] - 1)
+    starts = index["starts"]
+    parts = [index["order"][starts[by * index["nbx"] + bx0]:starts[by * index["nbx"] + bx1 + 1]] for by in range(by0, by1 + 1)]
+    ids = numpy.concatenate(parts)
+    d2 = (index["x"][ids] - cx) ** 2 + (index["y"][ids] - cy) ** 2
+    return numpy.sort(ids[d2 <= r * r])
+
+def kth_distance (index, cx, cy, k):
+    # Distance from (cx, cy) to its k-th nearest sample
+    k = min(k, len(index["x"]))
+    r = index["size"]
+    while True:
+        ids = query_radius(index, cx, cy, r)
+        if len(ids) >= k:
+            d = numpy.sort(numpy.sqrt((index["x"][ids] - cx) ** 2 + (index["y"][ids] - cy) ** 2))
+            return float(d[k - 1])
+        r = r * 2.0
+
+def parse_radius (radius, cellsize):
+    # Idw_sa search radius text: "VARIABLE {points} {max_distance}" or "FIXED {distance} {min_points}"
+    parts = [] if radius in (None, '#', '') else str(radius).replace(",", " ").split()
+    def number (i, default):
+        if len(parts) > i and parts[i] not in ('#', ''):
+            return float(parts[i])
+        return default
+    if len(parts) == 0 or parts[0].upper() == "VARIABLE":
+        return {"type": "VARIABLE", "points": int(number(1, 12)), "distance": number(2, None)}
+    if parts[0].upper() == "FIXED":
+        return {"type": "FIXED", "distance": number(1, 5.0 * cellsize), "points": int(number(2, 0))}
+    raise ValueError("Unknown search radius: " + str(radius))
+
+def read_segments (layer, spatialRef=None):
+    import arcpy
+    segments = []
+    with arcpy.da.SearchCursor(layer, ["SHAPE@"], spatial_reference=spatialRef) as rows:
+        for row in rows:
+            if row[0] is None:
+                continue
+            for part in row[0]:
+                line = []
+                for pnt in part:
+                    if pnt is None:
+                        # Interior ring separator
+                        if len(line) > 1:
+                            segments.append(line_segments(line))
+                        line = []
+                    else:
+                        line.append((pnt.X, pnt.Y))
+                if len(line) > 1:
+                    segments.append(line_segments(line))
+    if len(segments) == 0:
+        return numpy.zeros((0, 4))
+    return numpy.vstack(segments)
+
+def line_segments (line):
+    pnts = numpy.asarray(line, dtype=numpy.float64)
+    return numpy.hstack((pnts[:-1], pnts[1:]))
+
+def build_boxes (box, per_bucket=4):
+    # Bucket index over bounding boxes (xmin, ymin, xmax, ymax); each box is listed in every bucket it touches
+    sxmin, symin, sxmax, symax = box[:, 0], box[:, 1], box[:, 2], box[:, 3]
+    xmin, ymin = float(sxmin.min()), float(symin.min())
+    width = max(float(sxmax.max()) - xmin, float(symax.max()) - ymin, 1.0)
+    size = max(width * math.sqrt(per_bucket / float(len(box))), float(numpy.median(numpy.maximum(sxmax - sxmin, symax - symin))), 1e-9)
+    nbx = int((float(sxmax.max()) - xmin) / size) + 1
+    nby = int((float(symax.max()) - ymin) / size) + 1
+    bx0 = ((sxmin - xmin) / size).astype(numpy.int64)
+    bx1 = ((sxmax - xmin) / size).astype(numpy.int64)
+    by0 = ((symin - ymin) / size).astype(numpy.int64)
+    by1 = ((symax - ymin) / size).astype(numpy.int64)
+    keys = []
+    boxes = []
+    for i in range(len(box)):
+        bys, bxs = numpy.mgrid[by0[i]:by1[i] + 1, bx0[i]:bx1[i] + 1]
+        keys.append((bys * nbx + bxs).ravel())
+        boxes.append(numpy.repeat(i, bys.size))
+    keys = numpy.concatenate(keys)
+    boxes = numpy.concatenate(boxes)
+    order = numpy.argsort(keys, kind="mergesort")
+    return {"xmin": xmin, "ymin": ymin, "size": size, "nbx": nbx, "nby": nby, "list": boxes[order],
+            "starts": numpy.searchsorted(keys[order], numpy.arange(nbx * nby + 1)), "box": box}
+
+def query_boxes (index, xmin, ymin, xmax, ymax):
+    # Boxes overlapping the query box, in ascending order
+    size = index["size"]
+    bx0 = int(math.floor((xmin - index["xmin"]) / size))
+    bx1 = int(math.floor((xmax - index["xmin"]) / size))
+    by0 = int(math.floor((ymin - index["ymin"]) / size))
+    by1 = int(math.floor((ymax - index["ymin"]) / size))
+    if bx1 < 0 or by1 < 0 or bx0 >= index["nbx"] or by0 >= index["nby"]:
+        return numpy.zeros(0, dtype=numpy.int64)
+    bx0, bx1 = max(bx0, 0), min(bx1, index["nbx"] - 1)
+    by0, by1 = max(by0, 0), min(by1, index["nby"] - 1)
+    starts = index["starts"]
+    found = numpy.unique(numpy.concatenate([index["list"][starts[by * index["nbx"] + bx0]:starts[by * index["nbx"] + bx1 + 1]] for by in range(by0, by1 + 1)]))
+    box = index["box"][found]
+    return found[(box[:, 0] <= xmax) & (box[:, 2] >= xmin) & (box[:, 1] <= ymax) & (box[:, 3] >= ymin)]
+
+def build_barrier (segments, per_bucket=4):
+    # Bucket index over barrier segments
+    box = numpy.column_stack((numpy.minimum(segments[:, 0], segments[:, 2]), numpy.minimum(segments[:, 1], segments[:, 3]),
+                              numpy.maximum(segments[:, 0], segments[:, 2]), numpy.maximum(segments[:, 1], segments[:, 3])))
+    barrier = build_boxes(box, per_bucket)
+    barrier["segments"] = segments
+    barrier["cache"] = {}
+    return barrier
+
+def query_segments (barrier, xmin, ymin, xmax, ymax):
+    # Barrier segments whose bounding box overlaps the box
+    return query_boxes(barrier, xmin, ymin, xmax, ymax)
+
+def crosses (qx, qy, sx, sy, segments):
+    # Cells x segments: True where the line from the cell center to the sample touches the segment
+    ax, ay = qx[:, None], qy[:, None]
+    cx, cy, dx, dy = segments[:, 0][None, :], segments[:, 1][None, :], segments[:, 2][None, :], segments[:, 3][None, :]
+    o1 = (sx - ax) * (cy - ay) - (sy - ay) * (cx - ax)
+    o2 = (sx - ax) * (dy - ay) - (sy - ay) * (dx - ax)
+    o3 = (dx - cx) * (ay - cy) - (dy - cy) * (ax - cx)
+    o4 = (dx - cx) * (sy - cy) - (dy - cy) * (sx - cx)
+    hit = (o1 * o2 <= 0) & (o3 * o4 <= 0)
+    # Collinear lines only touch when their extents overlap
+    collinear = (o1 == 0) & (o2 == 0)
+    if collinear.any():
+        overlap = ((numpy.minimum(ax, sx) <= numpy.maximum(cx, dx)) & (numpy.maximum(ax, sx) >= numpy.minimum(cx, dx)) &
+                   (numpy.minimum(ay, sy) <= numpy.maximum(cy, dy)) & (numpy.maximum(ay, sy) >= numpy.minimum(cy, dy)))
+        hit &= ~collinear | overlap
+    return hit
+
+def visibility (barrier, index, blockKey, cand, qx, qy):
+    # Cells x candidate samples visibility, cached per sample and cell block (None: visible to the whole block)
+    cache = barrier["cache"]
+    vis = numpy.ones((len(qx), len(cand)), dtype=bool)
+    bxmin, bxmax, bymin, bymax = qx.min(), qx.max(), qy.min(), qy.max()
+    for j in range(len(cand)):
+        key = (blockKey, int(cand[j]))
+        if key not in cache:
+            sx, sy = index["x"][cand[j]], index["y"][cand[j]]
+            segs = query_segments(barrier, min(bxmin, sx), min(bymin, sy), max(bxmax, sx), max(bymax, sy))
+            if len(segs) == 0:
+                cache[key] = None
+            else:
+                cache[key] = ~crosses(qx, qy, sx, sy, barrier["segments"][segs]).any(axis=1)
+        if cache[key] is not None:
+            vis[:, j] = cache[key]
+    return vis
+
+def rank_rows (d2):
+    # Per-row rank of each column by distance, ties ranked by column (sample) order
+    order = numpy.argsort(d2, axis=1, kind="mergesort")
+    ranks = numpy.empty(d2.shape, dtype=numpy.int64)
+    ranks[numpy.arange(d2.shape[0])[:, None], order] = numpy.arange(d2.shape[1])[None, :]
+    return ranks
+
+def idw_weights (d2, valid, power):
+    # Inverse distance weights; a cell on a sample takes the value of the coincident samples
+    zero = valid & (d2 == 0)
+    with numpy.errstate(divide="ignore"):
+        weights = numpy.where(valid & ~zero, 1.0 / numpy.power(numpy.where(zero, 1.0, d2), power / 2.0), 0.0)
+    hit = zero.any(axis=1)
+    weights[hit] = zero[hit]
+    return weights
+
+def block_distances (index, cand, qx, qy):
+    return (qx[:, None] - index["x"][cand][None, :]) ** 2 + (qy[:, None] - index["y"][cand][None, :]) ** 2
+
+def visible_reach (index, cand, qx, qy, vis, k, radius):
+    # True when every cell has at least k visible candidates within radius
+    if k == 0:
+        return True
+    step = max(1, BLOCK_ENTRIES // len(cand))
+    for i in range(0, len(qx), step):
+        d2 = block_distances(index, cand, qx[i:i + step], qy[i:i + step])
+        if ((d2 <= radius * radius) & vis[i:i + step]).sum(axis=1).min() < k:
+            return False
+    return True
+
+def block_reach (index, n, qx, qy, search):
+    # Block center, half diagonal and a distance from the center holding any neighbor used by a cell in the block
+    cx = 0.5 * (qx.min() + qx.max())
+    cy = 0.5 * (qy.min() + qy.max())
+    h = 0.5 * math.sqrt((qx.max() - qx.min()) ** 2 + (qy.max() - qy.min()) ** 2)
+    k = min(search["points"], n)
+    if search["type"] == "VARIABLE":
+        reach = kth_distance(index, cx, cy, k) + 2.0 * h
+        if search["distance"] is not None:
+            reach = min(reach, search["distance"] + h)
+    else:
+        reach = search["distance"] + h
+        if k > 0:
+            reach = max(reach, kth_distance(index, cx, cy, k) + 2.0 * h)
+    return cx, cy, h, reach
+
+def idw_block (index, values, qx, qy, power, search, barrier=None, blockKey=None):
+    n = len(values)
+    out = numpy.empty((len(qx),) + values.shape[1:])
+    out.fill(numpy.nan)
+    k = min(search["points"], n)
+    cx, cy, h, reach = block_reach(index, n, qx, qy, search)
+    while True:
+        cand = query_radius(index, cx, cy, reach)
+        if len(cand) == 0 and barrier is None:
+            return out
+        vis = None
+        if barrier is None or len(cand) == n:
+            break
+        # Hidden samples do not count as neighbors, so widen the search until every cell has
+        # its k nearest visible samples inside the reach
+        vis = visibility(barrier, index, blockKey, cand, qx, qy)
+        if search["type"] == "VARIABLE" and search["distance"] is not None and reach >= search["distance"] + h:
+            break
+        if len(cand) > 0 and visible_reach(index, cand, qx, qy, vis, k, reach - h):
+            break
+        reach = reach * 2.0
+    if len(cand) == 0:
+        return out
+    if barrier is not None and vis is None:
+        vis = visibility(barrier, index, blockKey, cand, qx, qy)
+    step = max(1, BLOCK_ENTRIES // len(cand))
+    for i in range(0, len(qx), step):
+        d2 = block_distances(index, cand, qx[i:i + step], qy[i:i + step])
+        if vis is not None:
+            # Hidden samples are ranked after every visible sample
+            d2 = numpy.where(vis[i:i + step], d2, numpy.inf)
+        if search["type"] == "VARIABLE":
+            valid = rank_rows(d2) < k
+            if search["distance"] is not None:
+                valid &= d2 <= search["distance"] ** 2
+        else:
+            valid = d2 <= search["distance"] ** 2
+            if k > 0:
+                valid |= rank_rows(d2) < k
+        if vis is not None:
+            valid &= vis[i:i + step]
+        weights = idw_weights(d2, valid, power)
+        total = weights.sum(axis=1)
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            out[i:i + step] = numpy.dot(weights, values[cand]) / total.reshape((-1,) + (1,) * (values.ndim - 1))
+        out[i:i + step][total == 0] = numpy.nan
+    return out
+
+def iter_blocks (grid, mask=None):
+    # Blocks of BLOCK x BLOCK cells: GRID_IDs and cell centers of cells with a GRID_ID inside the mask.
+    # A tile of the grid holds the GRID_IDs of its rows only, starting at grid row "row0"
+    top = grid.get("row0", 0)
+    nrows = len(grid["grid_id"])
+    for r0 in range(0, nrows, BLOCK):
+        r1 = min(r0 + BLOCK, nrows)
+        band = numpy.asarray(grid["grid_id"][r0:r1])
+        if mask is not None:
+            band = numpy.where(numpy.asarray(mask[r0:r1], dtype=bool), band, 0)
+        for c0 in range(0, grid["ncols"], BLOCK):
+            c1 = min(c0 + BLOCK, grid["ncols"])
+            rows, cols = numpy.nonzero(band[:, c0:c1])
+            if len(rows) == 0:
+                continue
+            x, y = ARD_HEA_Grid.cell_centers(grid, rows + r0 + top, cols + c0)
+            yield (r0 + top, c0), band[rows, cols + c0], x, y
+
+def tile_rows (grid, processes):
+    # Rows per tile: whole blocks, about four tiles per process and at most TILE_CELLS cells
+    blockRows = (grid["nrows"] + BLOCK - 1) // BLOCK
+    perTile = max(1, (blockRows + 4 * processes - 1) // (4 * processes))
+    return BLOCK * max(1, min(perTile, ARD_HEA_Grid.TILE_CELLS // (grid["ncols"] * BLOCK)))
+
+def iter_idw_tiles (grid, x, y, values, power, search, mask, segments, processes):
+    # Tasks for idw_tile: rows of the tile and the samples inside the halo reached by its blocks
+    index = build_index(x, y)
+    step = tile_rows(grid, processes)
+    geometry = dict([(key, grid[key]) for key in ("xmin", "ymax", "cellsize", "nrows", "ncols")])
+    for r0 in range(0, grid["nrows"], step):
+        r1 = min(r0 + step, grid["nrows"])
+        tile = dict(geometry)
+        tile["row0"] = r0
+        tile["grid_id"] = numpy.array(grid["grid_id"][r0:r1])
+        tileMask = None if mask is None else numpy.array(mask[r0:r1], dtype=bool)
+        if segments is not None and len(segments) > 0:
+            # Barriers can push neighbors out to any distance
+            inside = numpy.arange(len(x))
+        else:
+            xmin = ymin = numpy.inf
+            xmax = ymax = -numpy.inf
+            for blockKey, ids, qx, qy in iter_blocks(tile, tileMask):
+                cx, cy, h, reach = block_reach(index, len(values), qx, qy, search)
+                xmin, xmax = min(xmin, cx - reach), max(xmax, cx + reach)
+                ymin, ymax = min(ymin, cy - reach), max(ymax, cy + reach)
+            if xmin > xmax:
+                continue
+            inside = numpy.nonzero((x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax))[0]
+        yield (tile, tileMask, x[inside], y[inside], values[inside], power, search, segments)
+
+def idw_tile (task):
+    # Process pool worker: GRID_IDs and estimates for the cells of one tile
+    tile, tileMask, x, y, values, power, search, segments = task
+    ids = []
+    estimates = []
+    if len(values) == 0:
+        return numpy.zeros(0, dtype=numpy.int32), numpy.zeros((0,) + values.shape[1:])
+    index = build_index(x, y)
+    barrier = None
+    if segments is not None and len(segments) > 0:
+        barrier = build_barrier(segments)
+    for blockKey, blockIds, qx, qy in iter_blocks(tile, tileMask):
+        ids.append(blockIds)
+        estimates.append(idw_block(index, values, qx, qy, power, search, barrier, blockKey))
+    if len(ids) == 0:
+        return numpy.zeros(0, dtype=numpy.int32), numpy.zeros((0,) + values.shape[1:])
+    return numpy.concatenate(ids), numpy.concatenate(estimates)
+
+def idw_cells (grid, x, y, values, cellValues, power=2.0, radius=None, mask=None, segments=None, processes=1):
+    # Fills cellValues (indexed by GRID_ID) at every grid cell inside the mask, NaN where there is no estimate;
+    # when values has one column per contaminant, cellValues is a list with one array per column
+    columns = cellValues if isinstance(cellValues, list) else [cellValues]
+    for column in columns:
+        column[:] = numpy.nan
+    if len(values) == 0:
+        return cellValues
+    search = parse_radius(radius, grid["cellsize"])
+    power = 2.0 if power in (None, '#', '') else float(power)
+    if processes > 1 and ARD_HEA_Grid.max_id(grid) >= PARALLEL_CELLS:
+        import ARD_HEA_Tools
+        tasks = iter_idw_tiles(grid, x, y, values, power, search, mask, segments, processes)
+        pool = ARD_HEA_Tools.process_pool(processes)
+        try:
+            results = pool.imap_unordered(idw_tile, tasks)
+            for ids, estimates in results:
+                store_estimates(cellValues, ids, estimates)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+        return cellValues
+    index = build_index(x, y)
+    barrier = None
+    if segments is not None and len(segments) > 0:
+        barrier = build_barrier(segments)
+    for blockKey, ids, qx, qy in iter_blocks(grid, mask):
+        store_estimates(cellValues, ids, idw_block(index, values, qx, qy, power, search, barrier, blockKey))
+    return cellValues
+
+def store_estimates (cellValues, ids, estimates):
+    if isinstance(cellValues, list):
+        for j in range(len(cellValues)):
+            cellValues[j][ids] = estimates[:, j]
+    else:
+        cellValues[ids] = estimates
+
+def station_key (x, y):
+    # Order of the samples by location and a key identifying the set of stations
+    import hashlib
+    order = numpy.lexsort((y, x))
+    key = hashlib.md5(numpy.ascontiguousarray(numpy.column_stack((x[order], y[order]))))
+    return order, key.hexdigest()
+
+def search_list (searchType, neighbors, distances):
+    # Idw_sa search radius texts for every neighbor count and distance combination
+    radii = []
+    for k in neighbors:
+        for d in distances:
+            if searchType == "FIXED":
+                radii.append("FIXED " + ("%g" % d) + ("" if k is None else " " + str(k)))
+            else:
+                radii.append("VARIABLE " + str(k) + ("" if d is None else " " + ("%g" % d)))
+    return radii
+
+def cv_task (task):
+    # Leave-one-out predictions at every sample for one search radius and a list of powers,
+    # scored as (power, radius, count, mean error, RMSE, MAE) on the back-transformed scale;
+    # the sample index is built once by cross_validate and shared by every task
+    index, values, observed, radius, powers, method, param, cellsize = task
+    x, y = index["x"], index["y"]
+    n = len(values)
+    search = parse_radius(radius, cellsize)
+    k = min(search["points"], n - 1)
+    # Candidates for every sample in a block: its k nearest others and all samples within the distance
+    wide = {"type": "FIXED", "distance": search["distance"] or 0.0, "points": k + 1}
+    predicted = numpy.empty((len(powers), n))
+    predicted.fill(numpy.nan)
+    for i in range(0, n, BLOCK):
+        rows = index["order"][i:i + BLOCK]
+        qx, qy = x[rows], y[rows]
+        cx, cy, h, reach = block_reach(index, n, qx, qy, wide)
+        cand = query_radius(index, cx, cy, reach)
+        d2 = block_distances(index, cand, qx, qy)
+        d2[rows[:, None] == cand[None, :]] = numpy.inf
+        if search["type"] == "VARIABLE":
+            valid = rank_rows(d2) < k
+            if search["distance"] is not None:
+                valid &= d2 <= search["distance"] ** 2
+        else:
+            valid = d2 <= search["distance"] ** 2
+            if k > 0:
+                valid |= rank_rows(d2) < k
+        valid &= numpy.isfinite(d2)
+        for j in range(len(powers)):
+            weights = idw_weights(d2, valid, powers[j])
+            total = weights.sum(axis=1)
+            with numpy.errstate(invalid="ignore", divide="ignore"):
+                estimates = numpy.dot(weights, values[cand]) / total
+            estimates[total == 0] = numpy.nan
+            predicted[j, rows] = back_transform(estimates, method, param)
+    scores = []
+    for j in range(len(powers)):
+        errors = predicted[j] - observed
+        errors = errors[numpy.isfinite(errors)]
+        if len(errors) == 0:
+            scores.append((powers[j], radius, 0, numpy.nan, numpy.nan, numpy.nan))
+        else:
+            scores.append((powers[j], radius, len(errors), float(errors.mean()),
+                           float(numpy.sqrt((errors ** 2).mean())), float(numpy.abs(errors).mean())))
+    return scores
+
+def cross_validate (x, y, observed, powers, radii, method="", cellsize=1.0, processes=1):
+    # Scores of every power and search radius combination ranked by RMSE, then MAE; radii run in parallel
+    values, param = forward_transform(observed, method)
+    index = build_index(x, y)
+    tasks = [(index, values, observed, radius, powers, method, param, cellsize) for radius in radii]
+    if processes > 1 and len(tasks) > 1:
+        import ARD_HEA_Tools
+        pool = ARD_HEA_Tools.process_pool(min(processes, len(tasks)))
+        try:
+            results = pool.map(cv_task, tasks)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        results = [cv_task(task) for task in tasks]
+    scores = [score for result in results for score in result]
+    scores.sort(key=lambda s: (numpy.inf if numpy.isnan(s[4]) else s[4], numpy.inf if numpy.isnan(s[5]) else s[5], -s[2]))
+    return scores, param
+
+def orient (ax, ay, bx, by, cx, cy):
+    # Twice the signed area of triangle a, b, c (positive when counterclockwise)
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+def circumcircle (ax, ay, bx, by, cx, cy):
+    # Circumcenter and squared circumradius; works on scalars and arrays
+    bx, by, cx, cy = bx - ax, by - ay, cx - ax, cy - ay
+    d = 2.0 * (bx * cy - by * cx)
+    b2 = bx * bx + by * by
+    c2 = cx * cx + cy * cy
+    ux = (cy * b2 - by * c2) / d
+    uy = (bx * c2 - cx * b2) / d
+    return ax + ux, ay + uy, ux * ux + uy * uy
+
+def tin_new (x, y):
+    # Empty triangulation covering the samples: coordinates are centered and scaled to about -1..1 and
+    # vertices 0-2 are the corners of a super triangle far outside the samples
+    scale = 0.5 * max(float(x.max() - x.min()), float(y.max() - y.min()), 1e-9)
+    tin = {"cx": 0.5 * float(x.min() + x.max()), "cy": 0.5 * float(y.min() + y.max()), "scale": scale,
+           "px": [-SUPER, SUPER, 0.0], "py": [-SUPER, -SUPER, SUPER],
+           "V": [[0, 1, 2]], "N": [[-1, -1, -1]], "last": 0}
+    tin["C"] = [circumcircle(-SUPER, -SUPER, SUPER, -SUPER, 0.0, SUPER)]
+    return tin
+
+def tin_coordinates (tin, x, y):
+    # Sample or cell coordinates in the normalized frame of the triangulation
+    return (numpy.asarray(x, dtype=numpy.float64) - tin["cx"]) / tin["scale"], (numpy.asarray(y, dtype=numpy.float64) - tin["cy"]) / tin["scale"]
+
+def tin_locate (tin, px, py):
+    # Triangle containing the point, by walking from the last triangle made
+    V, N, X, Y = tin["V"], tin["N"], tin["px"], tin["py"]
+    t = tin["last"]
+    for step in range(4 * len(V) + 10):
+        for k in (step % 3, (step + 1) % 3, (step + 2) % 3):
+            a, b = V[t][(k + 1) % 3], V[t][(k + 2) % 3]
+            if orient(X[a], Y[a], X[b], Y[b], px, py) < 0 and N[t][k] >= 0:
+                t = N[t][k]
+                break
+        else:
+            return t
+    # Walk did not settle on nearly degenerate triangles: take the triangle with the best worst edge
+    best, bestScore = 0, -numpy.inf
+    for t in range(len(V)):
+        a, b, c = V[t]
+        score = min(orient(X[a], Y[a], X[b], Y[b], px, py), orient(X[b], Y[b], X[c], Y[c], px, py), orient(X[c], Y[c], X[a], Y[a], px, py))
+        if score > bestScore:
+            best, bestScore = t, score
+    return best
+
+def tin_insert (tin, v):
+    # Bowyer-Watson insertion of vertex v; returns the triangles removed and the triangles made
+    V, N, C, X, Y = tin["V"], tin["N"], tin["C"], tin["px"], tin["py"]
+    px, py = X[v], Y[v]
+    t = tin_locate(tin, px, py)
+    # Cavity: triangles whose circumcircle holds the point, grown from the containing triangle
+    cavity = set([t])
+    stack = [t]
+    while len(stack) > 0:
+        s = stack.pop()
+        for nb in N[s]:
+            if nb >= 0 and nb not in cavity and (px - C[nb][0]) ** 2 + (py - C[nb][1]) ** 2 < C[nb][2]:
+                cavity.add(nb)
+                stack.append(nb)
+    # Boundary edges must face the point; drop triangles that break this through round-off
+    while True:
+        edges = []
+        bad = None
+        for s in cavity:
+            for k in range(3):
+                nb = N[s][k]
+                if nb < 0 or nb not in cavity:
+                    a, b = V[s][(k + 1) % 3], V[s][(k + 2) % 3]
+                    if s != t and orient(X[a], Y[a], X[b], Y[b], px, py) <= 0:
+                        bad = s
+                    edges.append((a, b, nb, -1 if nb < 0 else N[nb].index(s)))
+        if bad is None:
+            break
+        cavity.discard(bad)
+    removed = [(s, tuple(V[s]), C[s]) for s in cavity]
+    slots = sorted(cavity) + list(range(len(V), len(V) + len(edges) - len(cavity)))
+    for i in range(len(edges) - len(cavity)):
+        V.append(None)
+        N.append(None)
+        C.append(None)
+    start = {}
+    end = {}
+    for i in range(len(edges)):
+        a, b, nb, back = edges[i]
+        nt = slots[i]
+        V[nt] = [a, b, v]
+        N[nt] = [-1, -1, nb]
+        C[nt] = circumcircle(X[a], Y[a], X[b], Y[b], px, py)
+        start[a] = nt
+        end[b] = nt
+    for i in range(len(edges)):
+        a, b, nb, back = edges[i]
+        nt = slots[i]
+        if nb >= 0:
+            N[nb][back] = nt
+        N[nt][0] = start[b]
+        N[nt][1] = end[a]
+    tin["last"] = slots[0]
+    return removed, slots
+
+def tin_order (x, y):
+    # Insertion order sweeping buckets of about one sample in alternating directions, so walks stay short
+    n = len(x)
+    nb = max(1, int(math.sqrt(n)))
+    bx = numpy.minimum(((x - x.min()) / max(float(x.max() - x.min()), 1e-12) * nb).astype(numpy.int64), nb - 1)
+    by = numpy.minimum(((y - y.min()) / max(float(y.max() - y.min()), 1e-12) * nb).astype(numpy.int64), nb - 1)
+    bx = numpy.where(by % 2 == 0, bx, nb - 1 - bx)
+    return numpy.lexsort((x, bx, by))
+
+def triangulate (x, y):
+    # Delaunay triangulation of the samples; sample i is vertex i + 3.  Coordinates are jittered by a
+    # tiny deterministic amount so regular sampling designs do not give cocircular or collinear points
+    tin = tin_new(x, y)
+    nx, ny = tin_coordinates(tin, x, y)
+    jitter = numpy.random.RandomState(len(x)).uniform(-JITTER, JITTER, (2, len(x)))
+    tin["px"].extend((nx + jitter[0]).tolist())
+    tin["py"].extend((ny + jitter[1]).tolist())
+    for i in tin_order(x, y):
+        tin_insert(tin, int(i) + 3)
+    return tin
+
+def tin_arrays (tin):
+    # Triangles between samples only: sample index triples, neighbors (-1 outside), circumcircles and
+    # a bucket index over the circumcircle bounding boxes
+    V = numpy.array(tin["V"], dtype=numpy.int64).reshape(-1, 3)
+    N = numpy.array(tin["N"], dtype=numpy.int64).reshape(-1, 3)
+    real = (V >= 3).all(axis=1)
+    remap = numpy.zeros(len(V) + 1, dtype=numpy.int64) - 1
+    remap[numpy.nonzero(real)[0]] = numpy.arange(real.sum())
+    tri = V[real] - 3
+    nbr = remap[numpy.where(N[real] < 0, len(V), N[real])]
+    X = numpy.array(tin["px"][3:])
+    Y = numpy.array(tin["py"][3:])
+    arrays = {"x": X, "y": Y, "tri": tri, "nbr": nbr, "cx": tin["cx"], "cy": tin["cy"], "scale": tin["scale"]}
+    if len(tri) == 0:
+        return arrays
+    ccx, ccy, r2 = circumcircle(X[tri[:, 0]], Y[tri[:, 0]], X[tri[:, 1]], Y[tri[:, 1]], X[tri[:, 2]], Y[tri[:, 2]])
+    r = numpy.sqrt(r2)
+    arrays["center"] = numpy.column_stack((ccx, ccy))
+    arrays["r2"] = r2
+    arrays["boxes"] = build_boxes(numpy.column_stack((ccx - r, ccy - r, ccx + r, ccy + r)), 2)
+    return arrays
+
+def signed_area (ax, ay, bx, by, cx, cy):
+    return 0.5 * orient(ax, ay, bx, by, cx, cy)
+
+def fan_area (ax, ay, bx, by, ux, uy, cx, cy):
+    # Signed area of the part of the Voronoi cell of a in the corner of triangle a, b, c with circumcenter u
+    mbx, mby = 0.5 * (ax + bx), 0.5 * (ay + by)
+    mcx, mcy = 0.5 * (ax + cx), 0.5 * (ay + cy)
+    return signed_area(ax, ay, mbx, mby, ux, uy) + signed_area(ax, ay, ux, uy, mcx, mcy)
+
+def sibson_block (arrays, values, qx, qy):
+    # Sibson natural neighbor estimates at cell centers (normalized coordinates), NaN outside the sample hull.
+    # The area a cell would take from the Voronoi cell of sample a is the Voronoi area of a in the triangles
+    # whose circumcircle holds the cell, less its area in the triangles made by inserting the cell.
+    out = numpy.empty((len(qx),) + values.shape[1:])
+    out.fill(numpy.nan)
+    if len(arrays["tri"]) == 0:
+        return out
+    cand = query_boxes(arrays["boxes"], qx.min(), qy.min(), qx.max(), qy.max())
+    if len(cand) == 0:
+        return out
+    X, Y, tri, nbr, center = arrays["x"], arrays["y"], arrays["tri"], arrays["nbr"], arrays["center"]
+    columns = values.reshape(len(values), -1)
+    step = max(1, BLOCK_ENTRIES // len(cand))
+    for i in range(0, len(qx), step):
+        px, py = qx[i:i + step], qy[i:i + step]
+        m = len(px)
+        d2 = (px[:, None] - center[cand, 0][None, :]) ** 2 + (py[:, None] - center[cand, 1][None, :]) ** 2
+        cell, j = numpy.nonzero(d2 < arrays["r2"][cand][None, :])
+        t = cand[j]
+        px, py = px[cell], py[cell]
+        v = tri[t]
+        vx, vy = X[v], Y[v]
+        keys = cell * len(tri) + t
+        inside = numpy.ones(len(t), dtype=bool)
+        area = numpy.zeros((len(t), 3))
+        hit = numpy.zeros(len(t), dtype=numpy.int64) - 1
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            for k in range(3):
+                a, b, c = k, (k + 1) % 3, (k + 2) % 3
+                inside &= orient(vx[:, a], vy[:, a], vx[:, b], vy[:, b], px, py) >= -HULL_TOLERANCE
+                near = (vx[:, a] - px) ** 2 + (vy[:, a] - py) ** 2 < HIT * HIT
+                hit[near] = v[near, a]
+                # Voronoi area of a in the cavity triangle
+                area[:, a] += fan_area(vx[:, a], vy[:, a], vx[:, b], vy[:, b], center[t, 0], center[t, 1], vx[:, c], vy[:, c])
+                # Edge a-b on the cavity boundary gives the new triangle a, b, cell
+                other = nbr[t, c]
+                nkeys = cell * len(tri) + other
+                pos = numpy.minimum(numpy.searchsorted(keys, nkeys), len(keys) - 1)
+                edge = (other < 0) | (keys[pos] != nkeys)
+                ux, uy, r2 = circumcircle(vx[edge, a], vy[edge, a], vx[edge, b], vy[edge, b], px[edge], py[edge])
+                area[edge, a] -= fan_area(vx[edge, a], vy[edge, a], vx[edge, b], vy[edge, b], ux, uy, px[edge], py[edge])
+                area[edge, b] -= fan_area(vx[edge, b], vy[edge, b], px[edge], py[edge], ux, uy, vx[edge, a], vy[edge, a])
+        total = numpy.bincount(cell, weights=area.sum(axis=1), minlength=m)
+        covered = numpy.bincount(cell, weights=inside, minlength=m) > 0
+        estimates = numpy.empty((m, columns.shape[1]))
+        for col in range(columns.shape[1]):
+            numerator = numpy.bincount(cell, weights=(area * columns[v, col]).sum(axis=1), minlength=m)
+            with numpy.errstate(invalid="ignore", divide="ignore"):
+                estimates[:, col] = numerator / total
+        estimates[~covered | ~(total > 0)] = numpy.nan
+        # Cells on a sample take its value
+        onSample = hit >= 0
+        estimates[cell[onSample]] = columns[hit[onSample]]
+        out[i:i + step] = estimates.reshape((m,) + values.shape[1:])
+    return out
+
+def unique_samples (x, y, values):
+    # Samples at distinct locations, values at repeated locations averaged
+    order = numpy.lexsort((y, x))
+    x, y, values = x[order], y[order], values[order]
+    first = numpy.ones(len(x), dtype=bool)
+    first[1:] = (numpy.diff(x) != 0) | (numpy.diff(y) != 0)
+    if first.all():
+        return x, y, values
+    starts = numpy.nonzero(first)[0]
+    counts = numpy.diff(numpy.append(starts, len(x))).astype(numpy.float64)
+    sums = numpy.add.reduceat(values, starts, axis=0)
+    return x[starts], y[starts], sums / counts.reshape((-1,) + (1,) * (values.ndim - 1))
+
+def nn_tile (task):
+    # Process pool worker: GRID_IDs and natural neighbor estimates for the cells of one tile
+    tile, tileMask, arrays, values = task
+    ids = []
+    estimates = []
+    for blockKey, blockIds, qx, qy in iter_blocks(tile, tileMask):
+        qx = (qx - arrays["cx"]) / arrays["scale"]
+        qy = (qy - arrays["cy"]) / arrays["scale"]
+        ids.append(blockIds)
+        estimates.append(sibson_block(arrays, values, qx, qy))
+    if len(ids) == 0:
+        return numpy.zeros(0, dtype=numpy.int32), numpy.zeros((0,) + values.shape[1:])
+    return numpy.concatenate(ids), numpy.concatenate(estimates)
+
+def iter_nn_tiles (grid, arrays, values, mask, processes):
+    # Tasks for nn_tile: the triangulation is small next to the grid and goes to every tile
+    step = tile_rows(grid, processes)
+    geometry = dict([(key, grid[key]) for key in ("xmin", "ymax", "cellsize", "nrows", "ncols")])
+    for r0 in range(0, grid["nrows"], step):
+        r1 = min(r0 + step, grid["nrows"])
+        tile = dict(geometry)
+        tile["row0"] = r0
+        tile["grid_id"] = numpy.array(grid["grid_id"][r0:r1])
+        tileMask = None if mask is None else numpy.array(mask[r0:r1], dtype=bool)
+        yield (tile, tileMask, arrays, values)
+
+def nn_cells (grid, x, y, values, cellValues, mask=None, processes=1, tin=None):
+    # Fills cellValues (indexed by GRID_ID) with natural neighbor estimates at every grid cell inside the mask,
+    # NaN outside the hull of the samples; values and cellValues may hold one column / array per contaminant.
+    # Returns the triangulation with its samples, which may be passed back in for the same samples
+    columns = cellValues if isinstance(cellValues, list) else [cellValues]
+    for column in columns:
+        column[:] = numpy.nan
+    x, y, values = unique_samples(x, y, values)
+    if len(values) < 3:
+        return tin
+    if tin is None:
+        tin = triangulate(x, y)
+    tin["x"], tin["y"], tin["values"] = x, y, values
+    arrays = tin_arrays(tin)
+    tasks = iter_nn_tiles(grid, arrays, values, mask, processes)
+    if processes > 1 and ARD_HEA_Grid.max_id(grid) >= PARALLEL_CELLS:
+        import ARD_HEA_Tools
+        pool = ARD_HEA_Tools.process_pool(processes)
+        try:
+            for ids, estimates in pool.imap_unordered(nn_tile, tasks):
+                store_estimates(cellValues, ids, estimates)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        for task in tasks:
+            ids, estimates = nn_tile(task)
+            store_estimates(cellValues, ids, estimates)
+    return tin
+
+def tin_folder (geoDB):
+    import os
+    import ARD_HEA_Tools
+    folder = os.path.join(ARD_HEA_Tools.cache_dir(geoDB), TIN_FOLDER)
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    return folder
+
+def tin_save (geoDB, name, tin, meta):
+    # Triangulation, samples and the settings it was built with (grid, mask, transform)
+    import os
+    import json
+    path = os.path.join(tin_folder(geoDB), name)
+    numpy.savez(path + ".npz", px=numpy.array(tin["px"]), py=numpy.array(tin["py"]),
+                V=numpy.array(tin["V"], dtype=numpy.int64), N=numpy.array(tin["N"], dtype=numpy.int64),
+                C=numpy.array(tin["C"], dtype=numpy.float64), x=tin["x"], y=tin["y"], values=tin["values"])
+    definition = dict(meta)
+    definition.update({"cx": tin["cx"], "cy": tin["cy"], "scale": tin["scale"], "last": tin["last"]})
+    f = open(path + ".json", "w")
+    f.write(json.dumps(definition))
+    f.close()
+
+def tin_load (geoDB, name, meta):
+    # Stored triangulation when it was built with the same settings, otherwise None
+    import os
+    import json
+    path = os.path.join(tin_folder(geoDB), name)
+    if not os.path.exists(path + ".json") or not os.path.exists(path + ".npz"):
+        return None
+    f = open(path + ".json", "r")
+    definition = json.loads(f.read())
+    f.close()
+    for key in meta:
+        if definition.get(key) != meta[key]:
+            return None
+    stored = numpy.load(path + ".npz")
+    tin = {"cx": definition["cx"], "cy": definition["cy"], "scale": definition["scale"], "last": definition["last"],
+           "px": stored["px"].tolist(), "py": stored["py"].tolist(), "V": stored["V"].tolist(),
+           "N": stored["N"].tolist(), "C": [tuple(c) for c in stored["C"].tolist()],
+           "x": stored["x"], "y": stored["y"], "values": stored["values"]}
+    stored.close()
+    return tin
+
+def tin_delete (geoDB, name):
+    import os
+    base = os.path.join(tin_folder(geoDB), name)
+    for path in (base + ".npz", base + ".json"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def tin_meta (grid, mask, method, param):
+    # Settings a stored triangulation and surface depend on; the triangulation is saved with the checksum of its
+    # surface's cell array as "values"
+    import hashlib
+    maskKey = None
+    if mask is not None:
+        maskKey = hashlib.md5(numpy.packbits(numpy.asarray(mask, dtype=bool).ravel())).hexdigest()
+    return {"grid": ARD_HEA_Grid.grid_signature(grid), "max_id": ARD_HEA_Grid.max_id(grid),
+            "mask": maskKey, "transform": method, "param": param}
+
+def nn_update (grid, tin, x, y, values, cellValues, mask=None, method="", param=None):
+    # Brings a stored triangulation up to date with the samples: new stations are inserted and cells whose
+    # natural neighbors changed are evaluated again and back-transformed into cellValues.  Returns the GRID_IDs
+    # evaluated, or None when stations were removed and the surface must be rebuilt
+    x, y, values = unique_samples(x, y, values)
+    stored = dict([((float(tin["x"][i]), float(tin["y"][i])), i) for i in range(len(tin["x"]))])
+    match = numpy.array([stored.get((float(x[i]), float(y[i])), -1) for i in range(len(x))], dtype=numpy.int64)
+    if (match >= 0).sum() < len(tin["x"]):
+        return None
+    old = match >= 0
+    allValues = numpy.array(tin["values"])
+    changed = match[old][allValues[match[old]] != values[old]]
+    allValues[match[old]] = values[old]
+    allValues = numpy.concatenate((allValues, values[~old]))
+    circles = []
+    # Stations with new values: triangles around them
+    if len(changed) > 0:
+        V = numpy.array(tin["V"], dtype=numpy.int64)
+        C = numpy.array(tin["C"], dtype=numpy.float64)
+        around = (V >= 3).all(axis=1) & numpy.in1d(V.ravel(), changed + 3).reshape(V.shape).any(axis=1)
+        circles.extend(C[around].tolist())
+    # New stations: triangles removed and made by inserting them
+    newX, newY = tin_coordinates(tin, x[~old], y[~old])
+    jitter = numpy.random.RandomState(len(tin["px"])).uniform(-JITTER, JITTER, (2, len(newX)))
+    first = len(tin["px"])
+    tin["px"].extend((newX + jitter[0]).tolist())
+    tin["py"].extend((newY + jitter[1]).tolist())
+    for i in tin_order(newX, newY) if len(newX) > 0 else []:
+        removed, made = tin_insert(tin, first + int(i))
+        circles.extend([c for s, tri, c in removed if min(tri) >= 3])
+        circles.extend([tin["C"][t] for t in made if min(tin["V"][t]) >= 3])
+    tin["x"] = numpy.concatenate((tin["x"], x[~old]))
+    tin["y"] = numpy.concatenate((tin["y"], y[~old]))
+    tin["values"] = allValues
+    # Cells inside any of the circles
+    found = [numpy.zeros(0, dtype=numpy.int32)]
+    for ccx, ccy, r2 in circles:
+        found.append(ARD_HEA_Grid.circle_cells(grid, ccx * tin["scale"] + tin["cx"], ccy * tin["scale"] + tin["cy"],
+                                               math.sqrt(r2) * tin["scale"] * (1.0 + 1e-9), mask))
+    ids = numpy.unique(numpy.concatenate(found))
+    if len(ids) == 0:
+        return ids
+    arrays = tin_arrays(tin)
+    rows, cols = ARD_HEA_Grid.cell_index_of(grid, ids)
+    blocks = (rows // BLOCK) * ((grid["ncols"] + BLOCK - 1) // BLOCK) + cols // BLOCK
+    order = numpy.argsort(blocks, kind="mergesort")
+    starts = numpy.nonzero(numpy.diff(numpy.append(-1, blocks[order])))[0]
+    for first, last in zip(starts, numpy.append(starts[1:], len(order))):
+        block = order[first:last]
+        qx, qy = tin_coordinates(tin, *ARD_HEA_Grid.cell_centers(grid, rows[block], cols[block]))
+        cellValues[ids[block]] = back_transform(sibson_block(arrays, allValues, qx, qy), method, param)
+    return ids
+
+def save_settings (geoDB, name, settings, x, y, values, segments=None, maskFeatures=None):
+    # Method, parameters and transformed samples a surface was interpolated with, kept next to its cell array
+    # so cells added to the grid later are evaluated the same way (extend_surface)
+    import json
+    path = ARD_HEA_Grid.surface_settings_path(geoDB, name)
+    arrays = {"x": numpy.asarray(x, dtype=numpy.float64), "y": numpy.asarray(y, dtype=numpy.float64),
+              "values": numpy.asarray(values, dtype=numpy.float64)}
+    if segments is not None:
+        arrays["segments"] = numpy.asarray(segments, dtype=numpy.float64).reshape(-1, 4)
+    if maskFeatures is not None:
+        arrays["mask_counts"] = numpy.array([len(edges) for edges in maskFeatures], dtype=numpy.int64)
+        arrays["mask_edges"] = numpy.vstack(maskFeatures) if len(maskFeatures) > 0 else numpy.zeros((0, 4))
+    numpy.savez(path + ".npz", **arrays)
+    f = open(path + ".json", "w")
+    f.write(json.dumps(settings))
+    f.close()
+
+def load_settings (geoDB, name):
+    # Settings, samples, barrier segments and mask polygon edges kept by save_settings, None when there are none
+    import os
+    import json
+    path = ARD_HEA_Grid.surface_settings_path(geoDB, name)
+    if not os.path.exists(path + ".json") or not os.path.exists(path + ".npz"):
+        return None
+    f = open(path + ".json", "r")
+    settings = json.loads(f.read())
+    f.close()
+    stored = numpy.load(path + ".npz")
+    segments = None
+    if "segments" in stored.files:
+        segments = stored["segments"]
+    maskFeatures = None
+    if "mask_counts" in stored.files:
+        maskFeatures = numpy.split(stored["mask_edges"], numpy.cumsum(stored["mask_counts"])[:-1])
+        maskFeatures = [edges for edges in maskFeatures if len(edges) > 0]
+    x, y, values = stored["x"], stored["y"], stored["values"]
+    stored.close()
+    return settings, x, y, values, segments, maskFeatures
+
+def extend_surface (geoDB, grid, name, cellIds, removedIds=None, spatialRef=None):
+    # Evaluates a surface at cells added to the grid with its kept settings and samples; its SURFACES cell arrays
+    # are resized to the grid with the removed cells cleared, its rasters rewritten when they exist and a natural
+    # neighbor triangulation kept for the new grid.  Returns the values at cellIds, None when no settings were kept
+    import arcpy
+    stored = load_settings(geoDB, name)
+    if stored is None:
+        return None
+    settings, x, y, values, segments, maskFeatures = stored
+    cellIds = numpy.asarray(cellIds, dtype=numpy.int64)
+    rows, cols = ARD_HEA_Grid.cell_index_of(grid, cellIds)
+    mask = numpy.zeros((grid["nrows"], grid["ncols"]), dtype=bool)
+    mask[rows, cols] = True
+    gridMask = None
+    if maskFeatures is not None:
+        gridMask = numpy.asarray(grid["grid_id"]) > 0
+        gridMask &= ARD_HEA_Grid.mask_cells(geoDB, grid, maskFeatures)
+        mask &= gridMask
+    method, transform, param = settings["method"], settings["transform"], settings["param"]
+    cellValues = numpy.zeros(ARD_HEA_Grid.max_id(grid) + 1)
+    surfaces = [(name, cellValues)]
+    tin = None
+    checksum = None
+    if method == "IDW":
+        idw_cells(grid, x, y, values, cellValues, settings["power"], settings["radius"], mask, segments)
+    elif method == "NN":
+        tin = nn_cells(grid, x, y, values, cellValues, mask)
+    elif method == "KRG":
+        cellVariances = numpy.zeros(len(cellValues))
+        krige_cells(grid, x, y, values, cellValues, cellVariances, settings["vario"], settings["radius"], mask, 1, transform)
+        surfaces.append((settings["variance"], cellVariances))
+    else:
+        return None
+    cellValues[:] = back_transform(cellValues, transform, param)
+    for surface, surfaceValues in surfaces:
+        stored = ARD_HEA_Grid.extend_cell_array(geoDB, "SURFACES", surface, grid, cellIds, surfaceValues[cellIds], removedIds)
+        if stored is None:
+            continue
+        raster = geoDB + "\\" + surface
+        if arcpy.Exists(raster):
+            ARD_HEA_Grid.write_surface_raster(geoDB, grid, stored, raster, spatialRef)
+        if surface == name:
+            checksum = ARD_HEA_Grid.array_checksum(stored)
+        del stored
+    if tin is not None and checksum is not None:
+        meta = tin_meta(grid, gridMask, transform, param)
+        meta["values"] = checksum
+        tin_save(geoDB, name, tin, meta)
+    return cellValues[cellIds]
+
+def variogram_shape (model, h, a):
+    # Unit sill semivariogram model with (practical) range a
+    h = numpy.asarray(h, dtype=numpy.float64) / a
+    if model == "SPHERICAL":
+        return numpy.where(h < 1.0, 1.5 * h - 0.5 * h ** 3, 1.0)
+    if model == "EXPONENTIAL":
+        return 1.0 - numpy.exp(-3.0 * h)
+    if model == "GAUSSIAN":
+        return 1.0 - numpy.exp(-3.0 * h * h)
+    raise ValueError("Unknown variogram model: " + str(model))
+
+def semivariance (vario, h):
+    # Fitted semivariogram; zero at zero distance so kriging honors the samples
+    h = numpy.asarray(h, dtype=numpy.float64)
+    gamma = vario["nugget"] + vario["sill"] * variogram_shape(vario["model"], h, vario["range"])
+    return numpy.where(h > 0, gamma, 0.0)
+
+def empirical_variogram (x, y, values, lagSize=None, lagCount=12):
+    # Mean distance, semivariance and pair count of sample pairs binned by distance, pairs found with the index
+    n = len(values)
+    if lagSize is None:
+        lagSize = 0.5 * math.sqrt(float(x.max() - x.min()) ** 2 + float(y.max() - y.min()) ** 2) / lagCount
+    maxLag = lagSize * lagCount
+    index = build_index(x, y)
+    count = numpy.zeros(lagCount)
+    dsum = numpy.zeros(lagCount)
+    gsum = numpy.zeros(lagCount)
+    for i in range(0, n, BLOCK):
+        rows = index["order"][i:i + BLOCK]
+        qx, qy = x[rows], y[rows]
+        cx = 0.5 * (qx.min() + qx.max())
+        cy = 0.5 * (qy.min() + qy.max())
+        h = 0.5 * math.sqrt((qx.max() - qx.min()) ** 2 + (qy.max() - qy.min()) ** 2)
+        cand = query_radius(index, cx, cy, maxLag + h)
+        d2 = block_distances(index, cand, qx, qy)
+        # Each pair once
+        r, c = numpy.nonzero((d2 < maxLag * maxLag) & (cand[None, :] > rows[:, None]))
+        d = numpy.sqrt(d2[r, c])
+        lag = numpy.minimum((d / lagSize).astype(numpy.int64), lagCount - 1)
+        count += numpy.bincount(lag, minlength=lagCount)
+        dsum += numpy.bincount(lag, weights=d, minlength=lagCount)
+        gsum += numpy.bincount(lag, weights=0.5 * (values[rows[r]] - values[cand[c]]) ** 2, minlength=lagCount)
+    used = count > 0
+    return dsum[used] / count[used], gsum[used] / count[used], count[used]
+
+def fit_variogram (distance, gamma, count, model="SPHERICAL"):
+    # Range by grid search; nugget and partial sill by least squares weighted by pair count, kept non-negative
+    best = None
+    for a in numpy.linspace(0.05, 1.5, 59) * float(distance.max()):
+        f = variogram_shape(model, distance, a)
+        w = count
+        sw, sf, sff = w.sum(), (w * f).sum(), (w * f * f).sum()
+        sg, sfg = (w * gamma).sum(), (w * f * gamma).sum()
+        det = sw * sff - sf * sf
+        nugget = (sg * sff - sf * sfg) / det if det > 0 else 0.0
+        sill = (sw * sfg - sf * sg) / det if det > 0 else 0.0
+        if nugget < 0:
+            nugget, sill = 0.0, sfg / sff
+        if sill < 0:
+            nugget, sill = sg / sw, 0.0
+        error = (w * (gamma - nugget - sill * f) ** 2).sum()
+        if best is None or error < best[0]:
+            best = (error, nugget, sill, a)
+    if best[2] <= 0:
+        # Pure nugget: keep a small structured part so the kriging system stays solvable
+        best = (best[0], best[1], max(best[1], 1e-12) * 1e-6, best[3])
+    return {"model": model, "nugget": float(best[1]), "sill": float(best[2]), "range": float(best[3])}
+
+def solve_system (A, B):
+    try:
+        return numpy.linalg.solve(A, B)
+    except numpy.linalg.LinAlgError:
+        return numpy.dot(numpy.linalg.pinv(A), B)
+
+def krige_block (index, values, qx, qy, vario, search):
+    # Ordinary kriging estimates, variances and Lagrange multipliers at cell centers from the samples selected
+    # by the search radius, as for IDW
+    n = len(values)
+    estimate = numpy.empty(len(qx))
+    estimate.fill(numpy.nan)
+    variance = estimate.copy()
+    multiplier = estimate.copy()
+    k = min(search["points"], n)
+    cx, cy, h, reach = block_reach(index, n, qx, qy, search)
+    cand = query_radius(index, cx, cy, reach)
+    if len(cand) == 0:
+        return estimate, variance, multiplier
+    step = max(1, BLOCK_ENTRIES // len(cand))
+    for i in range(0, len(qx), step):
+        d2 = block_distances(index, cand, qx[i:i + step], qy[i:i + step])
+        if search["type"] == "VARIABLE":
+            valid = rank_rows(d2) < k
+            if search["distance"] is not None:
+                valid &= d2 <= search["distance"] ** 2
+        else:
+            valid = d2 <= search["distance"] ** 2
+            if k > 0:
+                valid |= rank_rows(d2) < k
+        # Cells with the same neighbors share one kriging system
+        packed = numpy.packbits(valid, axis=1)
+        order = numpy.lexsort(packed.T[::-1])
+        packed = packed[order]
+        starts = numpy.nonzero(numpy.append(True, (packed[1:] != packed[:-1]).any(axis=1)))[0]
+        for first, last in zip(starts, numpy.append(starts[1:], len(order))):
+            members = order[first:last]
+            used = numpy.nonzero(valid[members[0]])[0]
+            kk = len(used)
+            if kk == 0:
+                continue
+            nb = cand[used]
+            A = numpy.ones((kk + 1, kk + 1))
+            A[kk, kk] = 0.0
+            A[:kk, :kk] = semivariance(vario, numpy.sqrt((index["x"][nb][:, None] - index["x"][nb][None, :]) ** 2 +
+                                                         (index["y"][nb][:, None] - index["y"][nb][None, :]) ** 2))
+            B = numpy.ones((kk + 1, len(members)))
+            B[:kk] = semivariance(vario, numpy.sqrt(d2[members][:, used])).T
+            solution = solve_system(A, B)
+            estimate[i + members] = numpy.dot(values[nb], solution[:kk])
+            variance[i + members] = numpy.maximum((solution * B).sum(axis=0), 0.0)
+            multiplier[i + members] = solution[kk]
+    return estimate, variance, multiplier
+
+def lognormal_shift (variance, multiplier, method):
+    # Added to a kriged log estimate so that its back-transform is the unbiased (mean) estimate rather than
+    # the median: sigma^2 / 2 - mu for natural logs, where the kriging variance sigma^2 and the Lagrange
+    # multiplier mu are in squared log units; log10 values are shifted by ln(10) times that amount in log10 units
+    if method == "LN":
+        return variance / 2.0 - multiplier
+    if method == "LOG10":
+        return math.log(10.0) * (variance / 2.0 - multiplier)
+    raise ValueError("No lognormal correction for transform: " + method)
+
+def krige_tile (task):
+    # Process pool worker: GRID_IDs, estimates and variances for the cells of one tile; with a log transform
+    # the estimates carry the lognormal shift
+    tile, tileMask, x, y, values, vario, search, method = task
+    ids = []
+    estimates = []
+    variances = []
+    if len(values) > 0:
+        index = build_index(x, y)
+        for blockKey, blockIds, qx, qy in iter_blocks(tile, tileMask):
+            estimate, variance, multiplier = krige_block(index, values, qx, qy, vario, search)
+            if method != "":
+                estimate = estimate + lognormal_shift(variance, multiplier, method)
+            ids.append(blockIds)
+            estimates.append(estimate)
+            variances.append(variance)
+    if len(ids) == 0:
+        return numpy.zeros(0, dtype=numpy.int32), numpy.zeros(0), numpy.zeros(0)
+    return numpy.concatenate(ids), numpy.concatenate(estimates), numpy.concatenate(variances)
+
+def krige_cells (grid, x, y, values, cellValues, cellVariances, vario, radius=None, mask=None, processes=1, method=""):
+    # Fills cellValues and cellVariances (indexed by GRID_ID) at every grid cell inside the mask.  For values
+    # transformed with LN or LOG10 (method), cellValues holds the estimates plus lognormal_shift, whose
+    # back_transform is the unbiased estimate; the variances stay in squared transformed units
+    cellValues[:] = numpy.nan
+    cellVariances[:] = numpy.nan
+    x, y, values = unique_samples(x, y, values)
+    if len(values) == 0:
+        return
+    search = parse_radius(radius if radius not in (None, '#', '') else "VARIABLE 16", grid["cellsize"])
+    # Tiles get the samples inside the halo reached by their blocks, as for IDW
+    tasks = (task[:5] + (vario, search, method) for task in iter_idw_tiles(grid, x, y, values, None, search, mask, None, processes))
+    if processes > 1 and ARD_HEA_Grid.max_id(grid) >= PARALLEL_CELLS:
+        import ARD_HEA_Tools
+        pool = ARD_HEA_Tools.process_pool(processes)
+        try:
+            for ids, estimates, variances in pool.imap_unordered(krige_tile, tasks):
+                cellValues[ids] = estimates
+                cellVariances[ids] = variances
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        for task in tasks:
+            ids, estimates, variances = krige_tile(task)
+            cellValues[ids] = estimates
+            cellVariances[ids] = variances
+
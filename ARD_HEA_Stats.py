@@ -0,0 +1,403 @@
+# ---------------------------------------------------------------------------
+# NAME: ARD_HEA_Stats.py
+# Version: 2.0 (ArcGIS 10.2)
+# Author: Research Planning, Inc.
+#
+# Description: Module containing the sample statistics used by the ARD HEA Tool
+#              python scripts.  Samples are read once into numpy arrays and
+#              coincident sample locations are aggregated in memory.  Nearest
+#              neighbor statistics and Moran's I are computed from the bucket spatial
+#              index of ARD_HEA_Interp instead of the Spatial Statistics tools.
+#
+# Notes:  Currently the tool is designed to only be run via the ARD HEA Toolbox.
+#         Coincident samples are grouped by sorting on their coordinates, or on
+#         their coordinates snapped to a tolerance, so the grouped stations come
+#         out in the POINT_X, POINT_Y order of the Summary Statistics tool used
+#         by earlier versions.
+#         Delimited text exports are streamed in chunks of CHUNK_ROWS rows; each
+#         chunk is reduced to per-station partial statistics and merged into the
+#         running totals, so memory grows with the number of stations rather
+#         than the number of rows.
+#         Average Nearest Neighbor uses the ESRI formulas with the area of the
+#         rectangle enclosing the stations; the distance band is the minimum,
+#         mean and maximum distance from each station to its nearest neighbor.
+#         Moran's I uses sparse inverse distance weights, by default over the
+#         smallest distance band giving every station a neighbor as the Spatial
+#         Autocorrelation tool does, with the z-score from the randomization
+#         variance.  The optional permutation test runs in a process pool;
+#         permutations are drawn in fixed chunks from seeded generators so the
+#         result does not depend on the number of processes.
+#
+# Date Created: October 17, 2026
+#
+# ---------------------------------------------------------------------------
+
+import math
+import numpy
+import ARD_HEA_Interp
+
+STATISTICS = ("MAX", "MIN", "MEAN", "SUM", "RANGE", "COUNT", "FIRST", "LAST")
+PERMUTATION_CHUNK = 50
+CHUNK_ROWS = 100000
+DELIMITED_TYPES = (".csv", ".txt", ".tab", ".asc")
+XY_FIELDS = (("X", "Y"), ("POINT_X", "POINT_Y"), ("EASTING", "NORTHING"), ("X_COORD", "Y_COORD"))
+
+def station_groups (x, y, tolerance=0.0, order=None):
+    # Sort order of the samples and start of each group of coincident samples in it; a subset of an
+    # earlier sort order can be given to group only those samples
+    if tolerance > 0:
+        kx = numpy.floor(x / tolerance + 0.5)
+        ky = numpy.floor(y / tolerance + 0.5)
+    else:
+        kx, ky = x, y
+    if order is None:
+        order = numpy.lexsort((ky, kx))
+    kx, ky = kx[order], ky[order]
+    first = numpy.ones(len(order), dtype=bool)
+    first[1:] = (kx[1:] != kx[:-1]) | (ky[1:] != ky[:-1])
+    return order, numpy.nonzero(first)[0]
+
+def aggregate_stations (x, y, values, statistic="MAX", tolerance=0.0, order=None):
+    # One station per group of coincident samples: coordinates, sample count and the statistic of the values
+    statistic = statistic.upper()
+    if statistic not in STATISTICS:
+        raise ValueError("Unknown statistic: " + str(statistic))
+    if len(values) == 0 or (order is not None and len(order) == 0):
+        return x[:0], y[:0], numpy.zeros(0, dtype=numpy.int32), values[:0]
+    order, starts = station_groups(x, y, tolerance, order)
+    x, y, values = x[order], y[order], values[order]
+    ends = numpy.append(starts[1:], len(order))
+    counts = ends - starts
+    # Snapped groups sit at the mean location of their samples; exact groups keep their coordinates
+    px = x[starts] + numpy.add.reduceat(x - numpy.repeat(x[starts], counts), starts) / counts
+    py = y[starts] + numpy.add.reduceat(y - numpy.repeat(y[starts], counts), starts) / counts
+    if statistic == "MAX":
+        stat = numpy.maximum.reduceat(values, starts)
+    elif statistic == "MIN":
+        stat = numpy.minimum.reduceat(values, starts)
+    elif statistic == "MEAN":
+        stat = numpy.add.reduceat(values, starts) / counts
+    elif statistic == "SUM":
+        stat = numpy.add.reduceat(values, starts)
+    elif statistic == "RANGE":
+        stat = numpy.maximum.reduceat(values, starts) - numpy.minimum.reduceat(values, starts)
+    elif statistic == "COUNT":
+        stat = counts.astype(numpy.float64)
+    elif statistic == "FIRST":
+        stat = values[starts]
+    else:
+        stat = values[ends - 1]
+    return px, py, counts.astype(numpy.int32), stat
+
+def write_stations (outFC, x, y, counts, values, field, spatialRef):
+    # Point feature class with the FREQUENCY, POINT_X, POINT_Y and statistic fields of Summary Statistics
+    import arcpy
+    import os
+    if arcpy.Exists(outFC):
+        arcpy.Delete_management(outFC)
+    arcpy.CreateFeatureclass_management(os.path.dirname(outFC), os.path.basename(outFC), "POINT", "", "DISABLED", "DISABLED", spatialRef)
+    arcpy.AddField_management(outFC, "FREQUENCY", "LONG")
+    arcpy.AddField_management(outFC, "POINT_X", "DOUBLE")
+    arcpy.AddField_management(outFC, "POINT_Y", "DOUBLE")
+    arcpy.AddField_management(outFC, field, "DOUBLE")
+    with arcpy.da.InsertCursor(outFC, ["SHAPE@XY", "FREQUENCY", "POINT_X", "POINT_Y", field]) as cursor:
+        for i in range(len(x)):
+            cursor.insertRow(((float(x[i]), float(y[i])), int(counts[i]), float(x[i]), float(y[i]), float(values[i])))
+    return outFC
+
+def station_keys (x, y, tolerance=0.0):
+    if tolerance > 0:
+        return numpy.floor(x / tolerance + 0.5), numpy.floor(y / tolerance + 0.5)
+    return x, y
+
+def sample_partials (x, y, values, tolerance=0.0):
+    # Partial statistics of single samples, to be merged with merge_partials
+    kx, ky = station_keys(x, y, tolerance)
+    return {"kx": kx, "ky": ky, "count": numpy.ones(len(x), dtype=numpy.int64), "sx": x, "sy": y,
+            "sum": values, "max": values, "min": values, "first": values, "last": values}
+
+def merge_partials (partials):
+    # One partial per station from a list of partials in sample order
+    parts = dict([(key, numpy.concatenate([p[key] for p in partials])) for key in partials[0]])
+    order = numpy.lexsort((parts["ky"], parts["kx"]))
+    parts = dict([(key, parts[key][order]) for key in parts])
+    if len(order) == 0:
+        return parts
+    first = numpy.ones(len(order), dtype=bool)
+    first[1:] = (parts["kx"][1:] != parts["kx"][:-1]) | (parts["ky"][1:] != parts["ky"][:-1])
+    starts = numpy.nonzero(first)[0]
+    ends = numpy.append(starts[1:], len(order))
+    merged = {"kx": parts["kx"][starts], "ky": parts["ky"][starts],
+              "first": parts["first"][starts], "last": parts["last"][ends - 1],
+              "max": numpy.maximum.reduceat(parts["max"], starts), "min": numpy.minimum.reduceat(parts["min"], starts)}
+    for key in ("count", "sx", "sy", "sum"):
+        merged[key] = numpy.add.reduceat(parts[key], starts)
+    return merged
+
+def partial_stations (partials, statistic="MAX", tolerance=0.0):
+    # Coordinates, sample count and statistic of each station from merged partials, as aggregate_stations
+    statistic = statistic.upper()
+    if statistic not in STATISTICS:
+        raise ValueError("Unknown statistic: " + str(statistic))
+    counts = partials["count"]
+    if tolerance > 0:
+        px, py = partials["sx"] / counts, partials["sy"] / counts
+    else:
+        px, py = partials["kx"], partials["ky"]
+    stat = {"MAX": partials["max"], "MIN": partials["min"], "FIRST": partials["first"], "LAST": partials["last"],
+            "SUM": partials["sum"], "MEAN": partials["sum"] / numpy.maximum(counts, 1),
+            "RANGE": partials["max"] - partials["min"], "COUNT": counts.astype(numpy.float64)}[statistic]
+    return px, py, counts.astype(numpy.int32), stat
+
+def delimited_fields (path):
+    # Column names of a delimited text export and the csv dialect to read it with
+    import csv
+    f = open(path, "rb") if str is bytes else open(path, newline="")
+    try:
+        sample = f.read(65536)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        f.seek(0)
+        header = next(csv.reader(f, dialect))
+    finally:
+        f.close()
+    return [name.strip() for name in header], dialect
+
+def read_delimited (path, fields, xField, yField, chunkRows=CHUNK_ROWS):
+    # Chunks of (x, y, values) from a delimited text export; entries that are not numbers are NaN
+    import csv
+    header, dialect = delimited_fields(path)
+    upper = [name.upper() for name in header]
+    columns = [upper.index(name.upper()) for name in [xField, yField] + list(fields)]
+    def number (text):
+        try:
+            return float(text)
+        except ValueError:
+            return numpy.nan
+    def parse (rows):
+        table = numpy.array([[number(row[c]) if c < len(row) else numpy.nan for c in columns] for row in rows])
+        return table[:, 0], table[:, 1], table[:, 2:]
+    f = open(path, "rb") if str is bytes else open(path, newline="")
+    try:
+        reader = csv.reader(f, dialect)
+        next(reader)
+        rows = []
+        for row in reader:
+            if len(row) == 0:
+                continue
+            rows.append(row)
+            if len(rows) == chunkRows:
+                yield parse(rows)
+                rows = []
+        if len(rows) > 0:
+            yield parse(rows)
+    finally:
+        f.close()
+
+def stream_stations (path, fields, xField, yField, statistic="MAX", tolerance=0.0, chunkRows=CHUNK_ROWS):
+    # Stations of each field of a delimited export, read in chunks; rows without valid coordinates are
+    # rejected and samples not taken (-999.99, blank or not a number) skipped.  Returns a list of
+    # (x, y, counts, values) per field, the number of rows read, rejected rows and samples of each field
+    partials = [None] * len(fields)
+    taken = [0] * len(fields)
+    rows = rejected = 0
+    for x, y, values in read_delimited(path, fields, xField, yField, chunkRows):
+        rows += len(x)
+        located = numpy.isfinite(x) & numpy.isfinite(y)
+        rejected += int((~located).sum())
+        for i in range(len(fields)):
+            keep = located & (values[:, i] > -999.99)
+            taken[i] += int(keep.sum())
+            part = sample_partials(x[keep], y[keep], values[keep, i], tolerance)
+            partials[i] = merge_partials([part] if partials[i] is None else [partials[i], part])
+    stations = []
+    for i in range(len(fields)):
+        if partials[i] is None:
+            empty = numpy.zeros(0)
+            stations.append((empty, empty, numpy.zeros(0, dtype=numpy.int32), empty))
+        else:
+            stations.append(partial_stations(partials[i], statistic, tolerance))
+    return stations, rows, rejected, taken
+
+def normal_pvalue (z):
+    # Two-sided p-value of a standard normal z-score
+    return math.erfc(abs(z) / math.sqrt(2.0))
+
+def nearest_distances (x, y):
+    # Distance from every station to its nearest other station
+    n = len(x)
+    index = ARD_HEA_Interp.build_index(x, y)
+    nearest = numpy.empty(n)
+    search = {"type": "VARIABLE", "points": 2, "distance": None}
+    for i in range(0, n, ARD_HEA_Interp.BLOCK):
+        rows = index["order"][i:i + ARD_HEA_Interp.BLOCK]
+        qx, qy = x[rows], y[rows]
+        cx, cy, h, reach = ARD_HEA_Interp.block_reach(index, n, qx, qy, search)
+        cand = ARD_HEA_Interp.query_radius(index, cx, cy, reach)
+        d2 = ARD_HEA_Interp.block_distances(index, cand, qx, qy)
+        d2[cand[None, :] == rows[:, None]] = numpy.inf
+        nearest[rows] = numpy.sqrt(d2.min(axis=1))
+    return nearest
+
+def nearest_neighbor_stats (x, y, area=None):
+    # Average Nearest Neighbor ratio, z-score and p-value and the nearest neighbor distance band
+    n = len(x)
+    nearest = nearest_distances(x, y)
+    if area is None:
+        area = float(x.max() - x.min()) * float(y.max() - y.min())
+    stats = {"observed": float(nearest.mean()), "min": float(nearest.min()),
+             "avg": float(nearest.mean()), "max": float(nearest.max()),
+             "expected": None, "ratio": None, "zscore": None, "pvalue": None}
+    if area > 0:
+        stats["expected"] = 0.5 / math.sqrt(n / area)
+        stats["ratio"] = stats["observed"] / stats["expected"]
+        stats["zscore"] = (stats["observed"] - stats["expected"]) / (0.26136 / math.sqrt(n * float(n) / area))
+        stats["pvalue"] = normal_pvalue(stats["zscore"])
+    return stats
+
+def spatial_weights (x, y, distance=None, neighbors=None):
+    # Sparse inverse distance weights as station pairs (i, j, w): every other station within distance,
+    # or the k nearest; the default distance is the largest nearest neighbor distance
+    n = len(x)
+    index = ARD_HEA_Interp.build_index(x, y)
+    if neighbors is None and distance is None:
+        distance = float(nearest_distances(x, y).max())
+    search = {"type": "VARIABLE", "points": (neighbors or 0) + 1, "distance": None}
+    pairs = ([], [], [])
+    for b in range(0, n, ARD_HEA_Interp.BLOCK):
+        rows = index["order"][b:b + ARD_HEA_Interp.BLOCK]
+        qx, qy = x[rows], y[rows]
+        if neighbors is not None:
+            cx, cy, h, reach = ARD_HEA_Interp.block_reach(index, n, qx, qy, search)
+        else:
+            cx = 0.5 * (qx.min() + qx.max())
+            cy = 0.5 * (qy.min() + qy.max())
+            reach = distance + 0.5 * math.sqrt((qx.max() - qx.min()) ** 2 + (qy.max() - qy.min()) ** 2)
+        cand = ARD_HEA_Interp.query_radius(index, cx, cy, reach)
+        d2 = ARD_HEA_Interp.block_distances(index, cand, qx, qy)
+        d2[cand[None, :] == rows[:, None]] = numpy.inf
+        if neighbors is not None:
+            used = ARD_HEA_Interp.rank_rows(d2) < neighbors
+            used &= numpy.isfinite(d2)
+        else:
+            used = d2 <= distance * distance
+        r, c = numpy.nonzero(used)
+        pairs[0].append(rows[r])
+        pairs[1].append(cand[c])
+        pairs[2].append(numpy.sqrt(d2[r, c]))
+    d = numpy.concatenate(pairs[2])
+    # Coincident stations get the weight of a very short distance
+    floor = 1e-9 * max(float(d.max()) if len(d) > 0 else 0.0, 1e-300)
+    return {"n": n, "i": numpy.concatenate(pairs[0]), "j": numpy.concatenate(pairs[1]),
+            "w": 1.0 / numpy.maximum(d, floor), "distance": distance}
+
+def moran_sum (weights, z):
+    return float((weights["w"] * z[weights["i"]] * z[weights["j"]]).sum())
+
+def morans_i (values, weights):
+    # Global Moran's I with the expected value, variance, z-score and p-value under randomization
+    n = float(len(values))
+    z = values - values.mean()
+    m2 = (z * z).sum()
+    w = weights["w"]
+    s0 = w.sum()
+    stats = {"index": None, "expected": -1.0 / (n - 1.0), "variance": None, "zscore": None, "pvalue": None}
+    if s0 <= 0 or m2 <= 0 or n < 4:
+        return stats
+    stats["index"] = n / s0 * moran_sum(weights, z) / m2
+    # S1 sums (w_ij + w_ji)^2 / 2 over pairs; w_ij + w_ji is found by matching each pair with its reverse
+    nn = weights["n"]
+    key = weights["i"].astype(numpy.int64) * nn + weights["j"]
+    reverse = weights["j"].astype(numpy.int64) * nn + weights["i"]
+    order = numpy.argsort(key)
+    found = numpy.minimum(numpy.searchsorted(key[order], reverse), len(key) - 1)
+    mutual = key[order][found] == reverse
+    wji = numpy.where(mutual, w[order][found], 0.0)
+    s1 = 0.5 * ((w + wji) ** 2).sum() + 0.5 * (w[~mutual] ** 2).sum()
+    s2 = ((numpy.bincount(weights["i"], weights=w, minlength=nn) +
+           numpy.bincount(weights["j"], weights=w, minlength=nn)) ** 2).sum()
+    b2 = n * (z ** 4).sum() / m2 ** 2
+    a = n * ((n * n - 3.0 * n + 3.0) * s1 - n * s2 + 3.0 * s0 * s0)
+    b = b2 * ((n * n - n) * s1 - 2.0 * n * s2 + 6.0 * s0 * s0)
+    c = (n - 1.0) * (n - 2.0) * (n - 3.0) * s0 * s0
+    stats["variance"] = (a - b) / c - stats["expected"] ** 2
+    if stats["variance"] > 0:
+        stats["zscore"] = (stats["index"] - stats["expected"]) / math.sqrt(stats["variance"])
+        stats["pvalue"] = normal_pvalue(stats["zscore"])
+    return stats
+
+def permutation_task (task):
+    # Process pool worker: Moran's I sums of one chunk of seeded permutations of the values
+    weights, z, seed, count = task
+    generator = numpy.random.RandomState(seed)
+    return [moran_sum(weights, generator.permutation(z)) for p in range(count)]
+
+def permutation_pvalue (values, weights, permutations=999, processes=1):
+    # Pseudo p-value of Moran's I from random permutations of the values among the stations
+    z = values - values.mean()
+    observed = moran_sum(weights, z)
+    expected = -(z * z).sum() * weights["w"].sum() / (len(z) * (len(z) - 1.0))
+    tasks = [(weights, z, 1 + p // PERMUTATION_CHUNK, min(PERMUTATION_CHUNK, permutations - p))
+             for p in range(0, permutations, PERMUTATION_CHUNK)]
+    if processes > 1 and len(tasks) > 1:
+        import ARD_HEA_Tools
+        pool = ARD_HEA_Tools.process_pool(min(processes, len(tasks)))
+        try:
+            sums = pool.map(permutation_task, tasks)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        sums = [permutation_task(task) for task in tasks]
+    sums = numpy.concatenate([numpy.asarray(s) for s in sums]) if len(sums) > 0 else numpy.zeros(0)
+    extreme = (numpy.abs(sums - expected) >= abs(observed - expected) * (1.0 - 1e-12)).sum()
+    return (extreme + 1.0) / (permutations + 1.0)
+
+def station_stats (task):
+    # Process pool worker: nearest neighbor statistics of one set of stations and Moran's I of every
+    # analyte measured at them, sharing the neighbor search and weights
+    x, y, columns, permutations, processes = task
+    nnStats = nearest_neighbor_stats(x, y)
+    weights = spatial_weights(x, y, nnStats["max"])
+    saStats = []
+    for values in columns:
+        stats = morans_i(values, weights)
+        if permutations > 0 and stats["index"] is not None:
+            stats["pvalue"] = permutation_pvalue(values, weights, permutations, processes)
+        saStats.append(stats)
+    return nnStats, saStats
+
+def analyte_stats (stations, permutations=0, processes=1):
+    # Nearest neighbor and Moran's I statistics of each analyte from its (x, y, values) stations;
+    # analytes at the same stations are computed together and station sets run in a process pool
+    groups = {}
+    keys = []
+    for i in range(len(stations)):
+        x, y, values = stations[i]
+        key = ARD_HEA_Interp.station_key(x, y)[1]
+        if key not in groups:
+            groups[key] = []
+            keys.append(key)
+        groups[key].append(i)
+    if processes > 1 and len(keys) > 1:
+        import ARD_HEA_Tools
+        tasks = [(stations[groups[key][0]][0], stations[groups[key][0]][1],
+                  [stations[i][2] for i in groups[key]], permutations, 1) for key in keys]
+        pool = ARD_HEA_Tools.process_pool(min(processes, len(tasks)))
+        try:
+            results = pool.map(station_stats, tasks)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        results = [station_stats((stations[groups[key][0]][0], stations[groups[key][0]][1],
+                                  [stations[i][2] for i in groups[key]], permutations, processes)) for key in keys]
+    stats = [None] * len(stations)
+    for key, result in zip(keys, results):
+        for i, saStats in zip(groups[key], result[1]):
+            stats[i] = (result[0], saStats)
+    return stats
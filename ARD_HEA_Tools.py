@@ -9,6 +9,10 @@
 #
 # Date Created: December 11, 2012
 # Date Modified: September 13, 2013
+#                October 16, 2026   - Added project cache directory helper, bulk array append, chunked table reader,
+#                                     GRID_ID row deletion and SITE_ATTRIBUTES depth field lookup
+#                October 17, 2026   - Added process pool helpers
+#                                   - GRID_ID rows are deleted through indexed GRID_ID IN (...) table views
 #
 # ---------------------------------------------------------------------------
 
@@ -132,3 +136,101 @@ def sanitizetext (input):
                 flag = 1
     return output.strip("_")
 
+def cache_dir (geoDB):
+    import os
+    directory = os.path.splitext(geoDB)[0] + "_cache"
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    return directory
+
+def depth_field (siteTable):
+    import arcpy
+    depthFld = "DEPTH_ID"
+    for fld in arcpy.ListFields(siteTable):
+        if fld.name == "DEPTH_ID":
+            return "DEPTH_ID"
+        elif fld.name == "DEPTH":
+            depthFld = "DEPTH"
+    return depthFld
+
+def append_array (table, array, chunk=250000):
+    import arcpy
+    import time
+    tmpTable = "in_memory\\append_chunk"
+    start = time.time()
+    for first in range(0, len(array), chunk):
+        if arcpy.Exists(tmpTable):
+            arcpy.Delete_management(tmpTable)
+        arcpy.da.NumPyArrayToTable(array[first:first + chunk], tmpTable)
+        arcpy.Append_management(tmpTable, table, "NO_TEST")
+    if arcpy.Exists(tmpTable):
+        arcpy.Delete_management(tmpTable)
+    return time.time() - start
+
+def rateout (count, seconds, label):
+    import arcpy
+    rate = count / max(seconds, 0.001)
+    arcpy.AddMessage("  " + str(count) + " " + label + " in " + "%.1f" % seconds + " s (" + "%.0f" % rate + " rows/s)")
+
+def table_chunks (table, fields, where=None, chunk=100000):
+    import arcpy
+    import numpy
+    rows = []
+    with arcpy.da.SearchCursor(table, fields, where) as cursor:
+        for row in cursor:
+            rows.append(row)
+            if len(rows) == chunk:
+                yield [numpy.array([numpy.nan if v is None else v for v in col], dtype=numpy.float64) for col in zip(*rows)]
+                rows = []
+    if len(rows) > 0:
+        yield [numpy.array([numpy.nan if v is None else v for v in col], dtype=numpy.float64) for col in zip(*rows)]
+
+def delete_ids (table, ids, chunk=1000):
+    # Delete the records of GRID_IDs through a table view per chunk of GRID_ID IN (...) clauses, so the GRID_ID
+    # index finds them rather than a scan of the whole table
+    import arcpy
+    ids = sorted(set([int(v) for v in ids]))
+    deleted = 0
+    if len(ids) == 0 or not arcpy.Exists(table):
+        return deleted
+    field = arcpy.AddFieldDelimiters(table, "GRID_ID")
+    view = "grid_id_delete"
+    for first in range(0, len(ids), chunk):
+        if arcpy.Exists(view):
+            arcpy.Delete_management(view)
+        clause = field + " IN (" + ", ".join([str(v) for v in ids[first:first + chunk]]) + ")"
+        arcpy.MakeTableView_management(table, view, clause)
+        count = int(arcpy.GetCount_management(view).getOutput(0))
+        if count > 0:
+            arcpy.DeleteRows_management(view)
+        arcpy.Delete_management(view)
+        deleted += count
+    return deleted
+
+def process_count (text):
+    import multiprocessing
+    if text is None or text == '#' or text == "":
+        return multiprocessing.cpu_count()
+    return max(1, int(text))
+
+def process_pool (processes):
+    # Workers run pythonw.exe rather than the ArcGIS application hosting the script, and do not
+    # re-run the calling tool script: pooled functions must live in an importable module
+    import multiprocessing
+    import os
+    import sys
+    if sys.platform == "win32":
+        executable = os.path.join(sys.exec_prefix, "pythonw.exe")
+        if os.path.exists(executable):
+            multiprocessing.set_executable(executable)
+    main = sys.modules["__main__"]
+    mainFile = getattr(main, "__file__", None)
+    if mainFile is not None:
+        del main.__file__
+    try:
+        pool = multiprocessing.Pool(processes)
+    finally:
+        if mainFile is not None:
+            main.__file__ = mainFile
+    return pool
+
@@ -3,13 +3,17 @@
 # Version: 2.0 (ArcGIS 10.2)
 # Author: Research Planning, Inc.
 #
-# Usage: CreateAnalysisDatabase <output_database_location> <output_analysis_database> <analyst_name>
+# Usage: CreateAnalysisDatabase <output_database_location> <output_analysis_database> <analyst_name> {coc_backend}
 #
 # Required Arguments: 
 #   output_database_location - Name and location of folder to store analysis database
 #   output_analysis_database - Name of analysis geodatabase
 #   analyst_name - Name of analyst creating analysis geodatabase
 #
+# Optional Arguments:
+#   {coc_backend} - Storage of loaded contaminant values: TABLE (default, the COC_DATA table) or
+#                   COLUMNS (per-contaminant columns in the project cache, exported to COC_DATA on request)
+#
 # Description: Create and setup tables of the HEA geodatabase  
 #
 # Notes:  Currently the tool is designed to only be run via the ARD HEA Toolbox.
@@ -26,6 +30,9 @@
 #                July 21, 2014      - Added a FOOTPRINTS table for contaminant slices
 #                March 4, 2015      - Added FOOTPRINT_ID field back into COC_DATA table
 #                March 6, 2015      - Changed some fields to REQUIRED and NON_NULLABLE
+#                October 17, 2026   - Added IDW_POWER, IDW_RADIUS and CV_RMSE fields to COC_INVENTORY table for
+#                                     cross-validated IDW parameters
+#                                   - Added COC_BACKEND field to PROJECT_ATTRIBUTES table
 #
 # ---------------------------------------------------------------------------
 
@@ -52,6 +59,10 @@ try:
     projDir = sys.argv[1]
     projNameIn = sys.argv[2]
     analystName = sys.argv[3]
+    if len(sys.argv) > 4 and sys.argv[4] not in ('#', ''):
+        COCBackend = sys.argv[4].upper()
+    else:
+        COCBackend = "TABLE"
     projName = ARD_HEA_Tools.sanitize(projNameIn)
 
     # Local variables...
@@ -84,6 +95,7 @@ try:
     arcpy.AddField_management(prjAttr, "SITE_REMEDIATION_DOC", "TEXT", "", "", "25000", "", "NULLABLE", "NON_REQUIRED", "")
     arcpy.AddField_management(prjAttr, "SITE_SUBSITE_DOC", "TEXT", "", "", "25000", "", "NULLABLE", "NON_REQUIRED", "")
     arcpy.AddField_management(prjAttr, "SITE_DEPTH_DOC", "TEXT", "", "", "25000", "", "NULLABLE", "NON_REQUIRED", "")
+    arcpy.AddField_management(prjAttr, "COC_BACKEND", "TEXT", "", "", "10", "", "NULLABLE", "NON_REQUIRED", "")
 
     # Create contaminant data table
     arcpy.CreateTable_management(geoDB, "COC_DATA", "", "")
@@ -120,6 +132,9 @@ try:
     arcpy.AddField_management(COCInvent, "SAPVALUE", "FLOAT", "", "", "", "", "NULLABLE", "NON_REQUIRED", "")
     arcpy.AddField_management(COCInvent, "INTERP_LAYER_NAME", "TEXT", "", "", "50", "", "NULLABLE", "NON_REQUIRED", "")
     arcpy.AddField_management(COCInvent, "INTERP_TYPE", "TEXT", "", "", "5", "", "NULLABLE", "NON_REQUIRED", "")
+    arcpy.AddField_management(COCInvent, "IDW_POWER", "FLOAT", "", "", "", "", "NULLABLE", "NON_REQUIRED", "")
+    arcpy.AddField_management(COCInvent, "IDW_RADIUS", "TEXT", "", "", "50", "", "NULLABLE", "NON_REQUIRED", "")
+    arcpy.AddField_management(COCInvent, "CV_RMSE", "FLOAT", "", "", "", "", "NULLABLE", "NON_REQUIRED", "")
     arcpy.AddIndex_management(COCInvent, "COC_NAME", "CDAT_NAM_IDX", "NON_UNIQUE", "NON_ASCENDING")
 
     # Create site attribute table
@@ -158,6 +173,7 @@ try:
     row = rows.newRow()
     if analystName is not None:
         row.ANALYST = str(analystName)
+    row.COC_BACKEND = COCBackend
     rows.insertRow(row)
     del row
     del rows
@@ -3,7 +3,7 @@
 # Version: 2.0 (ArcGIS 10.2)
 # Author: Research Planning, Inc.
 #
-# Usage: CreateAnalysisGrid <input_analysis_database> <extent> <cell_size> <output_coordinate_system> {mask_layer}
+# Usage: CreateAnalysisGrid <input_analysis_database> <extent> <cell_size> <output_coordinate_system> {mask_layer} {rebuild_grid}
 #
 # Required Arguments: 
 #   input_analysis_database - Name of analysis geodatabase
@@ -13,6 +13,7 @@
 #
 # Optional Arguments:
 #   mask_layer - Polygonal mask for analysis grid
+#   rebuild_grid - true to rebuild all grid data even when the new grid lines up with the existing grid
 #
 # Description: Create analysis grid and points for anlyzing contaminant surfaces
 #
@@ -32,6 +33,27 @@
 #                      March 6, 2015      - Added code to update SITE_ATTRIBUTES table with GRID_IDs
 #                      March 10, 2015     - Added code to update all fields except GRID_ID in SITE_ATTRIBUTES table with "NA"
 #                      March 11, 2015     - added code to check if depth field in the SITE_ATTRIBUTES table is called "DEPTH" (legacy) or "DEPTH_ID"
+#                      October 16, 2026   - Replaced RasterToPoint and GRID_ID cursor with the ARD_HEA_Grid engine, which computes
+#                                           cell centers and GRID_IDs as arrays and stores the row/col to GRID_ID index
+#                                         - SITE_ATTRIBUTES seed rows are loaded in bulk array chunks instead of one insert per cell
+#                                         - Mask layer is rasterized to grid cells by the ARD_HEA_Grid scanline rasterizer and cached
+#                                           per project instead of being applied through env.mask
+#                                         - Grid index, mask and outputs are processed in memory-mapped tiles so large grids
+#                                           no longer need to be sub-divided
+#                                         - Stage timings are recorded in the project cache for the cost estimator
+#                                         - A grid that lines up with the existing grid is regenerated incrementally: surviving
+#                                           cells keep their GRID_IDs and data, only added and removed cells are updated.
+#                                           The new GRID_ID map replaces the cached one only after the tables are updated
+#                      October 17, 2026   - Projects storing contaminant values in columns have them cleared on a rebuild,
+#                                           and the columns updated in place for the removed and added cells of an
+#                                           incremental update
+#                                         - ANALYSIS_GRID and ANALYSIS_PNTS are written after the tables and GRID_ID map
+#                                           are updated, so a failed update leaves the previous grid outputs in place
+#                                         - Loaded contaminant surfaces are evaluated at added cells with the method, parameters
+#                                           and samples kept by the interpolation tools, and every contaminant left without
+#                                           values is reported
+#                                         - A rebuild also removes kriging surfaces and the cell arrays, stamps and settings of
+#                                           every surface
 #
 # ---------------------------------------------------------------------------
 
@@ -43,10 +65,13 @@ class toobig(Exception):
 
 # Import system modules
 import ARD_HEA_Tools
+import ARD_HEA_Grid
+import ARD_HEA_Cost
 import sys
 import string
 import os
 import traceback
+import time
 import arcpy
 from arcpy import env
 
@@ -72,6 +97,10 @@ try:
     grdCellSize = sys.argv[3]
     grdCoordinateSystem = sys.argv[4]
     grdMaskLayer = sys.argv[5]
+    if len(sys.argv) > 6:
+        grdRebuild = sys.argv[6]
+    else:
+        grdRebuild = 'false'
 
     # Check for projected coordinate system...
     env.outputCoordinateSystem = grdCoordinateSystem
@@ -87,80 +116,110 @@ try:
     AnalysisGridLayer = "ANALYSIS_GRID_LYR"
     AnalysisPntsLayer = "ANALYSIS_PNTS_LYR"
     prjAttr = geoDB + "\\PROJECT_ATTRIBUTES"
-    
-    # Process: Delete all rows from the site attribute and contaminant raster tables
-    arcpy.DeleteRows_management(COCTable)
-    arcpy.DeleteRows_management(SiteAttr)
-
-    # Process: Remove all previously generated contaminant surfaces...
-    env.workspace = geoDB
-    rasterList = arcpy.ListRasters("IDW_*", "GRID")
-    for raster in rasterList:
-        arcpy.Delete_management(raster)
-        arcpy.Delete_management(geoDB + "\\" + raster)
-
-    rasterList = arcpy.ListRasters("NN_*", "GRID")
-    for raster in rasterList:
-        arcpy.Delete_management(raster)
-        arcpy.Delete_management(geoDB + "\\" + raster)
+    COCInvent = geoDB + "\\COC_INVENTORY"
+    Footprints = geoDB + "\\FOOTPRINTS"
 
     # Set the geoprocessing environment...
     env.overwriteOutput = 1
     env.XYTolerance = "0.0000001"
+
+    # Process: Define grid cells and rasterize the mask layer...
+    start = time.time()
+    grid = ARD_HEA_Grid.grid_from_extent(grdExtent, grdCellSize)
+    gridMask = None
     if grdMaskLayer <> '#':
-      env.mask = grdMaskLayer
+        arcpy.AddMessage("Rasterizing mask layer...")
+        gridMask = ARD_HEA_Grid.cell_mask(geoDB, grid, grdMaskLayer, env.outputCoordinateSystem)
+
+    # Process: Compare with the existing grid, an aligned grid in the same coordinate system is updated in place...
+    offset = None
+    if str(grdRebuild) != 'true' and arcpy.Exists(AnalysisGrid) and arcpy.Exists(AnalysisPnts):
+        oldGrid = ARD_HEA_Grid.load_grid(geoDB)
+        if arcpy.Describe(AnalysisGrid).SpatialReference.name == env.outputCoordinateSystem.name:
+            offset = ARD_HEA_Grid.aligned_offset(oldGrid, grid)
+        if offset is None:
+            arcpy.AddMessage("New grid does not line up with the existing grid, rebuilding all grid data...")
+            del oldGrid
+
+    if offset is None:
+        # Process: Delete all rows from the site attribute and contaminant raster tables
+        arcpy.DeleteRows_management(COCTable)
+        arcpy.DeleteRows_management(SiteAttr)
+        ARD_HEA_Grid.clear_coc_columns(geoDB)
 
-    # Make raster
-    arcpy.CreateConstantRaster_sa(AnalysisGrid, "1", "INTEGER", grdCellSize, grdExtent)
+        # Process: Remove all previously generated contaminant surfaces and their cell arrays...
+        env.workspace = geoDB
+        for pattern in ("IDW_*", "NN_*", "KRG_*", "KRGV_*"):
+            rasterList = arcpy.ListRasters(pattern, "GRID")
+            for raster in rasterList:
+                arcpy.Delete_management(raster)
+                arcpy.Delete_management(geoDB + "\\" + raster)
+        ARD_HEA_Grid.clear_surfaces(geoDB)
+
+        ARD_HEA_Grid.number_cells(geoDB, grid, gridMask)
+    else:
+        arcpy.AddMessage("Updating existing grid...")
+        grid, addedIds, removedIds = ARD_HEA_Grid.renumber_cells(geoDB, grid, oldGrid, offset, gridMask)
+        del oldGrid
+        arcpy.AddMessage("  Cells kept: " + str(ARD_HEA_Grid.cell_count(grid) - len(addedIds)) + ", added: " + str(len(addedIds)) + ", removed: " + str(len(removedIds)))
 
     # Check size
-    rowsGrid = arcpy.SearchCursor(AnalysisGrid)
-    rowGrid = rowsGrid.next()
-    count = rowGrid.COUNT
-    del rowGrid
-    del rowsGrid
+    count = ARD_HEA_Grid.cell_count(grid)
+    gridSeconds = time.time() - start
     if count >= 500000:
-        arcpy.AddMessage("  Warning! Cell count : "+str(count)+" is greater than 500,000 and may slow down processing")
+        arcpy.AddMessage("  Cell count: "+str(count)+" is greater than 500,000, grid will be processed in "+str(ARD_HEA_Grid.tile_count(grid))+" tiles")
         # raise toobig
     else:
         arcpy.AddMessage("  Cell count: "+str(count))
 
-    # Process: Raster to Point...
-    env.SnapRaster = AnalysisGrid
-    arcpy.RasterToPoint_conversion(AnalysisGrid, AnalysisPnts, "VALUE")
+    if offset is None:
+        # Process: Load GRID_IDs and NA values into SITE_ATTRIBUTES table in bulk
+        #          (depth field is resolved once as DEPTH (legacy) or DEPTH_ID)
+        arcpy.AddMessage("Loading site attribute records...")
+        seeded, seconds = ARD_HEA_Grid.seed_site_attributes(grid, SiteAttr)
+        ARD_HEA_Tools.rateout(seeded, seconds, "site attribute records loaded")
+        ARD_HEA_Cost.record_timing(geoDB, "SITE_ATTRIBUTES", seeded, seconds)
+    else:
+        columns = ARD_HEA_Grid.coc_backend(geoDB) == "COLUMNS"
 
-    # Process: Add Field
-    arcpy.AddField_management(AnalysisPnts, "GRID_ID", "LONG", "", "", "", "", "NULLABLE", "NON_REQUIRED", "")
+        # Process: Remove records of removed cells...
+        if len(removedIds) > 0:
+            arcpy.AddMessage("Removing records for removed cells...")
+            for table in [COCTable, SiteAttr, Footprints]:
+                deleted = ARD_HEA_Tools.delete_ids(table, removedIds)
+                arcpy.AddMessage("  " + str(deleted) + " records removed from " + os.path.basename(table))
+            if columns:
+                deleted = ARD_HEA_Grid.clear_column_cells(geoDB, removedIds)
+                arcpy.AddMessage("  " + str(deleted) + " values removed from contaminant columns")
+        if columns:
+            ARD_HEA_Grid.resize_coc_columns(geoDB, ARD_HEA_Grid.max_id(grid) + 1)
 
-    # Process: Calculate Field
-    rows = arcpy.UpdateCursor(AnalysisPnts)
-    row = rows.next()
-    while row:
-        row.GRID_ID = row.POINTID
-        rows.updateRow(row)
-        row = rows.next()
-    del rows
-    del row
-    
-    # Process: Delete Field
-    arcpy.DeleteField_management(AnalysisPnts, "POINTID;GRID_CODE")
-
-    # Process: Load GRID_IDs and NA values into SITE_ATTRIBUTES table
-    #          First check if depth field is DEPTH (legacy) or DEPTH_ID
-    fieldList = arcpy.ListFields(SiteAttr)
-    for fld in fieldList:
-        if fld.name == "DEPTH_ID":
-            DepthFld = "DEPTH_ID"
-        elif fld.name == "DEPTH":
-            DepthFld = "DEPTH"
-    Fields = ["GRID_ID", "HABITAT_ID", "CONDITION_ID", "REMEDIATION_ID", "SUBSITE_ID", DepthFld]
-    rows = arcpy.da.SearchCursor(AnalysisPnts, "GRID_ID")
-    cursor = arcpy.da.InsertCursor(SiteAttr, Fields)
-    for row in rows:
-        vals = [(row[0]), 'NA', 'NA', 'NA', 'NA', 'NA']
-        cursor.insertRow(vals)
-    del cursor
-    del rows
+        # Process: Seed site attributes and evaluate loaded contaminant surfaces for added cells...
+        if len(addedIds) > 0:
+            arcpy.AddMessage("Loading records for added cells...")
+            seeded, seconds = ARD_HEA_Grid.seed_site_attributes(grid, SiteAttr, addedIds)
+            ARD_HEA_Tools.rateout(seeded, seconds, "site attribute records loaded")
+            uncovered = ARD_HEA_Grid.extend_coc_data(geoDB, grid, addedIds, COCTable, COCInvent, env.outputCoordinateSystem, removedIds)
+            for coc, missing in uncovered:
+                arcpy.AddWarning("Contaminant " + coc + " has no value at " + str(missing) + " of " + str(len(addedIds)) +
+                                 " added cells. Cells outside its interpolation mask or samples stay empty; otherwise re-run the interpolation and reload it.")
+            if arcpy.Exists(Footprints) and int(arcpy.GetCount_management(Footprints).getOutput(0)) > 0:
+                arcpy.AddWarning("Footprints do not include the added cells, reload footprints for each scenario.")
+        ARD_HEA_Grid.coc_data_warning(geoDB)
+
+        # Process: Replace the cached GRID_ID map now that the tables match it...
+        ARD_HEA_Grid.commit_cells(geoDB, grid)
+
+    # Make raster, written once the tables and cached GRID_ID map match the new grid
+    start = time.time()
+    ARD_HEA_Grid.write_mask_raster(grid, grid["grid_id"], AnalysisGrid, env.outputCoordinateSystem)
+    ARD_HEA_Cost.record_timing(geoDB, "GRID", count, gridSeconds + time.time() - start)
+
+    # Process: Write analysis points...
+    env.SnapRaster = AnalysisGrid
+    start = time.time()
+    ARD_HEA_Grid.write_points(grid, AnalysisPnts, env.outputCoordinateSystem)
+    ARD_HEA_Cost.record_timing(geoDB, "POINTS", count, time.time() - start)
 
     #Process: Update project attributes table
     desc = arcpy.Describe(AnalysisGrid)
@@ -175,7 +234,7 @@ try:
     del rows
 
     if count >= 10000:
-        arcpy.AddMessage("When setting the cell size for this analysis, users should consider the number of contaminants that will be included in the HEA as well as the number of years for extrapolating into the future.  If you anticipate needing more than three to five contaminants in the analysis and/or more than 100 years of analysis, it is recommended that you limit the study area to less than 10,000 grid cells by either increasing the size of the grid or sub-dividing the study area.")
+        arcpy.AddMessage("When setting the cell size for this analysis, users should consider the number of contaminants that will be included in the HEA as well as the number of years for extrapolating into the future.  The GIS tools process large grids in tiles and do not require the study area to be sub-divided, but the size of the HEA calculation tables grows with the number of grid cells times the number of contaminants and analysis years.  If you anticipate needing more than three to five contaminants in the analysis and/or more than 100 years of analysis, consider increasing the size of the grid cells.  The Estimate Analysis Cost tool predicts table sizes, memory and run time for a proposed cell size.")
 
     # Process: Make Feature Layers...
     arcpy.MakeFeatureLayer_management(AnalysisPnts, AnalysisPntsLayer, "", "", "")
@@ -0,0 +1,225 @@
+# ---------------------------------------------------------------------------
+# NAME: CrossValidateIDW.py
+# Version: 2.0 (ArcGIS 10.2)
+# Author: Research Planning, Inc.
+#
+# Usage: CrossValidateIDW <input_analysis_database> <filtered_contaminant_layer> <value_field>
+#   <log_transform> {powers} {neighbors} {distances} {search_type} {processes}
+#
+# Required Arguments:
+#   input_analysis_database - Name of analysis geodatabase
+#   filtered_contaminant_layer - Name of filtered contaminant layer to cross-validate
+#   value_field - Value field to interpolate in contaminant layer
+#   log_transform - Transform applied to contaminant values before interpolating and reversed afterwards:
+#                   true (natural log of 1000 x value), false, LOG10 or BOXCOX
+#
+# Optional Arguments:
+#   {powers} - Semicolon delimited list of IDW powers to try (default 1;1.5;2;2.5;3)
+#   {neighbors} - Semicolon delimited list of neighbor counts to try (default 4;8;12;16;24)
+#   {distances} - Semicolon delimited list of search distances to try.  Maximum distances for a
+#                 VARIABLE search (default none), fixed radii for a FIXED search (default 5 cells)
+#   {search_type} - VARIABLE (default) or FIXED search radius; for FIXED the neighbor counts are
+#                   the minimum number of points
+#   {processes} - Number of worker processes (default: number of CPUs)
+#
+# Description: Scores every combination of IDW power and search radius by leave-one-out
+#              cross-validation of the filtered samples, writes the ranked scores to a
+#              CV_<layer> table and records the best parameters in the contaminant inventory.
+#
+# Notes:  Currently the tool is designed to only be run via the ARD HEA Toolbox.
+#         Each sample is predicted from the other samples with the neighbor rules of the
+#         Interpolate Contaminant Surface IDW tool, and errors are measured on the original
+#         (back-transformed) values.
+#
+# Date Created: October 17, 2026
+#
+# ---------------------------------------------------------------------------
+
+class nogrid(Exception):
+    pass
+
+class filtered(Exception):
+    pass
+
+class lognegative(Exception):
+    pass
+
+class toofew(Exception):
+    pass
+
+# Import system modules
+import ARD_HEA_Tools
+import ARD_HEA_Grid
+import ARD_HEA_Interp
+import sys
+import string
+import os
+import traceback
+import time
+import numpy
+import arcpy
+from arcpy import env
+
+try:
+    # Report version...
+    ver = ARD_HEA_Tools.version()
+    arcpy.AddMessage("ARD HEA Tools Version: " + ver)
+
+    # Script arguments...
+    geoDB = sys.argv[1]
+    COCLayer = sys.argv[2]
+    COCField = sys.argv[3]
+    PerfLog = sys.argv[4]
+    CVPowers = sys.argv[5] if len(sys.argv) > 5 else '#'
+    CVNeighbors = sys.argv[6] if len(sys.argv) > 6 else '#'
+    CVDistances = sys.argv[7] if len(sys.argv) > 7 else '#'
+    CVSearchType = sys.argv[8] if len(sys.argv) > 8 else '#'
+    if len(sys.argv) > 9:
+        CVProcesses = ARD_HEA_Tools.process_count(sys.argv[9])
+    else:
+        CVProcesses = ARD_HEA_Tools.process_count('#')
+
+    # Local variables...
+    desc = arcpy.Describe(COCLayer)
+    if desc.DataType == "FeatureLayer":
+        COCLayerBase = COCLayer.split(os.sep)[-1]
+    else:
+        COCLayerBase = desc.Basename
+    transform = ARD_HEA_Interp.transform_method(PerfLog)
+    AnalysisGrid = geoDB + "\\ANALYSIS_GRID"
+    COCInvent = geoDB + "\\COC_INVENTORY"
+    CVTable = geoDB + "\\CV_" + COCLayerBase
+    searchType = "FIXED" if CVSearchType.upper() == "FIXED" else "VARIABLE"
+
+    # Set the geoprocessing environment...
+    env.overwriteOutput = 1
+
+    # Process: Check for analysis grid...
+    if not arcpy.Exists(AnalysisGrid):
+        raise nogrid
+    gridDesc = arcpy.Describe(AnalysisGrid)
+    cellSize = ARD_HEA_Grid.load_grid(geoDB)["cellsize"]
+
+    # Process: Build the parameter combinations...
+    def numbers (text, default):
+        if text == '#' or text == "":
+            return default
+        return [float(v) for v in text.replace(",", " ").replace(";", " ").split()]
+    powers = numbers(CVPowers, [1.0, 1.5, 2.0, 2.5, 3.0])
+    if searchType == "FIXED":
+        neighbors = [int(k) for k in numbers(CVNeighbors, [0])]
+        distances = numbers(CVDistances, [5.0 * cellSize])
+    else:
+        neighbors = [int(k) for k in numbers(CVNeighbors, [4, 8, 12, 16, 24])]
+        distances = numbers(CVDistances, [None])
+    radii = ARD_HEA_Interp.search_list(searchType, neighbors, distances)
+
+    # Process: Check for filtered layer in contaminant inventory table...
+    COCName = None
+    with arcpy.da.SearchCursor(COCInvent, ["FILTER_LAYER_NAME", "COC_NAME"]) as cursor:
+        for row in cursor:
+            if row[0] == COCLayerBase:
+                COCName = row[1]
+    if COCName is None:
+        raise filtered
+
+    # Process: Read samples...
+    sampleX, sampleY, sampleValues = ARD_HEA_Interp.read_samples(COCLayer, COCField, gridDesc.SpatialReference)
+    if len(sampleValues) < 3:
+        raise toofew
+    if (sampleValues <= 0).any() and transform != "":
+        raise lognegative
+
+    # Process: Score every combination by leave-one-out cross-validation...
+    arcpy.AddMessage("Cross-validating " + str(len(powers) * len(radii)) + " parameter combinations for " +
+                     COCName + " at " + str(len(sampleValues)) + " samples...")
+    start = time.time()
+    scores, transformParam = ARD_HEA_Interp.cross_validate(sampleX, sampleY, sampleValues, powers, radii,
+                                                           transform, cellSize, CVProcesses)
+    arcpy.AddMessage("  Scored in " + "%.1f" % (time.time() - start) + " s")
+    if transformParam is not None:
+        arcpy.AddMessage("  Box-Cox lambda: " + str(transformParam))
+
+    # Process: Write the ranked scores...
+    if arcpy.Exists(CVTable):
+        arcpy.Delete_management(CVTable)
+    ranked = numpy.zeros(len(scores), dtype=[("RANK", numpy.int32), ("POWER", numpy.float64),
+                                             ("SEARCH_RADIUS", "S50"), ("SAMPLES", numpy.int32),
+                                             ("MEAN_ERROR", numpy.float64), ("RMSE", numpy.float64),
+                                             ("MAE", numpy.float64)])
+    for i in range(len(scores)):
+        ranked[i] = (i + 1,) + tuple(scores[i])
+    arcpy.da.NumPyArrayToTable(ranked, CVTable)
+    arcpy.AddMessage("\n  Rank  Power  Search radius          Samples        RMSE         MAE  Mean error")
+    for i in range(min(10, len(scores))):
+        arcpy.AddMessage("  %4d  %5.2f  %-20s  %7d  %10.4g  %10.4g  %10.4g" %
+                         (i + 1, scores[i][0], scores[i][1], scores[i][2], scores[i][4], scores[i][5], scores[i][3]))
+
+    # Process: Record the best parameters in the contaminant inventory table...
+    best = scores[0]
+    if numpy.isnan(best[4]):
+        arcpy.AddMessage("\n*** WARNING ***\nNo combination produced a prediction, contaminant inventory not updated\n")
+    else:
+        fieldNames = [fld.name for fld in arcpy.ListFields(COCInvent)]
+        if "IDW_POWER" not in fieldNames:
+            arcpy.AddField_management(COCInvent, "IDW_POWER", "FLOAT", "", "", "", "", "NULLABLE", "NON_REQUIRED", "")
+        if "IDW_RADIUS" not in fieldNames:
+            arcpy.AddField_management(COCInvent, "IDW_RADIUS", "TEXT", "", "", "50", "", "NULLABLE", "NON_REQUIRED", "")
+        if "CV_RMSE" not in fieldNames:
+            arcpy.AddField_management(COCInvent, "CV_RMSE", "FLOAT", "", "", "", "", "NULLABLE", "NON_REQUIRED", "")
+        with arcpy.da.UpdateCursor(COCInvent, ["FILTER_LAYER_NAME", "IDW_POWER", "IDW_RADIUS", "CV_RMSE"]) as cursor:
+            for row in cursor:
+                if row[0] == COCLayerBase:
+                    row[1] = best[0]
+                    row[2] = best[1]
+                    row[3] = best[4]
+                    cursor.updateRow(row)
+        arcpy.AddMessage("\nBest parameters for " + COCName + ": power " + str(best[0]) + ", search radius " + best[1])
+
+except nogrid:
+    arcpy.AddError("\n*** ERROR ***\nCannot cross-validate without defined analysis grid.  Create analysis grid.\n")
+    print "\n*** ERROR ***\nCannot cross-validate without defined analysis grid.  Create analysis grid.\n"
+
+except filtered:
+    arcpy.AddError("\n*** ERROR ***\nCross-validation must be run on filtered contaminant layers\n")
+    print "Cross-validation must be run on filtered contaminant layers"
+
+except lognegative:
+    arcpy.AddError("\n*** ERROR ***\nCannot perform log transformation on contaminant layer with negative values\n")
+    print "\n*** ERROR ***\nCannot perform log transformation on contaminant layer with negative values\n"
+
+except toofew:
+    arcpy.AddError("\n*** ERROR ***\nCross-validation needs at least 3 samples\n")
+    print "\n*** ERROR ***\nCross-validation needs at least 3 samples\n"
+
+except arcpy.ExecuteError:
+    # Get the tool error messages
+    msgs = arcpy.GetMessage(0)
+    msgs += arcpy.GetMessages(2)
+
+    # Return tool error messages for use with a script tool
+    arcpy.AddError(msgs)
+
+    # Print tool error messages for use in Python/PythonWin
+    print msgs
+
+except:
+    # Get the traceback object
+    #
+    tb = sys.exc_info()[2]
+    tbinfo = traceback.format_tb(tb)[0]
+
+    # Concatenate information together concerning the error into a message string
+    #
+    pymsg = "PYTHON ERRORS:\nTraceback info:\n" + tbinfo + "\nError Info:\n" + str(sys.exc_info()[1])
+    msgs = "ArcPy ERRORS:\n" + arcpy.GetMessages(2) + "\n"
+
+    # Return python error messages for use in script tool or Python Window
+    #
+    arcpy.AddError(pymsg)
+    arcpy.AddError(msgs)
+
+    # Print Python error messages for use in Python / Python Window
+    #
+    print pymsg + "\n"
+    print msgs
@@ -17,6 +17,9 @@
 #                September 15, 2012 - Changed to utilize user supplied contaminant name, Additional bug fixes
 #                March 7, 2014      - converted to arcpy for V2
 #                March 11, 2015     - added code to check if depth field in the SITE_ATTRIBUTES table is called "DEPTH" (legacy) or "DEPTH_ID"
+#                October 16, 2026   - Updated grid size advisory for tiled analysis grids and the cost estimator
+#                October 17, 2026   - Reports the contaminant data backend and warns when COC_DATA is out of date
+#                                     with the contaminant columns
 #
 # ---------------------------------------------------------------------------
 
@@ -25,6 +28,7 @@ class baddatabase(Exception):
 
 # Import system modules
 import ARD_HEA_Tools
+import ARD_HEA_Grid
 import sys
 import string
 import os
@@ -117,7 +121,7 @@ try:
         ARD_HEA_Tools.stringout(f, "EXTENT:", str(extent.XMin) + ", " + str(extent.YMax) + ", " + str(extent.XMax) + ", " + str(extent.YMax))
         if cells >= 10000:
             ARD_HEA_Tools.textout(f, "\n")
-            ARD_HEA_Tools.stringout(f, "WARNING:","When setting the cell size for this analysis, users should consider the number of contaminants \nthat will be included in the HEA as well as the number of years for extrapolating into the future. If you anticipate \nneeding more than three to five contaminants in the analysis and/or more than 100 years of analysis, it is recommended \nthat you limit the study area to less than 10,000 grid cells by either increasing the size of the grid or sub-dividing \nthe study area.")
+            ARD_HEA_Tools.stringout(f, "WARNING:","When setting the cell size for this analysis, users should consider the number of contaminants \nthat will be included in the HEA as well as the number of years for extrapolating into the future. The GIS tools \nprocess large grids in tiles and do not require the study area to be sub-divided, but the size of the HEA calculation \ntables grows with the number of grid cells times the number of contaminants and analysis years. If you anticipate \nneeding more than three to five contaminants in the analysis and/or more than 100 years of analysis, consider \nincreasing the size of the grid cells. The Estimate Analysis Cost tool predicts table sizes, memory and run \ntime for a proposed cell size.")
             ARD_HEA_Tools.textout(f, "\n")
     else:
         ARD_HEA_Tools.textout(f, "\nNo valid analysis grid has been defined.\n")
@@ -180,6 +184,14 @@ try:
     else:
         ARD_HEA_Tools.textout(f,"\nNo contaminants have been loaded into the HEA geodatabase.\n")
 
+    # Report where contaminant values are stored and whether COC_DATA holds them...
+    COCBackend = ARD_HEA_Grid.coc_backend(geoDB)
+    ARD_HEA_Tools.textout(f, "")
+    ARD_HEA_Tools.valueout(f, "CONTAMINANT VALUES STORED AS:", COCBackend)
+    if ARD_HEA_Grid.coc_data_stale(geoDB):
+        ARD_HEA_Tools.stringout(f, "WARNING:", ARD_HEA_Grid.COC_DATA_STALE)
+        arcpy.AddWarning(ARD_HEA_Grid.COC_DATA_STALE)
+
 
 
     # Report loaded site attributes, if available...
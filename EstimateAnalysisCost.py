@@ -0,0 +1,123 @@
+# ---------------------------------------------------------------------------
+# NAME: EstimateAnalysisCost.py
+# Version: 2.0 (ArcGIS 10.2)
+# Author: Research Planning, Inc.
+#
+# Usage: EstimateAnalysisCost <input_analysis_database> <extent> <cell_size> <number_of_contaminants> <number_of_scenarios>
+#                             <number_of_analysis_years> {mask_layer} {output_coordinate_system}
+#
+# Required Arguments:
+#   input_analysis_database - Name of analysis geodatabase (its recorded timings are used for calibration)
+#   extent - Extent of analysis grid
+#   cell_size - Size of each grid cell in analysis grid
+#   number_of_contaminants - Number of contaminants that will be loaded into COC_DATA
+#   number_of_scenarios - Number of HEA scenarios
+#   number_of_analysis_years - Number of years the HEA will be extrapolated over
+#
+# Optional Arguments:
+#   mask_layer - Polygonal mask for analysis grid
+#   output_coordinate_system - Coordinate system of analysis grid (defaults to that of the mask layer)
+#
+# Description: Estimates the number of grid cells, table rows, peak memory and run time of each
+#              processing stage before an analysis grid is created, so a cell size can be chosen
+#              before committing to a long run
+#
+# Notes:  Currently the tool is designed to only be run via the ARD HEA Toolbox.
+#         INTERPOLATION is the time to interpolate one surface per contaminant with the
+#         engine interpolators, calibrated from the runs recorded in the project.
+#
+# Date Created: October 16, 2026
+#
+# ---------------------------------------------------------------------------
+
+# Import system modules
+import ARD_HEA_Tools
+import ARD_HEA_Cost
+import sys
+import string
+import os
+import traceback
+import arcpy
+from arcpy import env
+
+try:
+    # Report version...
+    ver = ARD_HEA_Tools.version()
+    arcpy.AddMessage("ARD HEA Tools Version: " + ver)
+
+    # Script arguments...
+    geoDB = sys.argv[1]
+    grdExtent = sys.argv[2]
+    grdCellSize = float(sys.argv[3])
+    numCOCs = int(sys.argv[4])
+    numScenarios = int(sys.argv[5])
+    numYears = int(sys.argv[6])
+    grdMaskLayer = sys.argv[7] if len(sys.argv) > 7 else '#'
+    grdCoordinateSystem = sys.argv[8] if len(sys.argv) > 8 else '#'
+
+    # Resolve coordinate system for the mask layer...
+    spatialRef = None
+    if grdMaskLayer <> '#' and grdMaskLayer != "":
+        if grdCoordinateSystem <> '#' and grdCoordinateSystem != "":
+            env.outputCoordinateSystem = grdCoordinateSystem
+            spatialRef = env.outputCoordinateSystem
+        else:
+            spatialRef = arcpy.Describe(grdMaskLayer).SpatialReference
+
+    # Process: Count grid cells...
+    arcpy.AddMessage("Counting grid cells...")
+    cells, grid = ARD_HEA_Cost.estimate_cells(geoDB, grdExtent, grdCellSize, grdMaskLayer, spatialRef)
+    arcpy.AddMessage("  Grid: " + str(grid["ncols"]) + " columns x " + str(grid["nrows"]) + " rows, " + str(cells) + " analysis cells")
+
+    # Process: Estimate each stage...
+    rates = ARD_HEA_Cost.load_rates(geoDB)
+    stages = ARD_HEA_Cost.estimate(cells, numCOCs, numScenarios, numYears, rates)
+    arcpy.AddMessage("\n  %-16s %15s %12s %12s  %s" % ("STAGE", "ROWS", "PEAK MEMORY", "TIME", "CALIBRATION"))
+    total = 0.0
+    for stage in stages:
+        if stage["calibrated"] > 0:
+            source = str(stage["calibrated"]) + " recorded runs"
+        else:
+            source = "default rate"
+        arcpy.AddMessage("  %-16s %15d %12s %12s  %s" % (stage["stage"], stage["rows"], ARD_HEA_Cost.format_size(stage["memory"]), ARD_HEA_Cost.format_time(stage["seconds"]), source))
+        total += stage["seconds"]
+    arcpy.AddMessage("  Total estimated time: " + ARD_HEA_Cost.format_time(total))
+
+    # Process: Compare coarser cell sizes (cell count scales with the square of the cell size)...
+    arcpy.AddMessage("\n  %-16s %15s %12s" % ("CELL SIZE", "CELLS", "TOTAL TIME"))
+    for factor in [1.0, 1.5, 2.0, 3.0, 4.0]:
+        altCells = int(cells / (factor * factor))
+        altTotal = sum([s["seconds"] for s in ARD_HEA_Cost.estimate(altCells, numCOCs, numScenarios, numYears, rates)])
+        arcpy.AddMessage("  %-16s %15d %12s" % (str(grdCellSize * factor), altCells, ARD_HEA_Cost.format_time(altTotal)))
+
+except arcpy.ExecuteError:
+    # Get the tool error messages
+    msgs = arcpy.GetMessage(0)
+    msgs += arcpy.GetMessages(2)
+
+    # Return tool error messages for use with a script tool
+    arcpy.AddError(msgs)
+
+    # Print tool error messages for use in Python/PythonWin
+    print msgs
+
+except:
+    # Get the traceback object
+    #
+    tb = sys.exc_info()[2]
+    tbinfo = traceback.format_tb(tb)[0]
+
+    # Concatenate information together concerning the error into a message string
+    #
+    pymsg = "PYTHON ERRORS:\nTraceback info:\n" + tbinfo + "\nError Info:\n" + str(sys.exc_info()[1])
+    msgs = "ArcPy ERRORS:\n" + arcpy.GetMessages(2) + "\n"
+
+    # Return python error messages for use in script tool or Python Window
+    #
+    arcpy.AddError(pymsg)
+    arcpy.AddError(msgs)
+
+    # Print Python error messages for use in Python / Python Window
+    #
+    print pymsg + "\n"
+    print msgs
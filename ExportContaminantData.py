@@ -0,0 +1,119 @@
+# ---------------------------------------------------------------------------
+# NAME: ExportContaminantData.py
+# Version: 2.0 (ArcGIS 10.2)
+# Author: Research Planning, Inc.
+#
+# Usage: ExportContaminantData <input_analysis_database> {coc_backend}
+#
+# Required Arguments:
+#   input_analysis_database - Name of analysis geodatabase
+#
+# Optional Arguments:
+#   {coc_backend} - Storage of loaded contaminant values from now on: TABLE (the COC_DATA table)
+#                   or COLUMNS (per-contaminant columns in the project cache); default is unchanged
+#
+# Description: Exports contaminant values stored in columns to the COC_DATA table used by
+#              the Access HEA tool, and switches the project between the two storage backends
+#
+# Notes:  Currently the tool is designed to only be run via the ARD HEA Toolbox.
+#         Switching to COLUMNS imports the COC_DATA records into the columns; switching to
+#         TABLE exports the columns to COC_DATA and removes them.  The backend is recorded
+#         in the COC_BACKEND field of PROJECT_ATTRIBUTES, which is added when missing.
+#         Tools changing the columns mark COC_DATA out of date and warn until this tool
+#         is run again.
+#
+# Date Created: October 17, 2026
+#
+# ---------------------------------------------------------------------------
+
+class badbackend(Exception):
+    pass
+
+# Import system modules
+import ARD_HEA_Tools
+import ARD_HEA_Grid
+import sys
+import string
+import os
+import traceback
+import arcpy
+from arcpy import env
+
+# Load required toolboxes...
+sub_folder = "ArcToolbox/Toolboxes/"
+install_dir = arcpy.GetInstallInfo("desktop")['InstallDir'].replace("\\","/")
+tbx_home = os.path.join(install_dir, sub_folder)
+arcpy.AddToolbox(tbx_home+"Data Management Tools.tbx")
+arcpy.AddToolbox(tbx_home+"Conversion Tools.tbx")
+
+try:
+    # Report version...
+    ver = ARD_HEA_Tools.version()
+    arcpy.AddMessage("ARD HEA Tools Version: " + ver)
+
+    # Script arguments...
+    geoDB = sys.argv[1]
+    currBackend = ARD_HEA_Grid.coc_backend(geoDB)
+    if len(sys.argv) > 2 and sys.argv[2] not in ('#', ''):
+        COCBackend = sys.argv[2].upper()
+    else:
+        COCBackend = currBackend
+    if COCBackend not in ARD_HEA_Grid.COC_BACKENDS:
+        raise badbackend
+
+    # Local variables...
+    COCData = geoDB + "\\COC_DATA"
+
+    # Set the geoprocessing environment
+    env.overwriteOutput = 1
+
+    if currBackend == "COLUMNS":
+        # Process: Write the contaminant columns to COC_DATA...
+        arcpy.AddMessage("Exporting contaminant columns to COC_DATA...")
+        loaded, seconds = ARD_HEA_Grid.export_coc_columns(geoDB, COCData)
+        ARD_HEA_Tools.rateout(loaded, seconds, "contaminant records exported")
+        if COCBackend == "TABLE":
+            ARD_HEA_Grid.clear_coc_columns(geoDB)
+    elif COCBackend == "COLUMNS":
+        # Process: Read the COC_DATA records into contaminant columns...
+        arcpy.AddMessage("Importing COC_DATA records into contaminant columns...")
+        loaded = ARD_HEA_Grid.import_coc_columns(geoDB, ARD_HEA_Grid.load_grid(geoDB), COCData)
+        arcpy.AddMessage("  " + str(loaded) + " contaminant records imported")
+    else:
+        arcpy.AddMessage("Contaminant values are stored in COC_DATA, nothing to export")
+
+    # Process: Record the storage backend...
+    if COCBackend != currBackend:
+        arcpy.AddMessage("Contaminant values are now stored as " + COCBackend)
+        ARD_HEA_Grid.set_coc_backend(geoDB, COCBackend)
+
+except badbackend:
+    arcpy.AddError("\n*** ERROR ***\nContaminant data backend must be one of: " + ", ".join(ARD_HEA_Grid.COC_BACKENDS))
+    print "\n*** ERROR ***\nContaminant data backend must be one of: " + ", ".join(ARD_HEA_Grid.COC_BACKENDS)
+
+except arcpy.ExecuteError:
+    # Get the geoprocessing error messages
+    msgs = arcpy.GetMessage(0)
+    msgs += arcpy.GetMessages(2)
+
+    # Return gp error messages for use with a script tool
+    arcpy.AddError(msgs)
+
+    # Print gp error messages for use in Python/PythonWin
+    print msgs
+
+except:
+    # Get the traceback object
+    tb = sys.exc_info()[2]
+    tbinfo = traceback.format_tb(tb)[0]
+
+    # Concatenate information together concerning the error into a
+    # message string
+    pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+
+    # Return python error messages for use with a script tool
+    arcpy.AddError(pymsg)
+
+    # Print Python error messages for use in Python/PythonWin
+    print pymsg
+
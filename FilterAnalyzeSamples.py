@@ -4,19 +4,32 @@
 # Author: Research Planning, Inc.
 #
 # Usage: FilterAnalyzeSamples <input_analysis_database> <input_contaminant_layer> <value_field>
-#   <value_field_units> <statistic_type> <boolean_log_transform> <contaminant_qm_documentation>
+#   <contaminant_name> <value_field_units> <statistic_type> <contaminant_qm_documentation> {snap_tolerance}
+#   {permutations} {processes} {xy_fields}
 #
 # Required Arguments: 
 #   input_analysis_database - Name of analysis geodatabase
-#   input_contaminant_layer - Name of contaminant layer imported from Query Manager
-#   value_field - Value field to analyze in contaminant layer
-#   value_field_units - Units of measurement of the contaminant value field
+#   input_contaminant_layer - Name of contaminant layer imported from Query Manager, or a delimited text
+#                             export (.csv, .txt, .tab, .asc) with coordinate columns
+#   value_field - Value field to analyze in contaminant layer, or a semicolon delimited list of value fields
+#   contaminant_name - Name of the contaminant, or a semicolon delimited list with one name per value field
+#   value_field_units - Units of measurement of the contaminant value field, or a semicolon delimited list
+#                       with the units of each value field
 #   statistic_type - Type of statistic to perform on duplicate sample locations
-#                    limited to: (Max, Mean)
-#   boolean_log_transform - Boolean flag indicating if natural log of values is performed on contaminant values
+#                    limited to: (Max, Mean, Min, Sum, Range, Count, First, Last)
 #   contaminant_qm_documentation - Name and location of the autogenerated documentation text file for
 #                                  the contaminant layer imported from Query Manager
 #
+# Optional Arguments:
+#   {snap_tolerance} - Samples closer than this distance are treated as one location (default 0, only
+#                      samples with identical coordinates)
+#   {permutations} - Number of random permutations used for a pseudo p-value of the spatial autocorrelation
+#                    (default 0, p-value from the normal approximation)
+#   {processes} - Number of worker processes used for the statistics (default: number of CPUs)
+#   {xy_fields} - Semicolon delimited X and Y coordinate columns of a delimited text export (default: the first
+#                 of X;Y, POINT_X;POINT_Y, EASTING;NORTHING or X_COORD;Y_COORD found).  The coordinate system
+#                 is the output coordinate system environment or the .prj file next to the export
+#
 # Description: Filter contaminant layer for duplicate samples and determine the mean or maximum value at
 #              each location.  Then analyze the filtered layer for information to determine an appropriate
 #              cell size for the analysis grid.
@@ -38,19 +51,45 @@
 #                      September 15, 2012 - Changed to utilize user supplied contaminant name, Additional bug fixes
 # Date V 2.0 Modified: September 17, 2013 - Converted to arcpy for V2.0 and upgraded metadata xml files
 #                      February 16, 2015  - Added code to sanitize the contaminant name if it starts with spaces or numbers
+#                      October 17, 2026   - Duplicate sample locations are aggregated in memory by ARD_HEA_Stats from a
+#                                           single read of the samples and the _filtered layer is written once;
+#                                           _Layer and _Stats are no longer written to the geodatabase.  Added
+#                                           {snap_tolerance}
+#                                         - Average Nearest Neighbor and the distance band are computed by ARD_HEA_Stats
+#                                           from one spatial index over the filtered stations
+#                                         - Spatial autocorrelation (Moran's I) is computed by ARD_HEA_Stats from sparse
+#                                           inverse distance weights, with an optional parallel permutation test.
+#                                           Added {permutations} and {processes}
+#                                         - Several value fields of a multi-analyte export can be filtered in one run;
+#                                           the layer is read once, the samples are sorted by location once and
+#                                           contaminants sampled at the same stations share the neighbor search.
+#                                           Statistics of different station sets run in a process pool
+#                                         - Delimited text exports are streamed in chunks and aggregated as they are
+#                                           read, skipping rows without valid coordinates.  Added {xy_fields}
 #                      
 # ---------------------------------------------------------------------------
 
 class unprojected(Exception):
     pass
 
+class toofew(Exception):
+    pass
+
+class fieldcount(Exception):
+    pass
+
+class nocoordinates(Exception):
+    pass
+
 # Import system modules
 import ARD_HEA_Tools
+import ARD_HEA_Stats
 import sys
 import string
 import os
 import traceback
 import math
+import numpy
 import arcpy
 from arcpy import env
 
@@ -58,9 +97,7 @@ from arcpy import env
 sub_folder = "ArcToolbox/Toolboxes/"
 install_dir = arcpy.GetInstallInfo("desktop")['InstallDir'].replace("\\","/")
 tbx_home = os.path.join(install_dir, sub_folder)
-arcpy.AddToolbox(tbx_home+"Spatial Statistics Tools.tbx")
 arcpy.AddToolbox(tbx_home+"Data Management Tools.tbx")
-arcpy.AddToolbox(tbx_home+"Analysis Tools.tbx")
 
 try:
     # Report version...
@@ -75,9 +112,35 @@ try:
     COCUnits = sys.argv[5]
     STATType = sys.argv[6]
     qmDoc = sys.argv[7]
+    if len(sys.argv) > 8 and sys.argv[8] not in ('#', ''):
+        snapTolerance = float(sys.argv[8])
+    else:
+        snapTolerance = 0.0
+    if len(sys.argv) > 9 and sys.argv[9] not in ('#', ''):
+        SAPermutations = int(sys.argv[9])
+    else:
+        SAPermutations = 0
+    if len(sys.argv) > 10:
+        SAProcesses = ARD_HEA_Tools.process_count(sys.argv[10])
+    else:
+        SAProcesses = ARD_HEA_Tools.process_count('#')
+    if len(sys.argv) > 11 and sys.argv[11] not in ('#', ''):
+        XYFields = [fld.strip() for fld in sys.argv[11].split(";")]
+    else:
+        XYFields = None
     currDir = os.path.dirname(geoDB)
 
-    arcpy.AddMessage("COC Name: " + COCName)
+    # Split semicolon delimited lists of value fields, contaminant names and units...
+    COCFields = [fld.strip() for fld in COCField.split(";") if fld.strip() != ""]
+    COCNames = [name.strip() for name in COCName.split(";") if name.strip() != ""]
+    COCUnitList = [unit.strip() for unit in COCUnits.split(";")]
+    if len(COCUnitList) == 1:
+        COCUnitList = COCUnitList * len(COCFields)
+    if len(COCNames) != len(COCFields) or len(COCUnitList) != len(COCFields):
+        raise fieldcount
+
+    for name in COCNames:
+        arcpy.AddMessage("COC Name: " + name)
     
     # Local variables...
     desc = arcpy.Describe(COCLayer)
@@ -89,79 +152,77 @@ try:
     else:
         COCLayerBase = COCLayerN.split(".")[0]
     #COCLayerBase = ARD_HEA_Tools.sanitize(COCLayerBase)
-    COCLayerOut = geoDB + "\\" + ARD_HEA_Tools.sanitize(COCLayerBase) + "_Layer"
-    COCStats = geoDB + "\\" + ARD_HEA_Tools.sanitize(COCName) + "_Stats"
-    COCFieldStat = COCField + " " + STATType
-    COCStatsLyr = ARD_HEA_Tools.sanitize(COCName) + "_Stats_Layer"
-    COCFiltered = geoDB + "\\" + ARD_HEA_Tools.sanitize(COCName) + "_filtered"
-    COCFilteredLyr = ARD_HEA_Tools.sanitize(COCName) + "_filtered"
-    SpatRef = arcpy.Describe(COCLayer).SpatialReference
-    SAField = STATType + "_" + COCField
+    delimited = os.path.isfile(COCLayer) and os.path.splitext(COCLayer)[1].lower() in ARD_HEA_Stats.DELIMITED_TYPES
+    if delimited:
+        SpatRef = env.outputCoordinateSystem
+        prjFile = os.path.splitext(COCLayer)[0] + ".prj"
+        if SpatRef is None and os.path.isfile(prjFile):
+            SpatRef = arcpy.SpatialReference(prjFile)
+    else:
+        SpatRef = arcpy.Describe(COCLayer).SpatialReference
     InventTable = geoDB + "\\COC_INVENTORY"
-    fltrString = arcpy.AddFieldDelimiters(COCLayer, COCField) + " > -999.99"
-    chkString1 = fltrString + " AND " + arcpy.AddFieldDelimiters(COCLayer, COCField) + " <= 0"
-    chkString2 = arcpy.AddFieldDelimiters(COCLayer, COCField) + " > 0 AND " + arcpy.AddFieldDelimiters(COCLayer, COCField) + " < 1"
+    nullValue = -9999999
 
     # Check for projected coordinate system...
-    project = desc.SpatialReference.Name
-    units = desc.SpatialReference.LinearUnitName.upper()
+    if SpatRef is None:
+        raise unprojected
+    project = SpatRef.Name
+    units = SpatRef.LinearUnitName.upper()
     if units == "":
         raise unprojected
     
     # Set the geoprocessing environment
     env.overwriteOutput = 1
 
-    # Process: Make Feature Layer...
-    arcpy.MakeFeatureLayer_management(COCLayer, "templyr", fltrString, "", "")
-    arcpy.CopyFeatures_management("templyr", COCLayerOut, "", "")
-    arcpy.Delete_management("templyr")
-
-    # Process: Add XY Coordinates
-    arcpy.AddXY_management(COCLayerOut)
-
-    # Process: Summary Statistics...
-    arcpy.AddMessage("Filtering Samples...")  
-    arcpy.Statistics_analysis(COCLayerOut, COCStats, COCFieldStat, "POINT_X;POINT_Y")
-    arcpy.Delete_management(COCLayerOut)
-
-    # Process: Make XY Event Layer...
-    arcpy.MakeXYEventLayer_management(COCStats, "POINT_X", "POINT_Y", COCStatsLyr, SpatRef)
-    arcpy.CopyFeatures_management(COCStatsLyr, COCFiltered)
-
-    # Process: Capture geoprocessing history...
-    history = ARD_HEA_Tools.get_process_history(currDir, COCStats)
-
-    # Cleanup intermediate files
-    # arcpy.Delete_management(COCStats)
-
-    #Import metadata template...
-    arcpy.AddMessage("Updating metadata...")
-    arcpy.ImportMetadata_conversion(xmlTemp, "FROM_FGDC", COCFiltered)
-    # arcpy.MetadataImporter_conversion(xmlTemp, COCFiltered)
-
-    # Process: Average Nearest Neighbor...
-    arcpy.AddMessage("\nDetermining Average Nearest Neighbor stats...")
-    NNOutput = arcpy.AverageNearestNeighbor_stats(COCFiltered, "#", "#", "#")
-    arcpy.AddMessage("The nearest neighbor index is: " + NNOutput.getOutput(0))
-    arcpy.AddMessage("The z-score of the nearest neighbor index is: " + NNOutput.getOutput(1))
-    arcpy.AddMessage("The p-value of the nearest neighbor index is: " + NNOutput.getOutput(2))
-
-    # Process: Spatial Autocorrelation (Morans I)...
-    arcpy.AddMessage("\nDetermining Spatial Autocorrelation stats...")
-    SAOutput = arcpy.SpatialAutocorrelation_stats(COCFiltered, SAField)
-    arcpy.AddMessage("The spatial autocorrelation index is: " + SAOutput.getOutput(0))
-    arcpy.AddMessage("The z-score of the spatial autocorrelation is: " + SAOutput.getOutput(1))
-    arcpy.AddMessage("The p-value of the spatial autocorrelation is: " + SAOutput.getOutput(2))
-
-    # Process: Calculate Distance Band from Neighbor Count...
-    arcpy.AddMessage("\nDetermining Distance Band from Neighbor...")
-    CDBOutput = arcpy.CalculateDistanceBand_stats(COCFiltered, "1", "#")
-    arcpy.AddMessage("The minimum distance band is: " + CDBOutput.getOutput(0))
-    arcpy.AddMessage("The average distance band is: " + CDBOutput.getOutput(1))
-    arcpy.AddMessage("The maximum distance band is: " + CDBOutput.getOutput(2) + "\n")
-
-    # Process: Capture geoprocessing history...
-    history = history + ARD_HEA_Tools.get_process_history(currDir, COCFiltered)
+    if delimited:
+        # Process: Stream the export in chunks, summarizing duplicate sample locations of each field as it is read...
+        if XYFields is None:
+            header = [fld.upper() for fld in ARD_HEA_Stats.delimited_fields(COCLayer)[0]]
+            for pair in ARD_HEA_Stats.XY_FIELDS:
+                if pair[0] in header and pair[1] in header:
+                    XYFields = list(pair)
+                    break
+            if XYFields is None:
+                raise nocoordinates
+        arcpy.AddMessage("Filtering Samples...")
+        fieldStations, rowCount, rejected, takenCounts = ARD_HEA_Stats.stream_stations(
+            COCLayer, COCFields, XYFields[0], XYFields[1], STATType, snapTolerance)
+        arcpy.AddMessage("  " + str(rowCount) + " rows read, " + str(rejected) + " without valid coordinates")
+    else:
+        # Process: Read sampled locations and values of every field once...
+        samples = arcpy.da.FeatureClassToNumPyArray(COCLayer, ["SHAPE@X", "SHAPE@Y"] + COCFields, null_value=nullValue)
+        sampleX = numpy.asarray(samples["SHAPE@X"], dtype=numpy.float64)
+        sampleY = numpy.asarray(samples["SHAPE@Y"], dtype=numpy.float64)
+        sampleOrder = ARD_HEA_Stats.station_groups(sampleX, sampleY, snapTolerance)[0]
+        arcpy.AddMessage("Filtering Samples...")
+
+    # Process: Summarize duplicate sample locations of each field, skipping samples not taken (-999.99)...
+    analytes = []
+    stations = []
+    for i, (fld, name, unit) in enumerate(zip(COCFields, COCNames, COCUnitList)):
+        if delimited:
+            stationX, stationY, stationCount, stationValue = fieldStations[i]
+            takenCount = takenCounts[i]
+        else:
+            sampleValues = numpy.asarray(samples[fld], dtype=numpy.float64)
+            taken = sampleOrder[sampleValues[sampleOrder] > -999.99]
+            stationX, stationY, stationCount, stationValue = ARD_HEA_Stats.aggregate_stations(
+                sampleX, sampleY, sampleValues, STATType, snapTolerance, taken)
+            takenCount = len(taken)
+        arcpy.AddMessage("  " + name + ": " + str(takenCount) + " samples at " + str(len(stationX)) + " locations")
+        if len(stationX) < 2:
+            if len(COCFields) == 1:
+                raise toofew
+            arcpy.AddMessage("\n*** WARNING ***\nSkipping " + name + ", sample statistics need at least 2 sampled locations\n")
+            continue
+        analytes.append((fld, name, unit, stationCount))
+        stations.append((stationX, stationY, stationValue))
+    if not delimited:
+        del samples
+
+    # Process: Nearest neighbor and spatial autocorrelation statistics of every contaminant...
+    arcpy.AddMessage("\nDetermining sample statistics...")
+    analyteStats = ARD_HEA_Stats.analyte_stats(stations, SAPermutations, SAProcesses)
 
     #Read in query manager document
     if arcpy.Exists(qmDoc):
@@ -170,14 +231,79 @@ try:
         f.close()
     else:
         qmText = None
-    
-    #Process: Update contaminant inventory table...
-    rows = arcpy.UpdateCursor(InventTable, "[COC_NAME] = '" + COCName + "'")
-    row = rows.next()
-    if row:
-        while row:
-            arcpy.AddMessage("Updating COC Name: " + COCName)
+
+    for (COCField, COCName, COCUnits, stationCount), (stationX, stationY, stationValue), (NNStats, SAStats) in zip(analytes, stations, analyteStats):
+        COCFiltered = geoDB + "\\" + ARD_HEA_Tools.sanitize(COCName) + "_filtered"
+        COCFilteredLyr = ARD_HEA_Tools.sanitize(COCName) + "_filtered"
+        SAField = STATType.upper() + "_" + COCField
+        arcpy.AddMessage("\n" + COCName + ":")
+
+        # Process: Write filtered layer...
+        ARD_HEA_Stats.write_stations(COCFiltered, stationX, stationY, stationCount, stationValue, SAField, SpatRef)
+
+        #Import metadata template...
+        arcpy.AddMessage("Updating metadata...")
+        arcpy.ImportMetadata_conversion(xmlTemp, "FROM_FGDC", COCFiltered)
+        # arcpy.MetadataImporter_conversion(xmlTemp, COCFiltered)
+
+        # Process: Average Nearest Neighbor...
+        arcpy.AddMessage("\nDetermining Average Nearest Neighbor stats...")
+        arcpy.AddMessage("The nearest neighbor index is: " + str(NNStats["ratio"]))
+        arcpy.AddMessage("The z-score of the nearest neighbor index is: " + str(NNStats["zscore"]))
+        arcpy.AddMessage("The p-value of the nearest neighbor index is: " + str(NNStats["pvalue"]))
+
+        # Process: Spatial Autocorrelation (Morans I)...
+        arcpy.AddMessage("\nDetermining Spatial Autocorrelation stats...")
+        if SAPermutations > 0 and SAStats["index"] is not None:
+            arcpy.AddMessage("Pseudo p-value from " + str(SAPermutations) + " permutations")
+        arcpy.AddMessage("The spatial autocorrelation index is: " + str(SAStats["index"]))
+        arcpy.AddMessage("The z-score of the spatial autocorrelation is: " + str(SAStats["zscore"]))
+        arcpy.AddMessage("The p-value of the spatial autocorrelation is: " + str(SAStats["pvalue"]))
+
+        # Process: Distance Band from Neighbor Count...
+        arcpy.AddMessage("\nDetermining Distance Band from Neighbor...")
+        arcpy.AddMessage("The minimum distance band is: " + str(NNStats["min"]))
+        arcpy.AddMessage("The average distance band is: " + str(NNStats["avg"]))
+        arcpy.AddMessage("The maximum distance band is: " + str(NNStats["max"]) + "\n")
+
+        # Process: Capture geoprocessing history...
+        history = ARD_HEA_Tools.get_process_history(currDir, COCFiltered)
+
+        #Process: Update contaminant inventory table...
+        rows = arcpy.UpdateCursor(InventTable, "[COC_NAME] = '" + COCName + "'")
+        row = rows.next()
+        if row:
+            while row:
+                arcpy.AddMessage("Updating COC Name: " + COCName)
+                row.COC_NAME = COCName
+                row.COC_UNITS = COCUnits
+                if qmText is not None:
+                    row.COC_QMDOC = qmText
+                row.COC_XML = history
+                row.INPUT_LAYER_NAME = COCLayerBase
+                row.FILTER_LAYER_NAME = COCFilteredLyr
+                row.STAT_TYPE = STATType
+                row.MIN_DIST = NNStats["min"]
+                row.AVG_DIST = NNStats["avg"]
+                row.MAX_DIST = NNStats["max"]
+                row.NNRATIO = NNStats["ratio"]
+                row.NNZSCORE = NNStats["zscore"]
+                row.NNPVALUE = NNStats["pvalue"]
+                row.SAINDEX = SAStats["index"]
+                row.SAZSCORE = SAStats["zscore"]
+                row.SAPVALUE = SAStats["pvalue"]
+                row.LOG_TRANSFORM = ""
+                row.INTERP_LAYER_NAME = ""
+                row.INTERP_TYPE = ""
+                rows.updateRow(row)
+                row = rows.next()
+        else:
+            del row
+            del rows
+            rows = arcpy.InsertCursor(InventTable)
+            row = rows.newRow()
             row.COC_NAME = COCName
+            arcpy.AddMessage("Inserting COC Name: " + COCName)
             row.COC_UNITS = COCUnits
             if qmText is not None:
                 row.COC_QMDOC = qmText
@@ -185,60 +311,44 @@ try:
             row.INPUT_LAYER_NAME = COCLayerBase
             row.FILTER_LAYER_NAME = COCFilteredLyr
             row.STAT_TYPE = STATType
-            row.MIN_DIST = CDBOutput.getOutput(0)
-            row.AVG_DIST = CDBOutput.getOutput(1)
-            row.MAX_DIST = CDBOutput.getOutput(2)
-            row.NNRATIO = NNOutput.getOutput(0)
-            row.NNZSCORE = NNOutput.getOutput(1)
-            row.NNPVALUE = NNOutput.getOutput(2)
-            row.SAINDEX = SAOutput.getOutput(0)
-            row.SAZSCORE = SAOutput.getOutput(1)
-            row.SAPVALUE = SAOutput.getOutput(2)
+            row.MIN_DIST = NNStats["min"]
+            row.AVG_DIST = NNStats["avg"]
+            row.MAX_DIST = NNStats["max"]
+            row.NNRATIO = NNStats["ratio"]
+            row.NNZSCORE = NNStats["zscore"]
+            row.NNPVALUE = NNStats["pvalue"]
+            row.SAINDEX = SAStats["index"]
+            row.SAZSCORE = SAStats["zscore"]
+            row.SAPVALUE = SAStats["pvalue"]
             row.LOG_TRANSFORM = ""
             row.INTERP_LAYER_NAME = ""
             row.INTERP_TYPE = ""
-            rows.updateRow(row)
-            row = rows.next()
-    else:
+            rows.insertRow(row)
         del row
         del rows
-        rows = arcpy.InsertCursor(InventTable)
-        row = rows.newRow()
-        row.COC_NAME = COCName
-        arcpy.AddMessage("Inserting COC Name: " + COCName)
-        row.COC_UNITS = COCUnits
-        if qmText is not None:
-            row.COC_QMDOC = qmText
-        row.COC_XML = history
-        row.INPUT_LAYER_NAME = COCLayerBase
-        row.FILTER_LAYER_NAME = COCFilteredLyr
-        row.STAT_TYPE = STATType
-        row.MIN_DIST = CDBOutput.getOutput(0)
-        row.AVG_DIST = CDBOutput.getOutput(1)
-        row.MAX_DIST = CDBOutput.getOutput(2)
-        row.NNRATIO = NNOutput.getOutput(0)
-        row.NNZSCORE = NNOutput.getOutput(1)
-        row.NNPVALUE = NNOutput.getOutput(2)
-        row.SAINDEX = SAOutput.getOutput(0)
-        row.SAZSCORE = SAOutput.getOutput(1)
-        row.SAPVALUE = SAOutput.getOutput(2)
-        row.LOG_TRANSFORM = ""
-        row.INTERP_LAYER_NAME = ""
-        row.INTERP_TYPE = ""
-        rows.insertRow(row)
-    del row
-    del rows
-    
-    # Process: Make feature layer
-    arcpy.MakeFeatureLayer_management(COCFiltered, COCFilteredLyr, "", "", "")
 
-    # Set ouptut geoprocessing history
-    ARD_HEA_Tools.set_process_history (currDir, COCFiltered, history)
+        # Process: Make feature layer
+        arcpy.MakeFeatureLayer_management(COCFiltered, COCFilteredLyr, "", "", "")
+
+        # Set ouptut geoprocessing history
+        ARD_HEA_Tools.set_process_history (currDir, COCFiltered, history)
 
 except unprojected:
     arcpy.AddError("\n*** ERROR ***\nCannot import COC sample data with an unprojected coordinate system.\n")
     print "\n*** ERROR ***\nCannot import COC sample data with an with an unprojected coordinate system.\n"
 
+except fieldcount:
+    arcpy.AddError("\n*** ERROR ***\nA contaminant name (and units) must be given for each value field\n")
+    print "\n*** ERROR ***\nA contaminant name (and units) must be given for each value field\n"
+
+except nocoordinates:
+    arcpy.AddError("\n*** ERROR ***\nCannot find the coordinate columns of the sample export, give them as {xy_fields}\n")
+    print "\n*** ERROR ***\nCannot find the coordinate columns of the sample export, give them as {xy_fields}\n"
+
+except toofew:
+    arcpy.AddError("\n*** ERROR ***\nSample statistics need at least 2 sampled locations\n")
+    print "\n*** ERROR ***\nSample statistics need at least 2 sampled locations\n"
+
 except arcpy.ExecuteError:
     # Get the tool error messages
     msgs = arcpy.GetMessage(0)
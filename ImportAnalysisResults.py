@@ -18,6 +18,9 @@
 # Date Modified: June 1, 2011       - Added symbology layer application
 #                September 15, 2012 - Changed to utilize user supplied contaminant name, Additional bug fixes
 #                March 11, 2014     - updated to arcpy for V2.0
+#                October 16, 2026   - Results are streamed into memory-mapped per-cell arrays and written to the DSAY and
+#                                     percent injury rasters tile by tile instead of through joined result points
+#                                   - Import timings are recorded in the project cache for the cost estimator
 # 
 # ---------------------------------------------------------------------------
 
@@ -26,10 +29,14 @@ class noresults(Exception):
 
 # Import system modules
 import ARD_HEA_Tools
+import ARD_HEA_Grid
+import ARD_HEA_Cost
 import sys
 import string
 import os
 import traceback
+import time
+import numpy
 import arcpy
 from arcpy import env
 
@@ -110,24 +117,36 @@ try:
     else:
 	arcpy.TableToTable_conversion(resTbl, geoDB, "ANALYSIS_RESULTS")
 
-    # Search results table for scenarios count and maximum year
-    valueList = []
-    maxyear = 0
-    field = "Scenario_ID"
-    rows = arcpy.SearchCursor(usrTbl)
-    row = rows.next()
-    while row:
-        valueList.append(row.getValue(field))
-        row = rows.next()
-    uniqueSet = set(valueList)
-    uniqueScen = list(uniqueSet)
-    uniqueScen.sort()
-    del rows
-    del row
+    # Stream results table into per-scenario cell arrays (DSAY sum and percent injury maximum by GRID_ID)
+    arcpy.AddMessage("Summarizing results by grid cell...")
+    start = time.time()
+    resRows = 0
+    grid = ARD_HEA_Grid.load_grid(geoDB)
+    resFields = ["Scenario_ID", "Grid_ID", "DSAY_Injury"]
+    if str(ischecked) == 'true':
+        resFields.append("PERCENT_INJURY")
+    dsayArrays = {}
+    pctArrays = {}
+    for chunk in ARD_HEA_Tools.table_chunks(usrTbl, resFields):
+        scenIDs = chunk[0]
+        resRows += len(scenIDs)
+        gridIDs = numpy.nan_to_num(chunk[1]).astype(numpy.int64)
+        dsays = numpy.nan_to_num(chunk[2])
+        for scen in numpy.unique(scenIDs[~numpy.isnan(scenIDs)]):
+            scen = int(scen)
+            sel = scenIDs == scen
+            if scen not in dsayArrays:
+                dsayArrays[scen] = ARD_HEA_Grid.cell_array(geoDB, "RESULTS", "SC" + str(scen) + "_DSAY", grid)
+                if str(ischecked) == 'true':
+                    pctArrays[scen] = ARD_HEA_Grid.cell_array(geoDB, "RESULTS", "SC" + str(scen) + "_PCT_INJ", grid)
+            ARD_HEA_Grid.accumulate(dsayArrays[scen], gridIDs[sel], dsays[sel], "SUM")
+            if str(ischecked) == 'true':
+                ARD_HEA_Grid.accumulate(pctArrays[scen], gridIDs[sel], numpy.nan_to_num(chunk[3][sel]), "MAX")
+    uniqueScen = sorted(dsayArrays.keys())
     arcpy.AddMessage("Scenarios with results: "+str(uniqueScen))
-    env.qualifiedFieldNames = "UNQUALIFIED"
+    spatialRef = arcpy.Describe(AnalysisGrid).SpatialReference
 
-    # Make a point layer for each scenario by copying ANALYSIS_POINTS and cursoring through results table for each grid cell
+    # Make DSAY (and percent injury) rasters for each scenario from the cell arrays
     for scen in uniqueScen:
         scname = ARD_HEA_Tools.sanitizetext(str(scen))
         rows = arcpy.SearchCursor(scnTbl, "[Scenario_ID] = " + str(scen))
@@ -140,66 +159,27 @@ try:
         del rows
         del row
         
-        #Setup temp and output files
-        outTbl = geoDB + "\\SC" + str(scen) + "_" + scname + "_RESULT_TBL"
-        if arcpy.Exists(outTbl):
-            arcpy.Delete_management(outTbl)
-        outPts = geoDB + "\\SC" + str(scen) + "_" + scname + "_RESULT_PNTS"
-        if arcpy.Exists(outPts):
-            arcpy.Delete_management(outPts)               
+        #Setup output files
         outDSAY = geoDB + "\\SC" + str(scen) + "_" + scname + "_DSAY"
-	outPCT = geoDB + "\\SC" + str(scen) + "_" + scname + "_PCT_INJ"
+        outPCT = geoDB + "\\SC" + str(scen) + "_" + scname + "_PCT_INJ"
         if arcpy.Exists(outDSAY):
             arcpy.Delete_management(outDSAY)
+        if arcpy.Exists(outPCT):
+            arcpy.Delete_management(outPCT)
 
-        #Make temp point layer with appropriate fields
+        #Write rasters tile by tile, grid cells without results are zero
         arcpy.AddMessage("Creating output for Scenario #:" + str(scen) + ", Name: " + scname )
-        arcpy.MakeTableView_management(usrTbl, "tmpTbl", "[Scenario_Id] = "+ str(scen))
-        if str(ischecked) == 'true':
-            arcpy.Statistics_analysis("tmpTbl", outTbl, "DSAY_Injury SUM; SAY_Injury MAX; ExpYear MAX; PERCENT_INJURY MAX", "Grid_ID") 
-        else:
-            arcpy.Statistics_analysis("tmpTbl", outTbl, "DSAY_Injury SUM; SAY_Injury MAX; ExpYear MAX", "Grid_ID") 
-        arcpy.MakeFeatureLayer_management(inPts, "SiteJoinView")
-        arcpy.AddJoin_management("SiteJoinView", "GRID_ID", outTbl, "GRID_ID", "KEEP_ALL")
-        arcpy.CopyFeatures_management("SiteJoinView", outPts)
-        arcpy.AddField_management(outPts, "DSAY_INJ", "DOUBLE", "", "", "", "", "NULLABLE", "NON_REQUIRED", "")
-        arcpy.AddField_management(outPts, "SAY_INJ", "DOUBLE", "", "", "", "", "NULLABLE", "NON_REQUIRED", "")
-        if str(ischecked) == 'true':
-	    arcpy.AddField_management(outPts, "PCT_INJ", "DOUBLE", "", "", "", "", "NULLABLE", "NON_REQUIRED", "")
-        arcpy.AddField_management(outPts, "MAX_YEAR", "DOUBLE", "", "", "", "", "NULLABLE", "NON_REQUIRED", "")
-
-        #Update DSAY values
-        rows = arcpy.UpdateCursor(outPts)
-        row = rows.next()
-        while row:
-            if row.sum_DSAY_Injury is not None:
-                row.DSAY_INJ = row.SUM_DSAY_Injury
-                row.SAY_INJ = row.MAX_SAY_Injury
-                if str(ischecked) == 'true':
-                    row.PCT_INJ = row.MAX_PERCENT_INJURY
-                row.MAX_YEAR = row.MAX_ExpYear
-            else:
-                row.DSAY_INJ = 0
-                row.SAY_INJ = 0
-                if str(ischecked) == 'true':
-                    row.PCT_INJ = 0
-            rows.updateRow(row)
-            row = rows.next()
-        del row
-        del rows
-        arcpy.DeleteField_management(outPts, "GRID_ID_1; FREQUENCY; SUM_DSAY_Injury; MAX_SAY_Injury; MAX_ExpYear")
-        if str(ischecked) == 'true':
-            arcpy.DeleteField_management(outPts, "MAX_PERCENT_INJURY")
-        arcpy.PointToRaster_conversion(outPts, "DSAY_INJ", outDSAY, "MAXIMUM", "", grdCellSize)
+        ARD_HEA_Grid.write_cell_raster(grid, dsayArrays[scen], outDSAY, spatialRef)
         if str(ischecked) == 'true':
-            arcpy.PointToRaster_conversion(outPts, "PCT_INJ", outPCT, "MAXIMUM", "", grdCellSize)
+            ARD_HEA_Grid.write_cell_raster(grid, pctArrays[scen], outPCT, spatialRef)
 
         #Import metadata template...
-	arcpy.AddMessage("importing metadata from " + xmlTemp + " to " + outDSAY)
+        arcpy.AddMessage("importing metadata from " + xmlTemp + " to " + outDSAY)
         arcpy.ImportMetadata_conversion(xmlTemp, "FROM_FGDC", outDSAY, "ENABLED")
         # arcpy.MetadataImporter_conversion(xmlTemp, outDSAY)
-        arcpy.Delete_management(outTbl)
-        arcpy.Delete_management(outPts)
+    ARD_HEA_Cost.record_timing(geoDB, "RESULTS", resRows, time.time() - start)
+    del dsayArrays
+    del pctArrays
 
 except noresults:
     arcpy.AddError("\n*** ERROR *** " + resTbl + ": Cannot find results table(s).  Make sure you have selected a valid HEA calculation database.\n")
@@ -4,20 +4,25 @@
 # Author: Research Planning, Inc.
 #
 # Usage: InterpolateContaminantSurfaceIDW <input_analysis_database> <filtered_contaminant_layer> <value_field>
-#   <boolean_log_transform> {cell_size} {power} {search_radius} {mask_layer} {barrier_lines}
+#   <log_transform> {cell_size} {power} {search_radius} {mask_layer} {barrier_lines} {write_raster} {processes}
 #
 # Required Arguments: 
 #   input_analysis_database - Name of analysis geodatabase
 #   filtered_contaminant_layer - Name of filtered contaminant layer to interpolate
 #   value_field - Value field to interpolate in contaminant layer
-#   boolean_log_transform - Boolean flag indicating if natural log of values is performed on contaminant values
+#   log_transform - Transform applied to contaminant values before interpolating and reversed afterwards:
+#                   true (natural log of 1000 x value), false, LOG10 or BOXCOX
 # 
 # Optional Arguments:
 #   {cell_size} - Size of each grid cell in resulting interpolated surface
 #   {power} - Control significance of surrounding points on the interpolated cell 
+#             ('#' uses the cross-validated IDW_POWER in COC_INVENTORY when there is one)
 #   {search_radius} - Defines which surrounding points will be used to control the raster
+#                     ('#' uses the cross-validated IDW_RADIUS in COC_INVENTORY when there is one)
 #   {mask_layer} - Polygonal mask for resulting surface
 #   {barrier_lines} - Polyline features to be used as a break or limit to searching
+#   {write_raster} - Boolean flag indicating if the surface is also saved as a raster (default true)
+#   {processes} - Number of worker processes used on large grids (default: number of CPUs)
 #
 # Description: Interpolates a surface from the filtered contaminant points using inverse
 #              distance wieghted technique.
@@ -34,6 +39,22 @@
 #                June 1, 2011       - Edited for Arc 10.0 functionality
 #                September 15, 2012 - Changed to utilize user supplied contaminant name, Additional bug fixes
 #                March 6, 2014      - Converted to arcpy V2.0
+#                October 16, 2026   - Surface is masked by the cached analysis grid cell mask, combined with the
+#                                     rasterized {mask_layer} when one is given
+#                October 17, 2026   - Surface is evaluated in process at the analysis grid cells by the ARD_HEA_Interp
+#                                     engine and loaded directly into COC_DATA, the raster is optional.  Idw_sa is
+#                                     still used with a cell size that differs from the analysis grid
+#                                   - Barrier lines are handled by the engine with an indexed visibility test
+#                                   - Log transform and back-transform are done on in-memory arrays with LOG10 and
+#                                     Box-Cox transforms available; temp_data, IDW_temp and Exp_IDW_temp are no
+#                                     longer written to the geodatabase
+#                                   - Large grids are interpolated in tiles by a process pool
+#                                   - Power and search radius default to the Cross Validate IDW results
+#                                   - Interpolation and COC_DATA load times are recorded in the project cache for
+#                                     the cost estimator
+#                                   - The settings and transformed samples of the surface are kept with its cell array,
+#                                     so Create Analysis Grid can evaluate cells added to the grid; an Idw_sa surface
+#                                     clears them
 #
 # ---------------------------------------------------------------------------
 
@@ -48,11 +69,16 @@ class lognegative(Exception):
 
 # Import system modules
 import ARD_HEA_Tools
+import ARD_HEA_Cost
+import ARD_HEA_Grid
+import ARD_HEA_Interp
 import sys
 import string
 import os
 import traceback
+import time
 import math
+import numpy
 import arcpy
 from arcpy import env
 
@@ -80,6 +106,14 @@ try:
     IDWRadius = sys.argv[7]
     IDWMask = sys.argv[8]
     IDWBarrier = sys.argv[9]
+    if len(sys.argv) > 10:
+        IDWWriteRaster = sys.argv[10]
+    else:
+        IDWWriteRaster = 'true'
+    if len(sys.argv) > 11:
+        IDWProcesses = ARD_HEA_Tools.process_count(sys.argv[11])
+    else:
+        IDWProcesses = ARD_HEA_Tools.process_count('#')
 
     # Local variables...
     desc = arcpy.Describe(COCLayer)
@@ -89,11 +123,13 @@ try:
         COCLayerBase = COCLayer.split(os.sep)[-1]
     else:
         COCLayerBase = desc.Basename
-    IDWOut = geoDB + "\\IDW_temp"
-    ExpOut = geoDB + "\\Exp_IDW_temp"
+    IDWOut = "in_memory\\IDW_temp"
+    samplesOut = "in_memory\\IDW_samples"
+    transform = ARD_HEA_Interp.transform_method(PerfLog)
     IDWLayer = "IDW_" + COCLayerBase
     AnalysisGrid = geoDB + "\\ANALYSIS_GRID"
     COCInvent = geoDB + "\\COC_INVENTORY"
+    COCTable = geoDB + "\\COC_DATA"
     COCLocation = desc.CatalogPath
     COCFieldString = arcpy.AddFieldDelimiters( COCLocation, COCField)
     chkString1 = COCFieldString + " <= 0"
@@ -103,7 +139,6 @@ try:
     # Set the geoprocessing environment...
     env.overwriteOutput = 1
     env.snapRaster = geoDB + "\\ANALYSIS_GRID"
-    env.mask = IDWMask
     desc = arcpy.Describe(geoDB + "\\ANALYSIS_GRID")
     env.extent = desc.Extent
 
@@ -111,11 +146,28 @@ try:
     if not arcpy.Exists(AnalysisGrid):
         raise nogrid
 
+    # Process: Restrict the surface to grid cells inside the analysis and interpolation masks...
+    grid = ARD_HEA_Grid.load_grid(geoDB)
+    gridMask = None
+    maskFeatures = None
+    if IDWMask <> '#' and IDWMask != "":
+        maskFeatures = ARD_HEA_Grid.polygon_edges(IDWMask, desc.SpatialReference)
+        gridMask = numpy.asarray(grid["grid_id"]) > 0
+        gridMask &= ARD_HEA_Grid.mask_cells(geoDB, grid, maskFeatures)
+
+    # Process: Use the in-process engine unless a different cell size needs Idw_sa...
+    useEngine = IDWCellSize == '#' or IDWCellSize == "" or abs(float(IDWCellSize) - grid["cellsize"]) < 1e-9 * grid["cellsize"]
+    if not useEngine:
+        if gridMask is not None:
+            env.mask = ARD_HEA_Grid.write_mask_raster(grid, gridMask, "in_memory\\IDW_mask", None)
+        else:
+            env.mask = AnalysisGrid
+
     # Process: Check for valid values used for non-detect limits...
     arcpy.MakeFeatureLayer_management(COCLayer, "templyr", str(chkString1))
     result = arcpy.GetCount_management("templyr")
     if int(str(result)) > 0:
-        if PerfLog == "true":
+        if transform != "":
             raise lognegative
         else:
             arcpy.AddMessage("\n*** WARNING ***\nAnalysis with negative non-detect limits may produce unexpected results\n")
@@ -125,9 +177,17 @@ try:
     rows = arcpy.UpdateCursor(COCInvent, "[FILTER_LAYER_NAME] = '" + COCLayerBase + "'")
     row = rows.next()
     if row:
+        COCName = row.COC_NAME
+        fieldNames = [fld.name for fld in arcpy.ListFields(COCInvent)]
+        if (IDWPower == '#' or IDWPower == "") and "IDW_POWER" in fieldNames and row.IDW_POWER is not None:
+            IDWPower = str(row.IDW_POWER)
+            arcpy.AddMessage("Using cross-validated power " + IDWPower)
+        if (IDWRadius == '#' or IDWRadius == "") and "IDW_RADIUS" in fieldNames and row.IDW_RADIUS:
+            IDWRadius = row.IDW_RADIUS
+            arcpy.AddMessage("Using cross-validated search radius " + IDWRadius)
         row.INTERP_LAYER_NAME = IDWLayer
         row.INTERP_TYPE = "IDW"
-        row.LOG_TRANSFORM = PerfLog
+        row.LOG_TRANSFORM = ARD_HEA_Interp.transform_code(transform)
         rows.updateRow(row)
     else:
         raise filtered
@@ -140,45 +200,58 @@ try:
     if arcpy.Exists(geoDB + "\\IDW_" + COCLayerBase):
         arcpy.Delete_management(geoDB + "\\IDW_" + COCLayerBase)
 
-    # Process: Check and log transform values if necessary...
-    if PerfLog == "true":
-        arcpy.AddMessage("Performing log transformation of contaminant values...")
-        arcpy.CopyFeatures_management(COCLayer, geoDB + "\\temp_data")
-        arcpy.MakeFeatureLayer_management(geoDB + "\\temp_data", "templyr")
-        qryExpr = "[" + COCField + "] < 0.001"
-        arcpy.SelectLayerByAttribute_management("templyr", "NEW_SELECTION", qryExpr)
-        arcpy.CalculateField_management("templyr", COCField, "0", "PYTHON")
-        arcpy.SelectLayerByAttribute_management("templyr", "SWITCH_SELECTION")
-        lnExpr = "math.log((!" + COCField + "! * 1000))"
-        arcpy.CalculateField_management("templyr", COCField, lnExpr, "PYTHON")       
-        arcpy.Delete_management("templyr")
-        arcpy.AddMessage("Interpolating values...")
-        arcpy.Idw_sa(geoDB + "\\temp_data", COCField, IDWOut, IDWCellSize, IDWPower, IDWRadius, IDWBarrier)
-	arcpy.Exp_sa(IDWOut, ExpOut)
-	MARaster = arcpy.Raster(ExpOut) / 1000
-	MARaster.save(outRaster)
-        
+    # Process: Read samples and transform values if necessary...
+    sampleX, sampleY, sampleValues = ARD_HEA_Interp.read_samples(COCLayer, COCField, desc.SpatialReference)
+    transformParam = None
+    if transform != "":
+        arcpy.AddMessage("Performing " + transform + " transformation of contaminant values...")
+        sampleValues, transformParam = ARD_HEA_Interp.forward_transform(sampleValues, transform)
+        if transformParam is not None:
+            arcpy.AddMessage("  Box-Cox lambda: " + str(transformParam))
+
+    # Process: Interpolate at the analysis grid cells and load the values into COC_DATA...
+    if useEngine:
+        arcpy.AddMessage("Interpolating values at analysis grid cells...")
+        start = time.time()
+        barrierSegments = None
+        if IDWBarrier <> '#' and IDWBarrier != "":
+            barrierSegments = ARD_HEA_Interp.read_segments(IDWBarrier, desc.SpatialReference)
+            arcpy.AddMessage("  " + str(len(barrierSegments)) + " barrier segments")
+        cellValues = ARD_HEA_Grid.cell_array(geoDB, "SURFACES", IDWLayer, grid)
+        ARD_HEA_Interp.idw_cells(grid, sampleX, sampleY, sampleValues, cellValues, IDWPower, IDWRadius, gridMask, barrierSegments, IDWProcesses)
+        ARD_HEA_Interp.save_settings(geoDB, IDWLayer, {"method": "IDW", "transform": transform, "param": transformParam,
+                                                       "power": IDWPower, "radius": IDWRadius},
+                                     sampleX, sampleY, sampleValues, barrierSegments, maskFeatures)
+        if transform != "":
+            cellValues[:] = ARD_HEA_Interp.back_transform(numpy.asarray(cellValues), transform, transformParam)
+        ARD_HEA_Cost.record_timing(geoDB, "INTERPOLATION", ARD_HEA_Grid.cell_count(grid), time.time() - start, "IDW")
+        arcpy.AddMessage("Updating COC value table with " + COCName + " data...")
+        loaded, seconds = ARD_HEA_Grid.write_coc_data(grid, cellValues, COCTable, COCName)
+        ARD_HEA_Tools.rateout(loaded, seconds, "contaminant records loaded")
+        ARD_HEA_Cost.record_timing(geoDB, "COC_DATA", ARD_HEA_Grid.cell_count(grid), seconds)
+        ARD_HEA_Grid.coc_data_warning(geoDB)
+        if IDWWriteRaster != 'false':
+            ARD_HEA_Grid.write_surface_raster(geoDB, grid, cellValues, outRaster, desc.SpatialReference)
+        del cellValues
+
+    # Process: Interpolate a raster at a different cell size with Idw_sa from in-memory samples...
     else:
         arcpy.AddMessage("Interpolating values...")
-        arcpy.CopyFeatures_management(COCLayer, geoDB + "\\temp_data")
-        arcpy.Idw_sa(geoDB + "\\temp_data", COCField, IDWOut, IDWCellSize, IDWPower, IDWRadius, IDWBarrier)
-	MARaster = arcpy.Raster(IDWOut) * 1
-	MARaster.save(outRaster)
-        
+        ARD_HEA_Grid.clear_surface(geoDB, IDWLayer)
+        ARD_HEA_Interp.samples_feature_class(sampleX, sampleY, sampleValues, samplesOut, desc.SpatialReference)
+        arcpy.Idw_sa(samplesOut, "VALUE", IDWOut, IDWCellSize, IDWPower, IDWRadius, IDWBarrier)
+        ARD_HEA_Interp.back_transform_raster(IDWOut, outRaster, transform, transformParam, desc.SpatialReference)
+        arcpy.Delete_management(samplesOut)
+        arcpy.Delete_management(IDWOut)
+
     # Process: Capture geoprocessing history...
-    history = ARD_HEA_Tools.get_process_history(currDir, geoDB + "\\temp_data")
-    if history is not None and history != "": 
-        history = history + ARD_HEA_Tools.get_process_history(currDir, IDWOut)
-    
-    # Process: Cleanup...    
-    arcpy.Delete_management(geoDB + "\\temp_data")
-    arcpy.Delete_management(IDWOut)
-    arcpy.Delete_management(ExpOut)
-        
-    #Import metadata template
-    arcpy.AddMessage("Updating metadata...")
-    arcpy.ImportMetadata_conversion(xmlTemp, "FROM_FGDC", outRaster)
-    # arcpy.MetadataImporter_conversion(xmlTemp, outRaster)
+    history = ARD_HEA_Tools.get_process_history(currDir, COCLocation)
+
+    if arcpy.Exists(outRaster):
+        #Import metadata template
+        arcpy.AddMessage("Updating metadata...")
+        arcpy.ImportMetadata_conversion(xmlTemp, "FROM_FGDC", outRaster)
+        # arcpy.MetadataImporter_conversion(xmlTemp, outRaster)
 
 
     #Record process step in COC Table
@@ -190,10 +263,12 @@ try:
         del row
         del rows
         # Set ouptut geoprocessing history
-        ARD_HEA_Tools.set_process_history (currDir, outRaster, history )
+        if arcpy.Exists(outRaster):
+            ARD_HEA_Tools.set_process_history (currDir, outRaster, history )
 
     # Process: Make Feature Layer
-    arcpy.MakeRasterLayer_management(outRaster, IDWLayer, "", "", "")  
+    if arcpy.Exists(outRaster):
+        arcpy.MakeRasterLayer_management(outRaster, IDWLayer, "", "", "")  
 
     # Process: Compact database
     arcpy.Compact_management(geoDB)
@@ -0,0 +1,303 @@
+# ---------------------------------------------------------------------------
+# NAME: InterpolateContaminantSurfaceKriging.py
+# Version: 2.0 (ArcGIS 10.2)
+# Author: Research Planning, Inc.
+#
+# Usage: InterpolateContaminantSurfaceKriging <input_analysis_database> <filtered_contaminant_layer> <value_field>
+#   <log_transform> {variogram_model} {search_radius} {lag_size} {lag_count} {mask_layer} {write_raster} {processes}
+#
+# Required Arguments:
+#   input_analysis_database - Name of analysis geodatabase
+#   filtered_contaminant_layer - Name of filtered contaminant layer to interpolate
+#   value_field - Value field to interpolate in contaminant layer
+#   log_transform - Transform applied to contaminant values before interpolating and reversed afterwards:
+#                   true (natural log of 1000 x value), false or LOG10; BOXCOX is not supported
+#
+# Optional Arguments:
+#   {variogram_model} - SPHERICAL (default), EXPONENTIAL or GAUSSIAN
+#   {search_radius} - Samples used for each cell: "VARIABLE {points} {max_distance}" (default VARIABLE 16)
+#                     or "FIXED {distance} {min_points}"
+#   {lag_size} - Width of the empirical semivariogram distance bins (default: half the diagonal of the
+#                sample extent divided by the lag count)
+#   {lag_count} - Number of empirical semivariogram distance bins (default 12)
+#   {mask_layer} - Polygonal mask for resulting surface
+#   {write_raster} - Boolean flag indicating if the surfaces are also saved as rasters (default true)
+#   {processes} - Number of worker processes used on large grids (default: number of CPUs)
+#
+# Description: Interpolates a surface from the filtered contaminant points using ordinary
+#              kriging with a semivariogram model fitted to the samples, and writes the
+#              kriging variance as a second surface.
+#
+# Notes:  Currently the tool is designed to only be run via the ARD HEA Toolbox.
+#         Surfaces are evaluated in process at the analysis grid cells by the ARD_HEA_Interp
+#         engine; the prediction is loaded into COC_DATA and the KRG_<layer> raster, the
+#         kriging variance into the KRGV_<layer> raster.  With a log transform the prediction
+#         is back-transformed with the lognormal bias correction exp(Z + variance / 2 - mu),
+#         mu being the Lagrange multiplier of the kriging system, so it estimates the mean
+#         rather than the median; KRGV then holds the variance of the transformed values, in
+#         squared log units (natural log of 1000 x value, or log10 for LOG10).
+#         Kriging and COC_DATA load times are recorded for the cost estimator.
+#         No Spatial Analyst license is needed.
+#         The variogram, search radius and transformed samples are kept with the cell arrays,
+#         so Create Analysis Grid can evaluate cells added to the grid.
+#
+# Date Created: October 17, 2026
+#
+# ---------------------------------------------------------------------------
+
+class nogrid(Exception):
+    pass
+
+class filtered(Exception):
+    pass
+
+class lognegative(Exception):
+    pass
+
+class toofew(Exception):
+    pass
+
+class badtransform(Exception):
+    pass
+
+# Import system modules
+import ARD_HEA_Tools
+import ARD_HEA_Cost
+import ARD_HEA_Grid
+import ARD_HEA_Interp
+import sys
+import string
+import os
+import traceback
+import time
+import numpy
+import arcpy
+from arcpy import env
+
+try:
+    # Report version...
+    ver = ARD_HEA_Tools.version()
+    arcpy.AddMessage("ARD HEA Tools Version: " + ver)
+
+    # Script arguments...
+    geoDB = sys.argv[1]
+    COCLayer = sys.argv[2]
+    COCField = sys.argv[3]
+    PerfLog = sys.argv[4]
+    if len(sys.argv) > 5 and sys.argv[5] not in ('#', ''):
+        KRGModel = sys.argv[5].upper()
+    else:
+        KRGModel = "SPHERICAL"
+    KRGRadius = sys.argv[6] if len(sys.argv) > 6 else '#'
+    if len(sys.argv) > 7 and sys.argv[7] not in ('#', ''):
+        KRGLagSize = float(sys.argv[7])
+    else:
+        KRGLagSize = None
+    if len(sys.argv) > 8 and sys.argv[8] not in ('#', ''):
+        KRGLagCount = int(sys.argv[8])
+    else:
+        KRGLagCount = 12
+    KRGMask = sys.argv[9] if len(sys.argv) > 9 else '#'
+    if len(sys.argv) > 10:
+        KRGWriteRaster = sys.argv[10]
+    else:
+        KRGWriteRaster = 'true'
+    if len(sys.argv) > 11:
+        KRGProcesses = ARD_HEA_Tools.process_count(sys.argv[11])
+    else:
+        KRGProcesses = ARD_HEA_Tools.process_count('#')
+
+    # Local variables...
+    desc = arcpy.Describe(COCLayer)
+    scriptPath = sys.path[0]
+    xmlTemp = scriptPath + "\\interpolation_metadata_template.xml"
+    if desc.DataType == "FeatureLayer":
+        COCLayerBase = COCLayer.split(os.sep)[-1]
+    else:
+        COCLayerBase = desc.Basename
+    transform = ARD_HEA_Interp.transform_method(PerfLog)
+    if transform == "BOXCX":
+        raise badtransform
+    KRGLayer = "KRG_" + COCLayerBase
+    KRGVLayer = "KRGV_" + COCLayerBase
+    AnalysisGrid = geoDB + "\\ANALYSIS_GRID"
+    COCInvent = geoDB + "\\COC_INVENTORY"
+    COCTable = geoDB + "\\COC_DATA"
+    COCLocation = desc.CatalogPath
+    COCFieldString = arcpy.AddFieldDelimiters( COCLocation, COCField)
+    chkString1 = COCFieldString + " <= 0"
+    outRaster = geoDB + "\\" + KRGLayer
+    outVarRaster = geoDB + "\\" + KRGVLayer
+    currDir = os.path.dirname(geoDB)
+
+    # Set the geoprocessing environment...
+    env.overwriteOutput = 1
+
+    # Process: Check for analysis grid...
+    if not arcpy.Exists(AnalysisGrid):
+        raise nogrid
+    desc = arcpy.Describe(AnalysisGrid)
+
+    # Process: Restrict the surface to grid cells inside the analysis and interpolation masks...
+    grid = ARD_HEA_Grid.load_grid(geoDB)
+    gridMask = None
+    maskFeatures = None
+    if KRGMask <> '#' and KRGMask != "":
+        maskFeatures = ARD_HEA_Grid.polygon_edges(KRGMask, desc.SpatialReference)
+        gridMask = numpy.asarray(grid["grid_id"]) > 0
+        gridMask &= ARD_HEA_Grid.mask_cells(geoDB, grid, maskFeatures)
+
+    # Process: Check for valid values used for non-detect limits...
+    arcpy.MakeFeatureLayer_management(COCLayer, "templyr", str(chkString1))
+    result = arcpy.GetCount_management("templyr")
+    if int(str(result)) > 0:
+        if transform != "":
+            raise lognegative
+        else:
+            arcpy.AddMessage("\n*** WARNING ***\nAnalysis with negative non-detect limits may produce unexpected results\n")
+    arcpy.Delete_management("templyr")
+
+    # Process: Update contaminant inventory table and check for filtered...
+    rows = arcpy.UpdateCursor(COCInvent, "[FILTER_LAYER_NAME] = '" + COCLayerBase + "'")
+    row = rows.next()
+    if row:
+        COCName = row.COC_NAME
+        row.INTERP_LAYER_NAME = KRGLayer
+        row.INTERP_TYPE = "KRG"
+        row.LOG_TRANSFORM = ARD_HEA_Interp.transform_code(transform)
+        rows.updateRow(row)
+    else:
+        raise filtered
+    del row
+    del rows
+
+    # Process: Remove any previous interpolated surfaces...
+    for layer in (KRGLayer, KRGVLayer):
+        if arcpy.Exists(layer):
+            arcpy.Delete_management(layer)
+        if arcpy.Exists(geoDB + "\\" + layer):
+            arcpy.Delete_management(geoDB + "\\" + layer)
+
+    # Process: Read samples and transform values if necessary...
+    sampleX, sampleY, sampleValues = ARD_HEA_Interp.read_samples(COCLayer, COCField, desc.SpatialReference)
+    if len(sampleValues) < 3:
+        raise toofew
+    transformParam = None
+    if transform != "":
+        arcpy.AddMessage("Performing " + transform + " transformation of contaminant values...")
+        sampleValues, transformParam = ARD_HEA_Interp.forward_transform(sampleValues, transform)
+
+    # Process: Fit the semivariogram model...
+    arcpy.AddMessage("Fitting " + KRGModel.lower() + " semivariogram model...")
+    lagDistance, lagGamma, lagPairs = ARD_HEA_Interp.empirical_variogram(sampleX, sampleY, sampleValues, KRGLagSize, KRGLagCount)
+    vario = ARD_HEA_Interp.fit_variogram(lagDistance, lagGamma, lagPairs, KRGModel)
+    arcpy.AddMessage("  Nugget: " + "%.6g" % vario["nugget"] + "  Partial sill: " + "%.6g" % vario["sill"] +
+                     "  Range: " + "%.6g" % vario["range"])
+
+    # Process: Krige at the analysis grid cells and load the values into COC_DATA...
+    arcpy.AddMessage("Kriging values at analysis grid cells...")
+    start = time.time()
+    cellValues = ARD_HEA_Grid.cell_array(geoDB, "SURFACES", KRGLayer, grid)
+    cellVariances = ARD_HEA_Grid.cell_array(geoDB, "SURFACES", KRGVLayer, grid)
+    ARD_HEA_Interp.krige_cells(grid, sampleX, sampleY, sampleValues, cellValues, cellVariances, vario, KRGRadius, gridMask,
+                               KRGProcesses, transform)
+    ARD_HEA_Interp.save_settings(geoDB, KRGLayer, {"method": "KRG", "transform": transform, "param": transformParam,
+                                                   "vario": vario, "radius": KRGRadius, "variance": KRGVLayer},
+                                 sampleX, sampleY, sampleValues, None, maskFeatures)
+    arcpy.AddMessage("  Kriged in " + "%.1f" % (time.time() - start) + " s")
+    if transform != "":
+        arcpy.AddMessage("  Predictions back-transformed with the lognormal bias correction; " + KRGVLayer +
+                         " holds the variance in squared " + ("log10" if transform == "LOG10" else "natural log") + " units")
+        cellValues[:] = ARD_HEA_Interp.back_transform(numpy.asarray(cellValues), transform, transformParam)
+    ARD_HEA_Cost.record_timing(geoDB, "INTERPOLATION", ARD_HEA_Grid.cell_count(grid), time.time() - start, "KRG")
+    arcpy.AddMessage("Updating COC value table with " + COCName + " data...")
+    loaded, seconds = ARD_HEA_Grid.write_coc_data(grid, cellValues, COCTable, COCName)
+    ARD_HEA_Tools.rateout(loaded, seconds, "contaminant records loaded")
+    ARD_HEA_Cost.record_timing(geoDB, "COC_DATA", ARD_HEA_Grid.cell_count(grid), seconds)
+    ARD_HEA_Grid.coc_data_warning(geoDB)
+    if KRGWriteRaster != 'false':
+        ARD_HEA_Grid.write_surface_raster(geoDB, grid, cellValues, outRaster, desc.SpatialReference)
+        ARD_HEA_Grid.write_surface_raster(geoDB, grid, cellVariances, outVarRaster, desc.SpatialReference)
+    del cellValues
+    del cellVariances
+
+    # Process: Capture geoprocessing history...
+    history = ARD_HEA_Tools.get_process_history(currDir, COCLocation)
+
+    if arcpy.Exists(outRaster):
+        #Import metadata template
+        arcpy.AddMessage("Updating metadata...")
+        arcpy.ImportMetadata_conversion(xmlTemp, "FROM_FGDC", outRaster)
+
+    #Record process step in COC Table
+    if history  is not None and history  != "":
+        rows = arcpy.UpdateCursor(COCInvent, "[FILTER_LAYER_NAME] = '" + COCLayerBase + "'")
+        row = rows.next()
+        row.COC_XML = history
+        rows.updateRow(row)
+        del row
+        del rows
+        # Set ouptut geoprocessing history
+        if arcpy.Exists(outRaster):
+            ARD_HEA_Tools.set_process_history (currDir, outRaster, history )
+
+    # Process: Make Raster Layers
+    if arcpy.Exists(outRaster):
+        arcpy.MakeRasterLayer_management(outRaster, KRGLayer, "", "", "")
+    if arcpy.Exists(outVarRaster):
+        arcpy.MakeRasterLayer_management(outVarRaster, KRGVLayer, "", "", "")
+
+    # Process: Compact database
+    arcpy.Compact_management(geoDB)
+
+except nogrid:
+    arcpy.AddError("\n*** ERROR ***\nCannot interpolate without defined analysis grid.  Create analysis grid.\n")
+    print "\n*** ERROR ***\nCannot interpolate without defined analysis grid.  Create analysis grid.\n"
+
+except filtered:
+    arcpy.AddError("\n*** ERROR ***\nInterpolation must be run on filtered contaminant layers\n")
+    print "Interpolation must be run on filtered contaminant layers"
+
+except lognegative:
+    arcpy.AddError("\n*** ERROR ***\nCannot perform log transformation on contaminant layer with negative values\n")
+    print "\n*** ERROR ***\nCannot perform log transformation on contaminant layer with negative values\n"
+
+except badtransform:
+    arcpy.AddError("\n*** ERROR ***\nKriging supports natural log and LOG10 transforms only, not Box-Cox\n")
+    print "\n*** ERROR ***\nKriging supports natural log and LOG10 transforms only, not Box-Cox\n"
+
+except toofew:
+    arcpy.AddError("\n*** ERROR ***\nKriging needs at least 3 samples\n")
+    print "\n*** ERROR ***\nKriging needs at least 3 samples\n"
+
+except arcpy.ExecuteError:
+    # Get the tool error messages
+    msgs = arcpy.GetMessage(0)
+    msgs += arcpy.GetMessages(2)
+
+    # Return tool error messages for use with a script tool
+    arcpy.AddError(msgs)
+
+    # Print tool error messages for use in Python/PythonWin
+    print msgs
+
+except:
+    # Get the traceback object
+    #
+    tb = sys.exc_info()[2]
+    tbinfo = traceback.format_tb(tb)[0]
+
+    # Concatenate information together concerning the error into a message string
+    #
+    pymsg = "PYTHON ERRORS:\nTraceback info:\n" + tbinfo + "\nError Info:\n" + str(sys.exc_info()[1])
+    msgs = "ArcPy ERRORS:\n" + arcpy.GetMessages(2) + "\n"
+
+    # Return python error messages for use in script tool or Python Window
+    #
+    arcpy.AddError(pymsg)
+    arcpy.AddError(msgs)
+
+    # Print Python error messages for use in Python / Python Window
+    #
+    print pymsg + "\n"
+    print msgs
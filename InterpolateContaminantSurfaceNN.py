@@ -4,17 +4,21 @@
 # Author: Research Planning, Inc.
 #
 # Usage: InterpolateContaminantSurfaceNN <input_analysis_database> <filtered_contaminant_layer> <value_field>
-#   <boolean_log_transform> {cell_size} {mask_layer}
+#   <log_transform> {cell_size} {mask_layer} {write_raster} {processes} {rebuild_surface}
 #
 # Required Arguments: 
 #   input_analysis_database - Name of analysis geodatabase
 #   filtered_contaminant_layer - Name of filtered contaminant layer to interpolate
 #   value_field - Value field to interpolate in contaminant layer
-#   boolean_log_transform - Boolean flag indicating if natural log of values is performed on contaminant values
+#   log_transform - Transform applied to contaminant values before interpolating and reversed afterwards:
+#                   true (natural log of 1000 x value), false, LOG10 or BOXCOX
 # 
 # Optional Arguments:
 #   {cell_size} - Size of each grid cell in resulting interpolated surface
 #   {mask_layer} - Polygonal mask for resulting surface
+#   {write_raster} - Boolean flag indicating if the surface is also saved as a raster (default true)
+#   {processes} - Number of worker processes used on large grids (default: number of CPUs)
+#   {rebuild_surface} - Boolean flag forcing the whole surface to be interpolated again (default false)
 #
 # Description: Interpolates a surface from the filtered contaminant points using
 #              the natural neighbor technique.
@@ -28,6 +32,24 @@
 #                June 1, 2011       - Edited for Arc 10.0 functionality
 #                September 15, 2012 - Additional bug fixes
 #                March 7, 2014      - Converted to arcpy V2.0
+#                October 17, 2026   - Log transform and back-transform are done on in-memory arrays with LOG10 and
+#                                     Box-Cox transforms available; temp_data, NN_temp, Exp_NN_temp and NN_mask_temp
+#                                     are no longer written to the geodatabase.  Surface is masked by the analysis
+#                                     grid whether or not values are transformed
+#                                   - Surface is evaluated in process at the analysis grid cells by the ARD_HEA_Interp
+#                                     Sibson natural neighbor engine and loaded directly into COC_DATA, the raster is
+#                                     optional and no Spatial Analyst license is needed.  NaturalNeighbor_sa is still
+#                                     used with a cell size that differs from the analysis grid.  {mask_layer} is
+#                                     applied on both paths
+#                                   - The triangulation is kept in the project cache; when a new sampling round
+#                                     only adds stations or changes values, they are inserted into it and only the
+#                                     cells whose natural neighbors changed are evaluated and updated in COC_DATA
+#                                   - Interpolation and COC_DATA load times are recorded in the project cache for
+#                                     the cost estimator
+#                                   - The settings and transformed samples of the surface are kept with its cell array,
+#                                     so Create Analysis Grid can evaluate cells added to the grid
+#                                   - The triangulation is only reused with the cell array it was saved with, checked by
+#                                     checksum; a NaturalNeighbor_sa surface removes both
 #
 # ---------------------------------------------------------------------------
 
@@ -42,16 +64,18 @@ class lognegative(Exception):
 
 # Import system modules
 import ARD_HEA_Tools
+import ARD_HEA_Cost
+import ARD_HEA_Grid
+import ARD_HEA_Interp
 import sys
 import string
 import os
 import traceback
+import time
+import numpy
 import arcpy
 from arcpy import env
 
-# Check out any necessary licenses
-arcpy.CheckOutExtension("spatial")
-
 # Load required toolboxes...
 sub_folder = "ArcToolbox/Toolboxes/"
 install_dir = arcpy.GetInstallInfo("desktop")['InstallDir'].replace("\\","/")
@@ -69,6 +93,22 @@ try:
     COCField = sys.argv[3]
     PerfLog = sys.argv[4]
     NNCellSize = sys.argv[5]
+    if len(sys.argv) > 6:
+        NNMask = sys.argv[6]
+    else:
+        NNMask = '#'
+    if len(sys.argv) > 7:
+        NNWriteRaster = sys.argv[7]
+    else:
+        NNWriteRaster = 'true'
+    if len(sys.argv) > 8:
+        NNProcesses = ARD_HEA_Tools.process_count(sys.argv[8])
+    else:
+        NNProcesses = ARD_HEA_Tools.process_count('#')
+    if len(sys.argv) > 9:
+        NNRebuild = sys.argv[9]
+    else:
+        NNRebuild = 'false'
 
     # Local variables...
     desc = arcpy.Describe(COCLayer)
@@ -78,12 +118,13 @@ try:
         COCLayerBase = COCLayer.split(os.sep)[-1]
     else:
         COCLayerBase = desc.Basename
-    NNOut = geoDB + "\\NN_temp"
-    ExpOut = geoDB + "\\Exp_NN_temp"
-    maskOut = geoDB + "\\NN_mask_temp"
+    NNOut = "in_memory\\NN_temp"
+    samplesOut = "in_memory\\NN_samples"
+    transform = ARD_HEA_Interp.transform_method(PerfLog)
     NNLayer = "NN_" + COCLayerBase
     AnalysisGrid = geoDB + "\\ANALYSIS_GRID"
     COCInvent = geoDB + "\\COC_INVENTORY"
+    COCTable = geoDB + "\\COC_DATA"
     COCLocation = desc.CatalogPath
     COCFieldString = arcpy.AddFieldDelimiters(COCLocation, COCField)
     chkString1 = COCFieldString + " <= 0"
@@ -100,11 +141,29 @@ try:
     if not arcpy.Exists(AnalysisGrid):
         raise nogrid
 
+    # Process: Restrict the surface to grid cells inside the analysis and interpolation masks...
+    grid = ARD_HEA_Grid.load_grid(geoDB)
+    gridMask = None
+    maskFeatures = None
+    if NNMask <> '#' and NNMask != "":
+        maskFeatures = ARD_HEA_Grid.polygon_edges(NNMask, desc.SpatialReference)
+        gridMask = numpy.asarray(grid["grid_id"]) > 0
+        gridMask &= ARD_HEA_Grid.mask_cells(geoDB, grid, maskFeatures)
+
+    # Process: Use the in-process engine unless a different cell size needs NaturalNeighbor_sa...
+    useEngine = NNCellSize == '#' or NNCellSize == "" or abs(float(NNCellSize) - grid["cellsize"]) < 1e-9 * grid["cellsize"]
+    if not useEngine:
+        arcpy.CheckOutExtension("spatial")
+        if gridMask is not None:
+            env.mask = ARD_HEA_Grid.write_mask_raster(grid, gridMask, "in_memory\\NN_mask", None)
+        else:
+            env.mask = AnalysisGrid
+
     # Process: Check for valid values used for non-detect limits...
     arcpy.MakeFeatureLayer_management(COCLayer, "templyr", str(chkString1))
     result = arcpy.GetCount_management("templyr")
     if int(str(result)) > 0:
-        if PerfLog == "true":
+        if transform != "":
             raise lognegative
         else:
             arcpy.AddMessage("\n*** WARNING ***\nAnalysis with negative non-detect limits may produce unexpected results\n")
@@ -114,9 +173,12 @@ try:
     rows = arcpy.UpdateCursor(COCInvent, "[FILTER_LAYER_NAME] = '" + COCLayerBase + "'")
     row = rows.next()
     if row:
+        COCName = row.COC_NAME
+        # COC_DATA only holds the previous natural neighbor surface when it was the last one loaded
+        previousNN = row.INTERP_TYPE == "NN" and row.INTERP_LAYER_NAME == NNLayer
         row.INTERP_LAYER_NAME = NNLayer
         row.INTERP_TYPE = "NN"
-        row.LOG_TRANSFORM = PerfLog
+        row.LOG_TRANSFORM = ARD_HEA_Interp.transform_code(transform)
         rows.updateRow(row)
     else:
         raise filtered
@@ -129,52 +191,78 @@ try:
     if arcpy.Exists(geoDB + "\\NN_" + COCLayerBase):
         arcpy.Delete_management(geoDB + "\\NN_" + COCLayerBase)
 
-    # Process: Check and log transform values if necessary...
-    if PerfLog == "true":
-        arcpy.AddMessage("Performing log transformation of contaminant values...")
-        arcpy.CopyFeatures_management(COCLayer, geoDB + "\\temp_data")
-        arcpy.MakeFeatureLayer_management(geoDB + "\\temp_data", "templyr")
-        qryExpr = "[" + COCField + "] < 0.001"
-        arcpy.SelectLayerByAttribute_management("templyr", "NEW_SELECTION", qryExpr)
-        arcpy.CalculateField_management("templyr", COCField, "0", "PYTHON")
-        arcpy.SelectLayerByAttribute_management("templyr", "SWITCH_SELECTION")
-        lnExpr = "math.log((!" + COCField + "! * 1000))"
-        arcpy.CalculateField_management("templyr", COCField, lnExpr, "PYTHON")
-        arcpy.Delete_management("templyr")
-        arcpy.AddMessage("Interpolating values...")
-        arcpy.NaturalNeighbor_sa(geoDB + "\\temp_data", COCField, NNOut, NNCellSize)        
-        # arcpy.Times_sa(NNOut, AnalysisGrid, maskOut)
-	# arcpy.Exp_sa(maskOut, ExpOut)
-	arcpy.Exp_sa(NNOut, ExpOut)
-	MARaster = arcpy.Raster(ExpOut) / 1000
-	MARaster.save(outRaster)
+    # Process: Read samples and transform values if necessary...
+    sampleX, sampleY, sampleValues = ARD_HEA_Interp.read_samples(COCLayer, COCField, desc.SpatialReference)
+    transformParam = None
+    if transform != "":
+        arcpy.AddMessage("Performing " + transform + " transformation of contaminant values...")
+        sampleValues, transformParam = ARD_HEA_Interp.forward_transform(sampleValues, transform)
+        if transformParam is not None:
+            arcpy.AddMessage("  Box-Cox lambda: " + str(transformParam))
+
+    # Process: Interpolate at the analysis grid cells and load the values into COC_DATA...
+    if useEngine:
+        meta = ARD_HEA_Interp.tin_meta(grid, gridMask, transform, transformParam)
+        tin = None
+        cellValues = None
+        changedIds = None
+        if NNRebuild != 'true' and previousNN:
+            # The stored triangulation is only used with the cell array it was saved with
+            cellValues = ARD_HEA_Grid.open_cell_array(geoDB, "SURFACES", NNLayer, grid)
+            if cellValues is not None:
+                tin = ARD_HEA_Interp.tin_load(geoDB, NNLayer, dict(meta, values=ARD_HEA_Grid.array_checksum(cellValues)))
+        if tin is not None and cellValues is not None:
+            arcpy.AddMessage("Updating the stored triangulation with new and changed stations...")
+            changedIds = ARD_HEA_Interp.nn_update(grid, tin, sampleX, sampleY, sampleValues, cellValues, gridMask,
+                                                  transform, transformParam)
+            if changedIds is None:
+                arcpy.AddMessage("  Stations were removed, interpolating the whole surface")
+        if changedIds is not None:
+            arcpy.AddMessage("  " + str(len(changedIds)) + " cells changed")
+            arcpy.AddMessage("Updating COC value table with " + COCName + " data...")
+            loaded, seconds = ARD_HEA_Grid.update_coc_data(cellValues, changedIds, COCTable, COCName)
+            ARD_HEA_Tools.rateout(loaded, seconds, "contaminant records updated")
+        else:
+            arcpy.AddMessage("Interpolating values at analysis grid cells...")
+            start = time.time()
+            del cellValues
+            cellValues = ARD_HEA_Grid.cell_array(geoDB, "SURFACES", NNLayer, grid)
+            tin = ARD_HEA_Interp.nn_cells(grid, sampleX, sampleY, sampleValues, cellValues, gridMask, NNProcesses)
+            if transform != "":
+                cellValues[:] = ARD_HEA_Interp.back_transform(numpy.asarray(cellValues), transform, transformParam)
+            ARD_HEA_Cost.record_timing(geoDB, "INTERPOLATION", ARD_HEA_Grid.cell_count(grid), time.time() - start, "NN")
+            arcpy.AddMessage("Updating COC value table with " + COCName + " data...")
+            loaded, seconds = ARD_HEA_Grid.write_coc_data(grid, cellValues, COCTable, COCName)
+            ARD_HEA_Tools.rateout(loaded, seconds, "contaminant records loaded")
+            ARD_HEA_Cost.record_timing(geoDB, "COC_DATA", ARD_HEA_Grid.cell_count(grid), seconds)
+        ARD_HEA_Grid.coc_data_warning(geoDB)
+        ARD_HEA_Interp.save_settings(geoDB, NNLayer, {"method": "NN", "transform": transform, "param": transformParam},
+                                     sampleX, sampleY, sampleValues, None, maskFeatures)
+        if tin is not None:
+            ARD_HEA_Interp.tin_save(geoDB, NNLayer, tin, dict(meta, values=ARD_HEA_Grid.array_checksum(cellValues)))
+        if NNWriteRaster != 'false':
+            ARD_HEA_Grid.write_surface_raster(geoDB, grid, cellValues, outRaster, desc.SpatialReference)
+        del cellValues
 
+    # Process: Interpolate a raster at a different cell size with NaturalNeighbor_sa from in-memory samples...
     else:
         arcpy.AddMessage("Interpolating values...")
-        arcpy.CopyFeatures_management(COCLayer, geoDB + "\\temp_data")
-        arcpy.NaturalNeighbor_sa(geoDB + "\\temp_data", COCField, NNOut, NNCellSize)        
-        arcpy.Times_sa(NNOut, AnalysisGrid, maskOut)
-	MARaster = arcpy.Raster(maskOut) * 1
-	# MARaster = arcpy.Raster(NNOut) * 1
-	MARaster.save(outRaster)
-    
+        ARD_HEA_Interp.tin_delete(geoDB, NNLayer)
+        ARD_HEA_Grid.clear_surface(geoDB, NNLayer)
+        ARD_HEA_Interp.samples_feature_class(sampleX, sampleY, sampleValues, samplesOut, desc.SpatialReference)
+        arcpy.NaturalNeighbor_sa(samplesOut, "VALUE", NNOut, NNCellSize)
+        ARD_HEA_Interp.back_transform_raster(NNOut, outRaster, transform, transformParam, desc.SpatialReference)
+        arcpy.Delete_management(samplesOut)
+        arcpy.Delete_management(NNOut)
+
     # Process: Capture geoprocessing history...
-    history  = ARD_HEA_Tools.get_process_history(currDir, geoDB + "\\temp_data")
-    if history is not None and history != "":                         
-        history  = history  + ARD_HEA_Tools.get_process_history(currDir, outRaster)
-    if history is not None and history != "":
-        history  = history  + ARD_HEA_Tools.get_process_history(currDir, NNOut)
-
-    # Process: Cleanup temp files.. 
-    arcpy.Delete_management(geoDB + "\\temp_data")
-    arcpy.Delete_management(maskOut)
-    arcpy.Delete_management(NNOut)
-    arcpy.Delete_management(ExpOut)
-
-    #Import metadata template
-    arcpy.AddMessage("Updating metadata...")
-    arcpy.ImportMetadata_conversion(xmlTemp, "FROM_FGDC", outRaster)
-    # arcpy.MetadataImporter_conversion(xmlTemp, outRaster)
+    history  = ARD_HEA_Tools.get_process_history(currDir, COCLocation)
+
+    if arcpy.Exists(outRaster):
+        #Import metadata template
+        arcpy.AddMessage("Updating metadata...")
+        arcpy.ImportMetadata_conversion(xmlTemp, "FROM_FGDC", outRaster)
+        # arcpy.MetadataImporter_conversion(xmlTemp, outRaster)
 
     #Record process step in COC Table
     if history  is not None and history  != "":
@@ -185,10 +273,12 @@ try:
         del row
         del rows
         # Set ouptut geoprocessing history
-        ARD_HEA_Tools.set_process_history (currDir, outRaster, history )
+        if arcpy.Exists(outRaster):
+            ARD_HEA_Tools.set_process_history (currDir, outRaster, history )
 
     # Process: Make Feature Layers...
-    arcpy.MakeRasterLayer_management(outRaster, NNLayer, "#", "#", "#")
+    if arcpy.Exists(outRaster):
+        arcpy.MakeRasterLayer_management(outRaster, NNLayer, "#", "#", "#")
     
     # Process: Compact database
     arcpy.Compact_management(geoDB)
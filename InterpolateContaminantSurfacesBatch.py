@@ -0,0 +1,340 @@
+# ---------------------------------------------------------------------------
+# NAME: InterpolateContaminantSurfacesBatch.py
+# Version: 2.0 (ArcGIS 10.2)
+# Author: Research Planning, Inc.
+#
+# Usage: InterpolateContaminantSurfacesBatch <input_analysis_database> <filtered_contaminant_layers> <value_fields>
+#   <log_transform> {power} {search_radius} {mask_layer} {barrier_lines} {write_raster} {processes} {method}
+#
+# Required Arguments:
+#   input_analysis_database - Name of analysis geodatabase
+#   filtered_contaminant_layers - Semicolon delimited list of filtered contaminant layers to interpolate
+#   value_fields - Semicolon delimited list of value fields, one per layer or one used for every layer.
+#                  '#' uses the <STAT_TYPE>_ field recorded for each layer in COC_INVENTORY
+#   log_transform - Transform applied to contaminant values before interpolating and reversed afterwards:
+#                   true (natural log of 1000 x value), false, LOG10 or BOXCOX
+#
+# Optional Arguments:
+#   {power} - Control significance of surrounding points on the interpolated cell (IDW only, default: Cross Validate IDW result of each layer)
+#   {search_radius} - Defines which surrounding points will be used to control the raster (IDW only, default: Cross Validate IDW result of each layer)
+#   {mask_layer} - Polygonal mask for resulting surfaces
+#   {barrier_lines} - Polyline features to be used as a break or limit to searching (IDW only)
+#   {write_raster} - Boolean flag indicating if the surfaces are also saved as rasters (default true)
+#   {processes} - Number of worker processes used on large grids (default: number of CPUs)
+#   {method} - IDW (inverse distance weighted, default) or NN (natural neighbor)
+#
+# Description: Interpolates surfaces for several filtered contaminant layers in one run using
+#              inverse distance weighted or natural neighbor technique.  Layers sampled at the
+#              same stations share one neighbor index (or triangulation) and one set of cell
+#              weights, applied to all of their contaminants at once.
+#
+# Notes:  Currently the tool is designed to only be run via the ARD HEA Toolbox.
+#         Surfaces are evaluated at the analysis grid cell size by the ARD_HEA_Interp engine;
+#         use Interpolate Contaminant Surface IDW or NN for a different cell size.
+#
+# Date Created: October 17, 2026
+# Date Modified: October 17, 2026   - Added natural neighbor method
+#                                   - Interpolation and COC_DATA load times are recorded in the project cache for
+#                                     the cost estimator
+#                                   - The settings and transformed samples of each surface are kept with its cell array,
+#                                     so Create Analysis Grid can evaluate cells added to the grid
+#                                   - Power and search radius default to the Cross Validate IDW results of each layer;
+#                                     layers share cell weights only when their stations and parameters match
+#
+# ---------------------------------------------------------------------------
+
+class nogrid(Exception):
+    pass
+
+class filtered(Exception):
+    pass
+
+class lognegative(Exception):
+    pass
+
+class nofield(Exception):
+    pass
+
+# Import system modules
+import ARD_HEA_Tools
+import ARD_HEA_Cost
+import ARD_HEA_Grid
+import ARD_HEA_Interp
+import sys
+import string
+import os
+import traceback
+import time
+import numpy
+import arcpy
+from arcpy import env
+
+# Load required toolboxes...
+sub_folder = "ArcToolbox/Toolboxes/"
+install_dir = arcpy.GetInstallInfo("desktop")['InstallDir'].replace("\\","/")
+tbx_home = os.path.join(install_dir, sub_folder)
+arcpy.AddToolbox(tbx_home+"Spatial Analyst Tools.tbx")
+
+try:
+    # Report version...
+    ver = ARD_HEA_Tools.version()
+    arcpy.AddMessage("ARD HEA Tools Version: " + ver)
+
+    # Script arguments...
+    geoDB = sys.argv[1]
+    COCLayers = [lyr.strip("'") for lyr in sys.argv[2].split(";") if lyr != ""]
+    COCFields = sys.argv[3]
+    PerfLog = sys.argv[4]
+    IDWPower = sys.argv[5]
+    IDWRadius = sys.argv[6]
+    IDWMask = sys.argv[7]
+    IDWBarrier = sys.argv[8]
+    if len(sys.argv) > 9:
+        IDWWriteRaster = sys.argv[9]
+    else:
+        IDWWriteRaster = 'true'
+    if len(sys.argv) > 10:
+        IDWProcesses = ARD_HEA_Tools.process_count(sys.argv[10])
+    else:
+        IDWProcesses = ARD_HEA_Tools.process_count('#')
+    if len(sys.argv) > 11 and sys.argv[11].upper() == "NN":
+        method = "NN"
+    else:
+        method = "IDW"
+
+    # Local variables...
+    scriptPath = sys.path[0]
+    xmlTemp = scriptPath + "\\interpolation_metadata_template.xml"
+    transform = ARD_HEA_Interp.transform_method(PerfLog)
+    AnalysisGrid = geoDB + "\\ANALYSIS_GRID"
+    COCInvent = geoDB + "\\COC_INVENTORY"
+    COCTable = geoDB + "\\COC_DATA"
+    currDir = os.path.dirname(geoDB)
+    if COCFields == '#' or COCFields == "":
+        fieldList = []
+    else:
+        fieldList = [fld.strip() for fld in COCFields.split(";")]
+        if len(fieldList) == 1:
+            fieldList = fieldList * len(COCLayers)
+        if len(fieldList) != len(COCLayers):
+            arcpy.AddError("  " + str(len(fieldList)) + " value fields were given for " + str(len(COCLayers)) +
+                           " layers, supply one value field or one per layer")
+            raise nofield
+
+    # Set the geoprocessing environment...
+    env.overwriteOutput = 1
+
+    # Process: Check for analysis grid...
+    if not arcpy.Exists(AnalysisGrid):
+        raise nogrid
+    desc = arcpy.Describe(AnalysisGrid)
+    spatialRef = desc.SpatialReference
+
+    # Process: Restrict the surfaces to grid cells inside the analysis and interpolation masks...
+    grid = ARD_HEA_Grid.load_grid(geoDB)
+    gridMask = None
+    maskFeatures = None
+    if IDWMask <> '#' and IDWMask != "":
+        maskFeatures = ARD_HEA_Grid.polygon_edges(IDWMask, spatialRef)
+        gridMask = numpy.asarray(grid["grid_id"]) > 0
+        gridMask &= ARD_HEA_Grid.mask_cells(geoDB, grid, maskFeatures)
+
+    # Process: Look up each layer and its cross-validated IDW parameters in the contaminant inventory table...
+    inventory = {}
+    fieldNames = [fld.name for fld in arcpy.ListFields(COCInvent)]
+    tuned = [name for name in ("IDW_POWER", "IDW_RADIUS") if name in fieldNames]
+    with arcpy.da.SearchCursor(COCInvent, ["FILTER_LAYER_NAME", "COC_NAME", "STAT_TYPE"] + tuned) as cursor:
+        for row in cursor:
+            values = dict(zip(tuned, row[3:]))
+            inventory[row[0]] = (row[1], row[2], values.get("IDW_POWER"), values.get("IDW_RADIUS"))
+    layers = []
+    for i in range(len(COCLayers)):
+        layerDesc = arcpy.Describe(COCLayers[i])
+        if layerDesc.DataType == "FeatureLayer":
+            COCLayerBase = COCLayers[i].split(os.sep)[-1]
+        else:
+            COCLayerBase = layerDesc.Basename
+        if COCLayerBase not in inventory:
+            arcpy.AddError("  " + COCLayerBase + " is not in the contaminant inventory")
+            raise filtered
+        COCName, STATType, layerPower, layerRadius = inventory[COCLayerBase]
+        if len(fieldList) > 0:
+            COCField = fieldList[i]
+        else:
+            COCField = None
+            for fld in arcpy.ListFields(layerDesc.CatalogPath):
+                if STATType is not None and fld.name.upper().startswith(STATType.upper() + "_"):
+                    COCField = fld.name
+                    break
+            if COCField is None:
+                arcpy.AddError("  No " + str(STATType) + "_ value field in " + COCLayerBase)
+                raise nofield
+        # Power and search radius default to the Cross Validate IDW results of each layer
+        power, radius = IDWPower, IDWRadius
+        if method == "IDW" and (power == '#' or power == "") and layerPower is not None:
+            power = str(layerPower)
+            arcpy.AddMessage("  " + COCLayerBase + ": using cross-validated power " + power)
+        if method == "IDW" and (radius == '#' or radius == "") and layerRadius:
+            radius = layerRadius
+            arcpy.AddMessage("  " + COCLayerBase + ": using cross-validated search radius " + radius)
+        layers.append({"layer": COCLayers[i], "base": COCLayerBase, "location": layerDesc.CatalogPath,
+                       "coc": COCName, "field": COCField, "interp": method + "_" + COCLayerBase,
+                       "power": power, "radius": radius})
+
+    # Process: Read samples, check for valid values used for non-detect limits and transform values if necessary...
+    arcpy.AddMessage("Reading samples for " + str(len(layers)) + " contaminants...")
+    groups = {}
+    for lyr in layers:
+        sampleX, sampleY, sampleValues = ARD_HEA_Interp.read_samples(lyr["layer"], lyr["field"], spatialRef)
+        if (sampleValues <= 0).any():
+            if transform != "":
+                arcpy.AddError("  " + lyr["base"] + " has values <= 0")
+                raise lognegative
+            else:
+                arcpy.AddMessage("\n*** WARNING ***\n" + lyr["base"] + ": analysis with negative non-detect limits may produce unexpected results\n")
+        lyr["param"] = None
+        if transform != "":
+            sampleValues, lyr["param"] = ARD_HEA_Interp.forward_transform(sampleValues, transform)
+            if lyr["param"] is not None:
+                arcpy.AddMessage("  " + lyr["base"] + " Box-Cox lambda: " + str(lyr["param"]))
+        # Layers share cell weights only when sampled at the same stations with the same power and search radius
+        order, key = ARD_HEA_Interp.station_key(sampleX, sampleY)
+        if method == "IDW":
+            key = (key, lyr["power"], lyr["radius"])
+        if key not in groups:
+            groups[key] = {"x": sampleX[order], "y": sampleY[order], "values": [], "layers": [],
+                           "power": lyr["power"], "radius": lyr["radius"]}
+        groups[key]["values"].append(sampleValues[order])
+        groups[key]["layers"].append(lyr)
+    if transform != "":
+        arcpy.AddMessage("Performed " + transform + " transformation of contaminant values")
+
+    # Process: Read barrier lines once for all contaminants...
+    barrierSegments = None
+    if IDWBarrier <> '#' and IDWBarrier != "" and method == "IDW":
+        barrierSegments = ARD_HEA_Interp.read_segments(IDWBarrier, spatialRef)
+        arcpy.AddMessage("  " + str(len(barrierSegments)) + " barrier segments")
+
+    # Process: Interpolate each station set at the analysis grid cells and load the values into COC_DATA...
+    for key in groups:
+        group = groups[key]
+        arcpy.AddMessage("Interpolating " + str(len(group["layers"])) + " contaminants at " + str(len(group["x"])) + " stations...")
+        start = time.time()
+        cellValues = [ARD_HEA_Grid.cell_array(geoDB, "SURFACES", lyr["interp"], grid) for lyr in group["layers"]]
+        tin = None
+        if method == "NN":
+            tin = ARD_HEA_Interp.nn_cells(grid, group["x"], group["y"], numpy.column_stack(group["values"]), cellValues,
+                                          gridMask, IDWProcesses)
+        else:
+            ARD_HEA_Interp.idw_cells(grid, group["x"], group["y"], numpy.column_stack(group["values"]), cellValues,
+                                     group["power"], group["radius"], gridMask, barrierSegments, IDWProcesses)
+        arcpy.AddMessage("  Interpolated in " + "%.1f" % (time.time() - start) + " s")
+        for j in range(len(group["layers"])):
+            lyr = group["layers"][j]
+            ARD_HEA_Interp.save_settings(geoDB, lyr["interp"], {"method": method, "transform": transform, "param": lyr["param"],
+                                                                "power": group["power"], "radius": group["radius"]},
+                                         group["x"], group["y"], group["values"][j], barrierSegments, maskFeatures)
+        if transform != "":
+            for j in range(len(group["layers"])):
+                cellValues[j][:] = ARD_HEA_Interp.back_transform(numpy.asarray(cellValues[j]), transform, group["layers"][j]["param"])
+        # Keep the triangulation of each contaminant, with the checksum of its surface, so later runs can update
+        # the surface incrementally
+        if tin is not None:
+            for j in range(len(group["layers"])):
+                lyr = group["layers"][j]
+                layerTin = dict(tin)
+                layerTin["values"] = tin["values"][:, j]
+                meta = ARD_HEA_Interp.tin_meta(grid, gridMask, transform, lyr["param"])
+                meta["values"] = ARD_HEA_Grid.array_checksum(cellValues[j])
+                ARD_HEA_Interp.tin_save(geoDB, lyr["interp"], layerTin, meta)
+        ARD_HEA_Cost.record_timing(geoDB, "INTERPOLATION", ARD_HEA_Grid.cell_count(grid) * len(group["layers"]), time.time() - start, method)
+        arcpy.AddMessage("Updating COC value table with " + ", ".join([lyr["coc"] for lyr in group["layers"]]) + " data...")
+        loaded, seconds = ARD_HEA_Grid.write_coc_stack(cellValues, COCTable, [lyr["coc"] for lyr in group["layers"]])
+        ARD_HEA_Tools.rateout(loaded, seconds, "contaminant records loaded")
+        ARD_HEA_Cost.record_timing(geoDB, "COC_DATA", ARD_HEA_Grid.cell_count(grid) * len(group["layers"]), seconds)
+        for j in range(len(group["layers"])):
+            lyr = group["layers"][j]
+            outRaster = geoDB + "\\" + lyr["interp"]
+            if arcpy.Exists(outRaster):
+                arcpy.Delete_management(outRaster)
+            if IDWWriteRaster != 'false':
+                ARD_HEA_Grid.write_surface_raster(geoDB, grid, cellValues[j], outRaster, spatialRef)
+                arcpy.ImportMetadata_conversion(xmlTemp, "FROM_FGDC", outRaster)
+        del cellValues
+    ARD_HEA_Grid.coc_data_warning(geoDB)
+
+    # Process: Capture geoprocessing history...
+    for lyr in layers:
+        lyr["history"] = ARD_HEA_Tools.get_process_history(currDir, lyr["location"])
+        outRaster = geoDB + "\\" + lyr["interp"]
+        if lyr["history"] is not None and lyr["history"] != "" and arcpy.Exists(outRaster):
+            ARD_HEA_Tools.set_process_history(currDir, outRaster, lyr["history"])
+
+    # Process: Update contaminant inventory table in one pass...
+    byLayer = dict([(lyr["base"], lyr) for lyr in layers])
+    with arcpy.da.UpdateCursor(COCInvent, ["FILTER_LAYER_NAME", "INTERP_LAYER_NAME", "INTERP_TYPE", "LOG_TRANSFORM", "COC_XML"]) as cursor:
+        for row in cursor:
+            if row[0] in byLayer:
+                lyr = byLayer[row[0]]
+                row[1] = lyr["interp"]
+                row[2] = method
+                row[3] = ARD_HEA_Interp.transform_code(transform)
+                if lyr["history"] is not None and lyr["history"] != "":
+                    row[4] = lyr["history"]
+                cursor.updateRow(row)
+
+    # Process: Make Raster Layers
+    for lyr in layers:
+        if arcpy.Exists(geoDB + "\\" + lyr["interp"]):
+            arcpy.MakeRasterLayer_management(geoDB + "\\" + lyr["interp"], lyr["interp"], "", "", "")
+
+    # Process: Compact database
+    arcpy.Compact_management(geoDB)
+
+except nogrid:
+    arcpy.AddError("\n*** ERROR ***\nCannot interpolate without defined analysis grid.  Create analysis grid.\n")
+    print "\n*** ERROR ***\nCannot interpolate without defined analysis grid.  Create analysis grid.\n"
+
+except filtered:
+    arcpy.AddError("\n*** ERROR ***\nInterpolation must be run on filtered contaminant layers\n")
+    print "Interpolation must be run on filtered contaminant layers"
+
+except lognegative:
+    arcpy.AddError("\n*** ERROR ***\nCannot perform log transformation on contaminant layer with negative values\n")
+    print "\n*** ERROR ***\nCannot perform log transformation on contaminant layer with negative values\n"
+
+except nofield:
+    arcpy.AddError("\n*** ERROR ***\nValue field could not be found, supply the value fields to interpolate\n")
+    print "\n*** ERROR ***\nValue field could not be found, supply the value fields to interpolate\n"
+
+except arcpy.ExecuteError:
+    # Get the tool error messages
+    msgs = arcpy.GetMessage(0)
+    msgs += arcpy.GetMessages(2)
+
+    # Return tool error messages for use with a script tool
+    arcpy.AddError(msgs)
+
+    # Print tool error messages for use in Python/PythonWin
+    print msgs
+
+except:
+    # Get the traceback object
+    #
+    tb = sys.exc_info()[2]
+    tbinfo = traceback.format_tb(tb)[0]
+
+    # Concatenate information together concerning the error into a message string
+    #
+    pymsg = "PYTHON ERRORS:\nTraceback info:\n" + tbinfo + "\nError Info:\n" + str(sys.exc_info()[1])
+    msgs = "ArcPy ERRORS:\n" + arcpy.GetMessages(2) + "\n"
+
+    # Return python error messages for use in script tool or Python Window
+    #
+    arcpy.AddError(pymsg)
+    arcpy.AddError(msgs)
+
+    # Print Python error messages for use in Python / Python Window
+    #
+    print pymsg + "\n"
+    print msgs
@@ -3,12 +3,15 @@
 # Version: 2.0 (ArcGIS 10.2)
 # Author: Research Planning, Inc.
 #
-# Usage: LoadContaminantSurfaces <input_analysis_database> <list_of_surfaces>
+# Usage: LoadContaminantSurfaces <input_analysis_database> <list_of_surfaces> {processes}
 #
 # Required Arguments: 
 #   input_analysis_database - Name of analysis geodatabase
 #   list_of_surfaces - List of interpolated surfaces to load into database
 #
+# Optional Arguments:
+#   {processes} - Number of worker processes reading surfaces at the same time (default 1)
+#
 # Description: Loads interpolated raster surfaces into a single data table for further
 #              data analysis.  Also updates associated metadata table for the raster
 #              surfaces
@@ -23,6 +26,19 @@
 #                March 7, 2014      - Updated arcpy to 10.2 for V2.0
 #                March 10, 2014     - Fixed error handling when data have not been filtered
 #                March 5, 2015      - Added a check to see if contaminant surfaces match analysis grid
+#                October 16, 2026   - Load timings are recorded in the project cache for the cost estimator
+#                October 17, 2026   - Surface values are read as arrays at the cached analysis grid cells and
+#                                     bulk appended to COC_DATA; <raster>_extract and <raster>_tbl are no longer
+#                                     written to the geodatabase
+#                                   - Surfaces are checked against the cached analysis grid cells instead of an IsNull
+#                                     count and TOTAL_CELLS, reporting the missing GRID_IDs, cells off the grid and
+#                                     cell size, extent and snap differences; no Spatial Analyst license is needed.
+#                                     Surfaces written by the interpolation engine are loaded from their cell arrays
+#                                   - All selected surfaces are read into one cell stack, in worker processes when
+#                                     {processes} is more than 1, checked before COC_DATA is changed, and written
+#                                     to COC_DATA together
+#                                   - Contaminant records are replaced with one indexed delete and one append of
+#                                     the staged records of the loaded contaminants
 #
 # ---------------------------------------------------------------------------
 
@@ -33,23 +49,21 @@ class unmatched(Exception):
 
 # Import system modules
 import ARD_HEA_Tools
+import ARD_HEA_Cost
+import ARD_HEA_Grid
 import sys
 import string
 import os
 import traceback
+import time
 import arcpy
-from arcpy.sa import *
 from arcpy import env
 
 
-# Check out any necessary licenses
-arcpy.CheckOutExtension("spatial")
-
 # Load required toolboxes...
 sub_folder = "ArcToolbox/Toolboxes/"
 install_dir = arcpy.GetInstallInfo("desktop")['InstallDir'].replace("\\","/")
 tbx_home = os.path.join(install_dir, sub_folder)
-arcpy.AddToolbox(tbx_home+"Spatial Analyst Tools.tbx")
 arcpy.AddToolbox(tbx_home+"Data Management Tools.tbx")
 arcpy.AddToolbox(tbx_home+"Conversion Tools.tbx")
 
@@ -61,6 +75,10 @@ try:
     # Script arguments...
     geoDB = sys.argv[1]
     COCRasters = sys.argv[2]
+    if len(sys.argv) > 3 and sys.argv[3] not in ('#', ''):
+        LoadProcesses = ARD_HEA_Tools.process_count(sys.argv[3])
+    else:
+        LoadProcesses = 1
 
     # Local variables...
     COCRasterList = [v.strip("'") for v in COCRasters.split(";")]
@@ -69,25 +87,24 @@ try:
     xmlDoc = currDir + "\\temp.xml"
     COCInvent = geoDB + "\\COC_INVENTORY"
     prjAttr = geoDB + "\\PROJECT_ATTRIBUTES"
+    COCData = geoDB + "\\COC_DATA"
 
     # Set the geoprocessing environment
     arcpy.overwriteOutput = 1
 
-    # Process each surface
-    for COCRaster in COCRasterList:
+    # Process: Load the analysis grid cells...
+    start = time.time()
+    grid = ARD_HEA_Grid.load_grid(geoDB)
+    gridKey = ARD_HEA_Grid.grid_checksum(grid)
 
-        # Setup Raster Variables
+    # Process: Check if each COC has been updated in inventory table...
+    COCFields = []
+    for COCRaster in COCRasterList:
         desc = arcpy.Describe(COCRaster)
         if desc.DataType == "RasterLayer":
             COCRasterName = COCRaster.split(os.sep)[-1]
         else:
             COCRasterName = desc.Basename
-        COCExtract = geoDB + "\\" + COCRasterName + "_extract"
-        COCTable = COCRasterName + "_tbl"
-        currentdir = os.path.dirname(geoDB)
-        filename = currentdir + "\\temp.xml"
-        
-        # Check if COC has been updated in inventory table
         rows = arcpy.SearchCursor(COCInvent, "[INTERP_LAYER_NAME] = '" + COCRasterName + "'")
         COCField = "empty"
         row = rows.next()
@@ -98,56 +115,28 @@ try:
         del rows
         if COCField == "empty":
             raise filtered
-        
-        # Process: Check for discrepancies in size of contaminant surface and analysis grid
-        COCNulls = IsNull(COCRaster)
-        rowsGrid = arcpy.SearchCursor(COCNulls)
-        for rowGrid in rowsGrid:
-            val = rowGrid.VALUE
-            if val==0:
-                numSfcCells = int(rowGrid.COUNT)
-        cursor = arcpy.da.SearchCursor(prjAttr, ("TOTAL_CELLS"))
-        row = cursor.next()
-        numAGridCells = row[0]
-        if numSfcCells != numAGridCells:
-            arcpy.AddMessage("surface cells: " + str(numSfcCells) + ", analysis grid: " + str(numAGridCells))
-            arcpy.Delete_management(COCExtract)
+        COCFields.append(COCField)
+
+    # Process: Read all surfaces at the analysis grid cells and check them against the grid...
+    arcpy.AddMessage("Extracting " + ", ".join(COCFields) + " data from " + str(len(COCRasterList)) + " surfaces...")
+    cellValues = ARD_HEA_Grid.cell_stack(geoDB, "LOADED", "SURFACE_STACK", grid, len(COCRasterList))
+    reports = ARD_HEA_Grid.check_surfaces(geoDB, grid, COCRasterList, cellValues, LoadProcesses, gridKey)
+    for COCField, report in zip(COCFields, reports):
+        if report["source"] == "engine":
+            arcpy.AddMessage("  " + COCField + " values taken from the interpolation engine cell array")
+    for COCRaster, report in zip(COCRasterList, reports):
+        if not report["aligned"]:
+            for line in ARD_HEA_Grid.report_messages(report):
+                arcpy.AddMessage(line)
             raise unmatched
-        del row, cursor, rowGrid, rowsGrid
-
-        # Process: Extract Values to Points...
-        arcpy.AddMessage("Extracting " + COCField + " data from " + str(COCRasterName))
-        arcpy.Copy_management(geoDB + "\\ANALYSIS_PNTS", COCExtract)
-        ExtractMultiValuesToPoints(COCExtract, [[COCRaster, "COC_VALUE"]], "NONE")
-           
-        # Process: Remove existing records in COC Data table...
-        arcpy.AddMessage("\nRemove any pre-existing " + COCField + " records from data tables...")
-        rows = arcpy.UpdateCursor(geoDB + "\\COC_DATA", "[COC_NAME] = '" + COCField + "'")
-        for row in rows:
-            rows.deleteRow(row)
-        del rows
-
-        # Process: Add Fields...
-        arcpy.AddField_management(COCExtract, "COC_NAME", "TEXT", "", "", "20", "", "NULLABLE", "REQUIRED", "")
-        arcpy.AddField_management(COCExtract, "FOOTPRINT_ID", "LONG", "", "", "", "", "NULLABLE", "NON_REQUIRED", "")
-
-        # Process: Calculate Fields...
-        rows = arcpy.UpdateCursor(COCExtract)
-        for row in rows:
-            row.COC_NAME = COCField
-            rows.updateRow(row)
-        del row
-        del rows
-
-        # Process: Make Table View...
-        filter_exp = "[COC_VALUE] >= 0"
-        arcpy.TableToTable_conversion(COCExtract, geoDB, COCTable, filter_exp)
 
-        # Process: Append to COC Data Table...
-        arcpy.AddMessage("Updating COC value table with " + COCField + " data...")
-        InTable = geoDB + "\\" + COCTable
-        arcpy.Append_management(InTable, geoDB + "\\COC_DATA", "NO_TEST")
-        arcpy.Delete_management(InTable)
+    # Process: Replace records in COC Data table, skipping NoData and negative values...
+    arcpy.AddMessage("\nReplacing " + ", ".join(COCFields) + " records in COC value table...")
+    loaded, seconds = ARD_HEA_Grid.write_coc_stack(cellValues, COCData, COCFields)
+    ARD_HEA_Tools.rateout(loaded, seconds, "contaminant records loaded")
+    ARD_HEA_Grid.coc_data_warning(geoDB)
+    del cellValues
+    ARD_HEA_Cost.record_timing(geoDB, "COC_DATA", ARD_HEA_Grid.cell_count(grid) * len(COCFields), time.time() - start)
     
 except filtered:
     arcpy.AddError("\n*** ERROR ***\nInput features for raster layer " + COCRaster + " have not been filtered or entry is missing from COC_INVENTORY table")
@@ -15,15 +15,21 @@
 # Date Created: July 15, 2014
 #
 # Date Modified: March 5, 2015     - Added code to load footprints into COC_DATA table
+#                October 16, 2026  - Load timings are recorded in the project cache for the cost estimator
+#                October 17, 2026  - Projects storing contaminant values in columns have the FOOTPRINT_IDs written
+#                                    to the FOOTPRINT_ID column of each contaminant
 #
 # ---------------------------------------------------------------------------
 
 # Import system modules
 import ARD_HEA_Tools
+import ARD_HEA_Cost
+import ARD_HEA_Grid
 import sys
 import string
 import os
 import traceback
+import time
 import arcpy
 from arcpy.sa import *
 from arcpy import env
@@ -66,7 +72,12 @@ try:
         arcpy.AddField_management(footprints, "COC_NAME", "TEXT", "", "", "20", "", "NULLABLE", "NON_REQUIRED", "")
         arcpy.AddField_management(footprints, "FOOTPRINT_ID", "LONG", "", "", "", "", "NULLABLE", "NON_REQUIRED", "")
 
+    # Projects storing contaminant values in columns have the footprints written to the columns
+    columns = ARD_HEA_Grid.coc_backend(geoDB) == "COLUMNS"
+
     # Process: Loop through each record in subset of contaminant threshold table and load associated footprint
+    start = time.time()
+    loadedRows = 0
     expression = arcpy.AddFieldDelimiters(usrTbl, "Scenario_ID") + " = " + ScenID
     with arcpy.da.SearchCursor(usrTbl, ("Scenario_ID", "COC_NAME"), where_clause=expression) as cursor:
         for row in cursor:
@@ -91,6 +102,7 @@ try:
             COC_FP = geoDB + "\\" + COCName + "SC" + ScenID + "_footprint"
             arcpy.Copy_management(geoDB + "\\ANALYSIS_PNTS", COC_FP)
             ExtractMultiValuesToPoints(COC_FP, [[FPRaster, "FOOTPRINT_ID"]], "NONE")
+            loadedRows = loadedRows + int(arcpy.GetCount_management(COC_FP).getOutput(0))
 
             # Add footprints to COC_DATA table
             arcpy.AddMessage("Adding footprints to COC_DATA table")
@@ -102,14 +114,17 @@ try:
                     val1 = arow[1]
                     joindict[joinval]=val1
             del arow, rows
-            targetflds = ['GRID_ID', 'FOOTPRINT_ID']
-            expression2 = arcpy.AddFieldDelimiters(COCTbl, "COC_NAME") + " = '" + COCName + "'"
-            with arcpy.da.UpdateCursor(COCTbl, targetflds, where_clause=expression2) as recs:
-                for rec in recs:
-                    keyval = rec[0]
-                    rec[1] = joindict[keyval]
-                    recs.updateRow(rec)
-            del rec, recs
+            if columns:
+                ARD_HEA_Grid.update_coc_footprints(geoDB, COCName, joindict)
+            else:
+                targetflds = ['GRID_ID', 'FOOTPRINT_ID']
+                expression2 = arcpy.AddFieldDelimiters(COCTbl, "COC_NAME") + " = '" + COCName + "'"
+                with arcpy.da.UpdateCursor(COCTbl, targetflds, where_clause=expression2) as recs:
+                    for rec in recs:
+                        keyval = rec[0]
+                        rec[1] = joindict[keyval]
+                        recs.updateRow(rec)
+                del rec, recs
 	    
 	    arcpy.AddField_management(COC_FP, "SCENARIO_ID", "SHORT", "", "", "", "", "NULLABLE", "NON_REQUIRED", "")
 	    arcpy.CalculateField_management(COC_FP, "SCENARIO_ID", ScenID)
@@ -122,6 +137,8 @@ try:
         arcpy.Delete_management(COC_FP)
 
     del row, cursor
+    ARD_HEA_Cost.record_timing(geoDB, "FOOTPRINTS", loadedRows, time.time() - start)
+    ARD_HEA_Grid.coc_data_warning(geoDB)
     
 
 except arcpy.ExecuteError:
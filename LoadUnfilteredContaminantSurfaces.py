@@ -19,11 +19,14 @@
 # Date Modified: June 1, 2011       - Edited for Arc 10.0 functionality
 #                September 15, 2012 - Additional bug fixes
 #                March 10, 2014     - Updated to arcpy 10.2 for V2.0
+#                October 17, 2026   - Contaminant records are replaced with one indexed delete and one append
+#                                     through ARD_HEA_Grid instead of a separate delete and append
 #
 # ---------------------------------------------------------------------------
 
 # Import system modules
 import ARD_HEA_Tools
+import ARD_HEA_Grid
 import sys
 import string
 import os
@@ -121,11 +124,6 @@ try:
             row.COC_QMDOC = qmText
         rows.insertRow(row)
     
-    # Process: Remove existing records in COC Data table...
-    arcpy.AddMessage("\nRemove any pre-existing " + COCName + " records from data tables...")
-    arcpy.MakeTableView_management(geoDB + "\\COC_DATA", "COC_DATA_view", "[COC_NAME] = '" + COCName + "'")
-    arcpy.DeleteRows_management("COC_DATA_view")
-        
     # Process: Extract Values to Points...
     arcpy.AddMessage("Preparing " + COCName + " data..." + COCExtract)
     arcpy.ExtractValuesToPoints_sa(geoDB + "\\ANALYSIS_PNTS", COCRaster, COCExtract, "NONE", "VALUE_ONLY")
@@ -153,11 +151,12 @@ try:
     filter_exp = "[COC_VALUE] >= 0"
     arcpy.TableToTable_conversion(COCExtract, geoDB, COCTable, filter_exp)
 
-    # Process: Append to COC Data Table...
+    # Process: Replace the contaminant records in COC Data table...
     arcpy.AddMessage("Updating table with " + COCName + " data...")
     InTable = geoDB + "\\" + COCTable
-    arcpy.Append_management(InTable, geoDB + "\\COC_DATA", "NO_TEST")
+    ARD_HEA_Grid.replace_coc_table(InTable, geoDB + "\\COC_DATA", COCName)
     arcpy.Delete_management(InTable)
+    ARD_HEA_Grid.coc_data_warning(geoDB)
 
     # Process: Update Metadata Tables...
     history = ARD_HEA_Tools.get_process_history(currDir, COCExtract)